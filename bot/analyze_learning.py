@@ -4,114 +4,66 @@
 from __future__ import annotations
 import json
 import os
-from collections import defaultdict
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from typing import Any, Dict, List, Tuple, Optional
 
+from learning_columns import LearningColumns, epoch_to_iso, load_columns
+
 PRIMARY_FILE = "learning_log.json"
 LEGACY_FILE = "learn_log.json"
 
-def _parse_iso(ts: str) -> Optional[datetime]:
-    if not isinstance(ts, str):
-        return None
-    try:
-        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
-    except Exception:
-        return None
-
-def _to_bool_or_percent(entry: Dict[str, Any]) -> Tuple[Optional[bool], Optional[float]]:
-    if "correct" in entry:
-        try:
-            cb = bool(entry["correct"])
-            return cb, 100.0 if cb else 0.0
-        except Exception:
-            pass
-    if "success" in entry:
-        try:
-            s = entry["success"]
-            if isinstance(s, bool):
-                return s, 100.0 if s else 0.0
-            val = float(s)
-            if 0.0 <= val <= 1.0:
-                return val >= 0.5, val * 100.0
-            val = max(0.0, min(100.0, val))
-            return val >= 50.0, val
-        except Exception:
-            pass
-    return None, None
-
-def _load_logs() -> List[Dict[str, Any]]:
-    data: List[Dict[str, Any]] = []
-    for path in (PRIMARY_FILE, LEGACY_FILE):
-        if not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                obj = json.load(f)
-            if isinstance(obj, list):
-                data.extend(obj)
-        except Exception as e:
-            print(f"[Learning] Warnung: {path} konnte nicht gelesen werden: {e}")
-    cleaned: List[Dict[str, Any]] = []
-    for e in data:
-        coin = str(e.get("coin", "")).upper().strip()
-        if not coin:
-            continue
-        ts = e.get("timestamp") or e.get("time") or e.get("date")
-        dt = _parse_iso(ts) if ts else None
-        corr, succ = _to_bool_or_percent(e)
-        if corr is None and succ is None:
-            res = str(e.get("result", "")).lower()
-            if res in ("win", "success", "correct", "true"):
-                corr, succ = True, 100.0
-            elif res in ("loss", "fail", "false", "wrong"):
-                corr, succ = False, 0.0
-        cleaned.append({
-            "coin": coin,
-            "timestamp": dt,
-            "correct": corr if corr is not None else False,
-            "success_pct": succ if succ is not None else (100.0 if corr else 0.0),
-            "raw": e,
-        })
-    cleaned.sort(key=lambda x: x["timestamp"] or datetime.min.replace(tzinfo=timezone.utc))
-    return cleaned
-
-def _filter_timeframe(rows: List[Dict[str, Any]], days: Optional[int]) -> List[Dict[str, Any]]:
-    if not days or days <= 0:
-        return rows
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(days=days)
-    return [r for r in rows if isinstance(r["timestamp"], datetime) and r["timestamp"] >= cutoff]
+def _sources() -> List[LearningColumns]:
+    return [load_columns(path) for path in (PRIMARY_FILE, LEGACY_FILE)]
 
 def compute_stats(days: Optional[int] = None) -> Dict[str, Any]:
-    rows = _filter_timeframe(_load_logs(), days)
-    if not rows:
+    """
+    Kennzahlen aus den laufenden Aggregaten (learning_stats): nur Tages-Buckets, die
+    Logs selbst werden nur nach fremden Schreibzugriffen gelesen. Zeitfenster zählen
+    ganze UTC-Tage. compute_stats_full() rechnet wie früher über alle Zeilen.
+    """
+    try:
+        from learning_stats import window_stats
+        return window_stats(days)
+    except Exception as e:
+        print(f"[Learning] Aggregate nicht nutzbar ({e}) – volle Auswertung.")
+        return compute_stats_full(days)
+
+def compute_stats_full(days: Optional[int] = None) -> Dict[str, Any]:
+    """Volle Auswertung über alle Zeilen (spaltenweise, learning_columns)."""
+    total = correct = 0
+    by_coin: Dict[str, Dict[str, int]] = {}
+    latest: List[Tuple[float, int, int, str, bool]] = []
+    for order, cols in enumerate(_sources()):
+        mask = cols.mask(days)
+        for coin, g in cols.group_by("coin", mask).items():
+            s = by_coin.setdefault(coin, {"total": 0, "correct": 0, "wrong": 0})
+            s["total"] += g["total"]
+            s["correct"] += g["correct"]
+            s["wrong"] += g["total"] - g["correct"]
+            total += g["total"]
+            correct += g["correct"]
+        r = cols.rows
+        for i in cols.order(mask)[-10:]:
+            ep = float(r["epoch"][i])
+            latest.append((ep if ep == ep else float("-inf"), order, int(i),
+                           cols.coins[r["coin"][i]], bool(r["correct"][i])))
+    if not total:
         return {
             "overall": {"total": 0, "correct": 0, "wrong": 0, "accuracy_pct": 0.0},
             "by_coin": {},
             "latest": [],
         }
-    total = len(rows)
-    correct = sum(1 for r in rows if r["correct"])
     wrong = total - correct
     overall_acc = round(100.0 * correct / total, 2) if total else 0.0
-    by_coin = defaultdict(lambda: {"total": 0, "correct": 0, "wrong": 0})
-    for r in rows:
-        c = r["coin"]
-        by_coin[c]["total"] += 1
-        if r["correct"]:
-            by_coin[c]["correct"] += 1
-        else:
-            by_coin[c]["wrong"] += 1
     by_coin_final: Dict[str, Dict[str, Any]] = {}
     for coin, s in by_coin.items():
         acc = round(100.0 * s["correct"] / s["total"], 2) if s["total"] else 0.0
         by_coin_final[coin] = {**s, "accuracy_pct": acc}
-    latest = rows[-10:]
+    latest.sort()
     latest_fmt = [
-        f"{i+1}. {r['coin']} — {'✅' if r['correct'] else '❌'} "
-        f"{(r['timestamp'].isoformat() if r['timestamp'] else 'n/a')}"
-        for i, r in enumerate(latest)
+        f"{i+1}. {coin} — {'✅' if ok else '❌'} "
+        f"{(epoch_to_iso(ep) if ep != float('-inf') else 'n/a')}"
+        for i, (ep, _, _, coin, ok) in enumerate(latest[-10:])
     ]
     return {
         "overall": {"total": total, "correct": correct, "wrong": wrong, "accuracy_pct": overall_acc},
@@ -5,6 +5,7 @@ from __future__ import annotations
 import json
 import os
 import tempfile
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
@@ -61,6 +62,28 @@ def _judge(decision: str, actual_pct: float) -> bool:
     # unbekannte Entscheidung -> als falsch werten
     return False
 
+def judge_decision(coin: str,
+                   decision: str,
+                   actual_percent: float | int,
+                   *,
+                   horizon_days: Optional[int] = None,
+                   meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Ergebnis-Dict wie learn_from_decision, aber ohne zu schreiben (für Batch-Verarbeitung)."""
+    pct = _normalize_percent(actual_percent)
+    correct = _judge(decision, pct)
+
+    result: Dict[str, Any] = {
+        "coin": (coin or "").upper(),
+        "decision": (decision or "").lower(),
+        "actual_percent": pct,
+        "correct": bool(correct),
+        "horizon_days": horizon_days,
+        "timestamp": _utc_iso(),
+    }
+    if isinstance(meta, dict) and meta:
+        result["meta"] = meta
+    return result
+
 def learn_from_decision(coin: str,
                         decision: str,
                         actual_percent: float | int,
@@ -75,25 +98,105 @@ def learn_from_decision(coin: str,
     meta: optionales Dict für zusätzliche Felder (z. B. Quelle, Signal-ID usw.)
     Rückgabe: Ergebnis-Dict (inkl. normalisiertem Prozent & korrekt-Flag).
     """
-    pct = _normalize_percent(actual_percent)
-    correct = _judge(decision, pct)
+    result = judge_decision(coin, decision, actual_percent, horizon_days=horizon_days, meta=meta)
 
-    result: Dict[str, Any] = {
-        "coin": (coin or "").upper(),
-        "decision": (decision or "").lower(),
-        "actual_percent": pct,
-        "correct": bool(correct),
-        "horizon_days": horizon_days,
-        "timestamp": _utc_iso(),
-    }
-    if isinstance(meta, dict) and meta:
-        result["meta"] = meta
-
-    data = _load_json_list(LEARNING_LOG)
-    data.append(result)
-    _atomic_write_json(LEARNING_LOG, data)
+    _append_records(LEARNING_LOG, [result])
     return result
 
+def _append_records(path: str, records: List[Dict[str, Any]]) -> None:
+    """Einträge anhängen (ein Schreibvorgang) und den Lernstatistik-Checkpoint nachführen."""
+    from pending_index import file_sig
+    data = _load_json_list(path)
+    before_sig = file_sig(path)
+    data.extend(records)
+    _atomic_write_json(path, data)
+    try:
+        from learning_stats import note_appended
+        note_appended(path, before_sig, records)
+    except Exception as e:
+        print(f"[AutoLearn] Lernstatistik nicht aktualisiert: {e}")
+
+class LearnBatch:
+    """
+    Transaktionaler Batch für learning_log.json: bewertete Entscheidungen werden im
+    Speicher gesammelt und mit EINEM Schreibvorgang übernommen.
+
+        with LearnBatch() as batch:
+            batch.add("BTC", "buy", 0.08)
+        # → beim Verlassen ohne Fehler: flush(); bei Exception: verwerfen
+
+    flush() kann auch explizit (z. B. alle N Einträge) aufgerufen werden.
+    stats() liefert Durchsatz in Einträgen pro Sekunde.
+    """
+
+    def __init__(self, path: str = LEARNING_LOG, *, default_horizon_days: Optional[int] = None):
+        self.path = path
+        self.default_horizon_days = default_horizon_days
+        self._pending: List[Dict[str, Any]] = []
+        self._written = 0
+        self._flushes = 0
+        self._busy = 0.0   # Zeit in add/flush
+
+    def add(self, coin: str, decision: str, actual_percent: float | int, *,
+            horizon_days: Optional[int] = None, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        t = time.perf_counter()
+        res = judge_decision(coin, decision, actual_percent,
+                             horizon_days=self.default_horizon_days if horizon_days is None else horizon_days,
+                             meta=meta)
+        self._pending.append(res)
+        self._busy += time.perf_counter() - t
+        return res
+
+    def append_raw(self, record: Dict[str, Any]) -> None:
+        """Fertigen Eintrag (anderes Format, z. B. learn_scheduler) mit in die Transaktion nehmen."""
+        self._pending.append(record)
+
+    def extend(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.add(it.get("coin", ""), it.get("decision", ""), it.get("actual_percent", 0),
+                         horizon_days=it.get("horizon_days"), meta=it.get("meta"))
+                for it in items]
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Schreibt alle gesammelten Einträge (ein Lesen + ein atomarer Schreibvorgang)."""
+        if not self._pending:
+            return 0
+        t = time.perf_counter()
+        _append_records(self.path, self._pending)
+        n = len(self._pending)
+        self._pending = []
+        self._written += n
+        self._flushes += 1
+        self._busy += time.perf_counter() - t
+        return n
+
+    def discard(self) -> int:
+        n = len(self._pending)
+        self._pending = []
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self._written,
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+            "seconds": round(self._busy, 4),
+            "items_per_sec": round(self._written / self._busy, 1) if self._busy > 0 else None,
+        }
+
+    def __enter__(self) -> "LearnBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+        return False
+
 # Optional: Bulk-Helper, falls du mehrere Entscheidungen in einem Rutsch bewerten willst
 def learn_bulk(items: List[Dict[str, Any]],
                *,
@@ -102,15 +205,11 @@ def learn_bulk(items: List[Dict[str, Any]],
     items: Liste von Dicts, jedes mit mindestens coin, decision, actual_percent
     Beispiel-Item:
       {"coin": "BTC", "decision": "buy", "actual_percent": 0.08, "horizon_days": 7, "meta": {...}}
+    Alle Ergebnisse werden gesammelt und mit einem Schreibvorgang übernommen.
     """
-    results: List[Dict[str, Any]] = []
-    for it in items:
-        res = learn_from_decision(
-            it.get("coin", ""),
-            it.get("decision", ""),
-            it.get("actual_percent", 0),
-            horizon_days=it.get("horizon_days", default_horizon_days),
-            meta=it.get("meta"),
-        )
-        results.append(res)
+    with LearnBatch(default_horizon_days=default_horizon_days) as batch:
+        results = batch.extend(items)
+    st = batch.stats()
+    if st["items"]:
+        print(f"[AutoLearn] {st['items']} Einträge in {st['seconds']}s ({st['items_per_sec']}/s)")
     return results
@@ -0,0 +1,354 @@
+# backtest.py — Backtest der make_trade_decision-Schwellen über die komplette Preis-Historie
+# Preise aus history.json ({date: {COIN: EUR}}) als Matrix [Zeit, Coins]; Prozent-Änderung,
+# Marktstimmung und BUY/SELL/HOLD werden mit NumPy für alle Coins und Zeitpunkte auf einmal
+# berechnet. Die Ausführung folgt trading.simulate_trade (BUY: 30 % des Guthabens, wenn
+# Guthaben > 10 €; SELL: ganze Position; Rundung wie dort) – pro Zeitschritt werden nur
+# die Coins angefasst, die tatsächlich handeln. Mit fills=FillModel (fill_model.py) werden
+# stattdessen Gebühren, Slippage und Lot-Größen berücksichtigt.
+
+from __future__ import annotations
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from feature_store import epoch_to_iso, history_series
+from thresholds import decision_thresholds
+
+HISTORY_FILE = "history.json"
+REPORT_FILE = "backtest_report.json"
+
+HOLD, BUY, SELL = 0, 1, 2
+ACTIONS = ("HOLD", "BUY", "SELL")
+SENTIMENTS = ("neutral", "bullish", "bearish")
+
+START_BALANCE = 1000.0
+BUY_FRACTION = 0.3      # wie simulate_trade
+MIN_BALANCE = 10.0      # BUY nur bei Guthaben > 10 €
+BREADTH_PCT = 2.0       # sentiment="breadth": Median-Änderung > +2 % bullish, < -2 % bearish
+
+
+# ---------- Daten ----------
+def load_prices(history: Any = None, coins: Optional[Sequence[str]] = None
+                ) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    history.json → (epochs [T], coins [C], prices [T, C] in EUR).
+    Gemeinsame Zeitachse aller Coins; Lücken werden vorwärts aufgefüllt, vor dem ersten
+    Kurs eines Coins steht NaN.
+    """
+    if history is None:
+        try:
+            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except Exception:
+            history = {}
+    series = history_series(history)
+    names = sorted(series) if coins is None else [c for c in coins if c in series]
+    if not names:
+        return np.empty(0, dtype=np.int64), [], np.empty((0, 0))
+
+    epochs = np.unique(np.concatenate([np.asarray(series[c][0], dtype=np.int64) for c in names]))
+    prices = np.full((len(epochs), len(names)), np.nan)
+    for j, coin in enumerate(names):
+        eps, cls = series[coin]
+        prices[np.searchsorted(epochs, eps), j] = cls
+    return epochs, names, _ffill(prices)
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    T = a.shape[0]
+    idx = np.where(~np.isnan(a), np.arange(T)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return a[idx, np.arange(a.shape[1])]
+
+
+# ---------- Signale ----------
+def percent_change(prices: np.ndarray, lookback: int = 1) -> np.ndarray:
+    """Änderung in % gegenüber dem Kurs `lookback` Schritte vorher (wie get_profit_estimates: 2 Nachkommastellen)."""
+    pct = np.full(prices.shape, np.nan)
+    if lookback < len(prices):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            old = prices[:-lookback]
+            pct[lookback:] = np.where(old > 0, (prices[lookback:] - old) / old * 100.0, np.nan)
+    return np.round(pct, 2)
+
+
+def market_sentiment(pct: np.ndarray, mode: Any = "neutral") -> np.ndarray:
+    """
+    Marktstimmung je Zeitschritt als Code (Index in SENTIMENTS).
+    mode: "neutral" | "bullish" | "bearish" (fest), "breadth" (aus der Median-Änderung
+    aller Coins) oder ein Array [T] mit Codes/Namen.
+    """
+    T = pct.shape[0]
+    if isinstance(mode, str) and mode in SENTIMENTS:
+        return np.full(T, SENTIMENTS.index(mode), dtype=np.int8)
+    if isinstance(mode, str) and mode == "breadth":
+        out = np.zeros(T, dtype=np.int8)
+        valid = ~np.isnan(pct).all(axis=1)
+        med = np.zeros(T)
+        med[valid] = np.nanmedian(pct[valid], axis=1)
+        out[med > BREADTH_PCT] = SENTIMENTS.index("bullish")
+        out[med < -BREADTH_PCT] = SENTIMENTS.index("bearish")
+        return out
+    arr = np.asarray(mode)
+    if arr.dtype.kind in "US":
+        arr = np.asarray([SENTIMENTS.index(s) if s in SENTIMENTS else 0 for s in arr.tolist()])
+    if arr.shape != (T,):
+        raise ValueError(f"Stimmung braucht {T} Werte, nicht {arr.shape}")
+    return arr.astype(np.int8)
+
+
+def decide(pct: np.ndarray, sentiment: np.ndarray, thresholds: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """make_trade_decision für alle Zeitpunkte/Coins: Codes HOLD/BUY/SELL [T, C]."""
+    th = {**decision_thresholds(), **(thresholds or {})}
+    s = np.asarray(sentiment)[:, None]
+    bull, bear = s == SENTIMENTS.index("bullish"), s == SENTIMENTS.index("bearish")
+    neut = ~bull & ~bear
+    valid = ~np.isnan(pct)
+    p = np.nan_to_num(pct)
+
+    sell = (bull & (p > th["BULLISH_SELL_PCT"])) | (bear & (p > th["BEARISH_SELL_PCT"])) \
+        | (neut & (p > th["NEUTRAL_SELL_PCT"]))
+    hold = (bull & (p < th["BULLISH_HOLD_FLOOR_PCT"])) | bear | (neut & (p < th["NEUTRAL_HOLD_FLOOR_PCT"]))
+    out = np.where(sell, SELL, np.where(hold, HOLD, BUY)).astype(np.int8)
+    out[~valid] = HOLD   # kein Vergleichskurs → live übersprungen
+    return out
+
+
+# ---------- Ausführung ----------
+def simulate(prices: np.ndarray, decisions: np.ndarray, start_balance: float = START_BALANCE,
+             fills: Any = None) -> Dict[str, Any]:
+    """
+    Führt die Entscheidungen Schritt für Schritt aus (Coin-Reihenfolge = Spalten), Regeln
+    und Rundung wie trading.simulate_trade. Rückgabe: Guthaben-/Equity-Kurve, Bestände,
+    Einstand, realisierte P&L je Coin, Anzahl Käufe/Verkäufe.
+    fills: fill_model.FillModel über dieselben Spalten → _simulate_fills.
+    """
+    if fills is not None:
+        return _simulate_fills(prices, decisions, start_balance, fills)
+    T, C = prices.shape
+    px = np.nan_to_num(prices)
+    holdings = np.zeros(C)          # für die Equity je Schritt (Skalarprodukt)
+    hold = [0.0] * C                # Einzelbuchungen mit Python-Floats (schnelles round)
+    cost = [0.0] * C
+    realized = [0.0] * C
+    balance_curve = np.empty(T)
+    equity = np.empty(T)
+    bal = float(start_balance)
+    n_buys = n_sells = 0
+
+    for t in range(T):
+        d, p = decisions[t], px[t]
+        sells = np.flatnonzero((d == SELL) & (p > 0) & (holdings > 0)).tolist()
+        buys = np.flatnonzero((d == BUY) & (p > 0)).tolist() if bal > MIN_BALANCE or sells else []
+        if sells or buys:
+            pl = p.tolist()
+            si = bi = 0
+            while True:
+                ns = sells[si] if si < len(sells) else C
+                if bi < len(buys) and buys[bi] < ns:
+                    if bal > MIN_BALANCE:
+                        j = buys[bi]
+                        price = pl[j]
+                        qty = round((bal * BUY_FRACTION) / price, 6)
+                        hold[j] = holdings[j] = round(hold[j] + qty, 6)
+                        cost[j] += qty * price
+                        bal = round(bal - qty * price, 2)
+                        n_buys += 1
+                        bi += 1
+                    else:   # Guthaben erschöpft: Käufe bis zum nächsten Verkauf entfallen
+                        bi = bisect_left(buys, ns, bi)
+                    continue
+                if si >= len(sells):
+                    break
+                proceeds = hold[ns] * pl[ns]
+                bal = round(bal + proceeds, 2)
+                realized[ns] += proceeds - cost[ns]
+                cost[ns] = 0.0
+                hold[ns] = holdings[ns] = 0.0
+                n_sells += 1
+                si += 1
+        balance_curve[t] = bal
+        equity[t] = bal + float(holdings @ p)
+
+    return {
+        "balance": balance_curve,
+        "equity": equity,
+        "holdings": holdings,
+        "cost": np.asarray(cost),
+        "realized": np.asarray(realized),
+        "n_buys": n_buys,
+        "n_sells": n_sells,
+    }
+
+
+def _simulate_fills(prices: np.ndarray, decisions: np.ndarray, start_balance: float, fills: Any
+                    ) -> Dict[str, Any]:
+    """Wie simulate, aber je Zeitschritt alle Fills auf einmal über FillModel.execute_step."""
+    T, C = prices.shape
+    px = np.nan_to_num(prices)
+    holdings = np.zeros(C)
+    cost = np.zeros(C)
+    realized = np.zeros(C)
+    balance_curve = np.empty(T)
+    equity = np.empty(T)
+    bal = float(start_balance)
+    n_buys = n_sells = rejected = 0
+    fees = slippage = 0.0
+
+    active = np.flatnonzero((decisions != HOLD).any(axis=1))
+    last = 0
+    for t in active.tolist():
+        if t > last:   # Schritte ohne Orders: nur Bewertung
+            balance_curve[last:t] = bal
+            equity[last:t] = bal + px[last:t] @ holdings
+        before = holdings.copy()
+        r = fills.execute_step(bal, holdings, decisions[t], px[t], sell=SELL, buy=BUY)
+        bal = r["balance"]
+        if r["sold"] is not None:
+            j, s = r["sold"]
+            share = np.where(before[j] > 0, s["qty"] / np.where(before[j] > 0, before[j], 1.0), 0.0)
+            realized[j] += s["proceeds"] - cost[j] * share
+            cost[j] -= cost[j] * share
+        if r["bought"] is not None:
+            j, b = r["bought"]
+            cost[j] += b["cost"]
+        n_buys += r["n_buys"]
+        n_sells += r["n_sells"]
+        rejected += r["rejected"]
+        fees += r["fees"]
+        slippage += r["slippage"]
+        balance_curve[t] = bal
+        equity[t] = bal + float(holdings @ px[t])
+        last = t + 1
+    if last < T:
+        balance_curve[last:] = bal
+        equity[last:] = bal + px[last:] @ holdings
+
+    return {
+        "balance": balance_curve,
+        "equity": equity,
+        "holdings": holdings,
+        "cost": cost,
+        "realized": realized,
+        "n_buys": n_buys,
+        "n_sells": n_sells,
+        "rejected": rejected,
+        "fees": fees,
+        "slippage": slippage,
+    }
+
+
+def evaluate(prices: np.ndarray, pct: np.ndarray, sentiment: np.ndarray,
+             thresholds: Optional[Dict[str, float]] = None,
+             start_balance: float = START_BALANCE, fills: Any = None) -> Dict[str, Any]:
+    """Kompakte Kennzahlen eines Laufs (für Parameter-Suchen, pct/Stimmung vorberechnet)."""
+    sim = simulate(prices, decide(pct, sentiment, thresholds), start_balance, fills)
+    final = float(sim["equity"][-1]) if len(sim["equity"]) else float(start_balance)
+    return {
+        "final_equity": round(final, 2),
+        "return_pct": round((final / start_balance - 1.0) * 100.0, 2) if start_balance else 0.0,
+        "max_drawdown_pct": max_drawdown_pct(sim["equity"]),
+        "n_trades": sim["n_buys"] + sim["n_sells"],
+    }
+
+
+def max_drawdown_pct(equity: np.ndarray) -> float:
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, (equity - peak) / peak, 0.0)
+    return round(float(-dd.min()) * 100.0, 2)
+
+
+# ---------- Einstieg ----------
+def backtest(thresholds: Optional[Dict[str, float]] = None, *,
+             data: Optional[Tuple[np.ndarray, List[str], np.ndarray]] = None,
+             history: Any = None, lookback: int = 1, sentiment: Any = "neutral",
+             start_balance: float = START_BALANCE, curves: bool = False,
+             fills: Any = None) -> Dict[str, Any]:
+    """
+    Ein Backtest-Lauf. thresholds überschreibt einzelne Werte aus thresholds.py;
+    data = load_prices(...) kann für viele Läufe wiederverwendet werden.
+    fills=True nutzt fill_model.FillModel mit den gecachten Exchange-Filtern,
+    alternativ ein fertiges FillModel über dieselben Coins.
+    """
+    t0 = time.perf_counter()
+    epochs, coins, prices = data if data is not None else load_prices(history)
+    th = {**decision_thresholds(), **(thresholds or {})}
+    if not len(coins) or len(epochs) <= lookback:
+        return {"ok": False, "msg": "Zu wenig Historie für den Backtest.", "thresholds": th}
+
+    pct = percent_change(prices, lookback)
+    dec = decide(pct, market_sentiment(pct, sentiment), th)
+    if fills is True:
+        from fill_model import FillModel
+        fills = FillModel(coins)
+    sim = simulate(prices, dec, start_balance, fills)
+
+    eq = sim["equity"]
+    final = float(eq[-1])
+    open_value = float(sim["holdings"] @ np.nan_to_num(prices[-1]))
+    pnl_coin = sim["realized"] + sim["holdings"] * np.nan_to_num(prices[-1]) - sim["cost"]
+    top = np.argsort(pnl_coin)
+    res: Dict[str, Any] = {
+        "ok": True,
+        "thresholds": th,
+        "sentiment": sentiment if isinstance(sentiment, str) else "custom",
+        "lookback": lookback,
+        "from": epoch_to_iso(int(epochs[0])),
+        "to": epoch_to_iso(int(epochs[-1])),
+        "steps": int(len(epochs)),
+        "coins": len(coins),
+        "start_balance": round(float(start_balance), 2),
+        "final_balance": round(float(sim["balance"][-1]), 2),
+        "final_equity": round(final, 2),
+        "open_positions_value": round(open_value, 2),
+        "pnl": round(final - start_balance, 2),
+        "realized_pnl": round(float(sim["realized"].sum()), 2),
+        "return_pct": round((final / start_balance - 1.0) * 100.0, 2) if start_balance else 0.0,
+        "max_drawdown_pct": max_drawdown_pct(eq),
+        "n_buys": sim["n_buys"],
+        "n_sells": sim["n_sells"],
+        "best_coins": [(coins[j], round(float(pnl_coin[j]), 2)) for j in top[::-1][:5] if pnl_coin[j] > 0],
+        "worst_coins": [(coins[j], round(float(pnl_coin[j]), 2)) for j in top[:5] if pnl_coin[j] < 0],
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    if fills is not None:
+        res["fees"] = round(sim["fees"], 2)
+        res["slippage"] = round(sim["slippage"], 2)
+        res["rejected_orders"] = sim["rejected"]
+    if curves:
+        res["epochs"] = epochs
+        res["equity"] = eq
+        res["balance"] = sim["balance"]
+    return res
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Backtest der Entscheidungs-Schwellen (logic.make_trade_decision)")
+    ap.add_argument("--sentiment", default="neutral", help="neutral | bullish | bearish | breadth")
+    ap.add_argument("--lookback", type=int, default=1, help="Vergleichskurs n Schritte zurück (Standard: 1 Snapshot)")
+    ap.add_argument("--balance", type=float, default=START_BALANCE, help="Startguthaben in EUR")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=WERT",
+                    help="Schwelle überschreiben, z. B. --set NEUTRAL_SELL_PCT=15")
+    ap.add_argument("--save", action="store_true", help=f"Ergebnis nach {REPORT_FILE} schreiben")
+    ap.add_argument("--fills", action="store_true", help="Gebühren, Slippage und Lot-Größen (fill_model.py)")
+    args = ap.parse_args()
+    overrides = {}
+    for item in args.set:
+        k, _, v = item.partition("=")
+        overrides[k.strip()] = float(v)
+    rep = backtest(overrides, lookback=args.lookback, sentiment=args.sentiment, start_balance=args.balance,
+                   fills=args.fills or None)
+    print(json.dumps(rep, ensure_ascii=False, indent=2))
+    if args.save and rep.get("ok"):
+        tmp = f"{REPORT_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, REPORT_FILE)
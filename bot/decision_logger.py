@@ -8,6 +8,8 @@ import tempfile
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Tuple, Union, Optional
 
+from pending_index import file_sig, note_appended
+
 DECISION_LOG_FILE = "decision_log.json"
 
 DecisionItem = Dict[str, Any]
@@ -119,7 +121,10 @@ def log_trade_decisions(decisions: DecisionsInput,
         print("[DecisionLog] Keine validen Entscheidungen erhalten.")
         return 0
 
+    before_sig = file_sig(DECISION_LOG_FILE)
     log = _load_json_list(DECISION_LOG_FILE)
+    first_new = len(log)
+    merged_pos = []
 
     date_str = _utc_date()
     ts_iso = _utc_iso()
@@ -170,6 +175,8 @@ def log_trade_decisions(decisions: DecisionsInput,
             if k in index:
                 pos = index[k]
                 log[pos] = _merge_entry(log[pos], entry_base)
+                if pos < first_new:
+                    merged_pos.append(pos)
                 changed += 1
                 continue
             else:
@@ -179,6 +186,10 @@ def log_trade_decisions(decisions: DecisionsInput,
         changed += 1
 
     _atomic_write_json(DECISION_LOG_FILE, log)
+    try:
+        note_appended(log, before_sig, first_new, merged_pos)
+    except Exception as e:
+        print(f"[DecisionLog] Pending-Index nicht aktualisiert: {e}")
     print(f"📥 Trade-Entscheidungen geloggt ({date_str}): {changed} Einträge")
     return changed
 
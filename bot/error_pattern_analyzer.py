@@ -2,8 +2,10 @@
 # Stand: 2025-08-11
 
 from __future__ import annotations
+import hashlib
 import json
 import os
+import tempfile
 from collections import defaultdict
 from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, List, Optional, Tuple
@@ -11,6 +13,14 @@ from typing import Any, Dict, List, Optional, Tuple
 # Unterstütze mehrere potenzielle Dateinamen
 LOGFILES = ("log_simulation.json", "simulation_log.json")
 
+# Inkrementeller Modus: Zähler je UTC-Tag, Hochwassermarke je Quelldatei
+CHECKPOINT_FILE = "error_patterns.json"
+CHECKPOINT_VERSION = 2
+SEEN_DAYS = 14            # Duplikat-Schlüssel nur für die jüngsten n Tage aufheben
+CHECKPOINT_CUTOFF = 0.0   # Zähler gelten für fail_success_cutoff_pct = 0.0
+ACTIONS = ("buy", "sell", "hold")
+UNDATED = ""
+
 # ---- Helpers ----
 def _parse_iso(ts: Any) -> Optional[datetime]:
     if not isinstance(ts, str):
@@ -64,39 +74,150 @@ def _load_logs() -> List[Dict[str, Any]]:
                 seen.add(key)
     return rows
 
-# ---- Kernanalyse ----
-def analyze_errors_struct(
-    *,
-    logfile: Optional[str] = None,
-    window_days: Optional[int] = None,
-    min_errors_threshold: int = 2,
-    min_attempts_per_coin: int = 1,
-    fail_success_cutoff_pct: float = 0.0,
-) -> Dict[str, Any]:
+def _row_key(e: Dict[str, Any]) -> str:
+    return f"{str(e.get('coin')).upper()}|{e.get('timestamp') or e.get('date')}"
+
+def _head_hash(rows: List[Dict[str, Any]]) -> Optional[str]:
+    if not rows:
+        return None
+    return hashlib.sha1(json.dumps(rows[0], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _file_sig(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+# ---- Inkrementelle Zähler ----
+class ErrorCounters:
     """
-    Strukturierte Analyse der Fehlmuster.
-    Gibt IMMER die Keys: ok, found, offenders, coins, params zurück.
+    Persistierte Zähler {UTC-Tag: {COIN: [n, fails, buy_n, buy_f, sell_n, sell_f, hold_n, hold_f]}}.
+    Je Quelldatei: Signatur, Zeilen-Hochwassermarke und Hash der ersten Zeile. Wurde nur
+    angehängt, werden nur die neuen Zeilen gefaltet; sonst (Pruning) kompletter Neuaufbau.
+    Duplikate (coin+timestamp) über alle Dateien wie in _load_logs; die Schlüssel liegen je
+    Tag und werden beim Speichern auf die SEEN_DAYS jüngsten Tage gekürzt (beim Neuaufbau
+    wird ohnehin komplett dedupliziert).
     """
-    rows = _load_json(logfile) if logfile else _load_logs()
 
-    params = {
-        "window_days": window_days,
-        "min_errors_threshold": min_errors_threshold,
-        "min_attempts_per_coin": min_attempts_per_coin,
-        "fail_success_cutoff_pct": fail_success_cutoff_pct,
-        "source": logfile or ",".join(LOGFILES),
-    }
+    def __init__(self, path: str = CHECKPOINT_FILE):
+        self.path = path
+        self._reset()
+        self._load()
 
-    if not rows:
-        return {
-            "ok": True,
-            "found": False,
-            "offenders": [],
-            "coins": {},
-            "summary": "Keine Simulationsdaten.",
-            "params": params,
-        }
+    def _reset(self) -> None:
+        self.sources: Dict[str, Dict[str, Any]] = {p: {"sig": None, "rows": 0, "head": None} for p in LOGFILES}
+        self.days: Dict[str, Dict[str, List[int]]] = {}
+        self.seen: Dict[str, set] = {}
 
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except Exception:
+            return
+        if not isinstance(obj, dict) or obj.get("version") != CHECKPOINT_VERSION:
+            return
+        for p in LOGFILES:
+            src = (obj.get("sources") or {}).get(p)
+            if isinstance(src, dict):
+                self.sources[p].update(src)
+        self.days = obj.get("days") or {}
+        self.seen = {day: set(keys) for day, keys in (obj.get("seen") or {}).items()}
+
+    def _prune_seen(self) -> None:
+        dated = sorted(day for day in self.seen if day != UNDATED)
+        if not dated:
+            return
+        cutoff = (datetime.strptime(dated[-1], "%Y-%m-%d") - timedelta(days=SEEN_DAYS)).strftime("%Y-%m-%d")
+        for day in dated:
+            if day >= cutoff:
+                break
+            del self.seen[day]
+
+    def save(self) -> None:
+        self._prune_seen()
+        d = os.path.dirname(self.path) or "."
+        data = {"version": CHECKPOINT_VERSION, "sources": self.sources,
+                "days": self.days, "seen": {day: list(keys) for day, keys in self.seen.items()}}
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+            json.dump(data, tf, ensure_ascii=False)
+            tmp = tf.name
+        os.replace(tmp, self.path)
+
+    def _fold(self, rows: List[Dict[str, Any]]) -> None:
+        for e in rows:
+            dt = _parse_iso(e.get("timestamp") or e.get("date"))
+            if dt is not None and dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            day = dt.astimezone(timezone.utc).strftime("%Y-%m-%d") if dt else UNDATED
+            key = _row_key(e)
+            keys = self.seen.setdefault(day, set())
+            if key in keys:
+                continue
+            keys.add(key)
+            coin = str(e.get("coin", "???")).upper()
+            decision = _norm_decision(e.get("entscheidung") or e.get("decision"))
+            success_pct = _norm_success(e.get("success", e.get("pnl", e.get("performance", e.get("return")))))
+            fail = 1 if success_pct < CHECKPOINT_CUTOFF else 0
+            c = self.days.setdefault(day, {}).setdefault(coin, [0] * (2 + 2 * len(ACTIONS)))
+            c[0] += 1
+            c[1] += fail
+            if decision in ACTIONS:
+                k = 2 + 2 * ACTIONS.index(decision)
+                c[k] += 1
+                c[k + 1] += fail
+
+    def sync(self) -> bool:
+        """Quellen abgleichen; True, wenn sich etwas geändert hat."""
+        sigs = {p: _file_sig(p) for p in LOGFILES}
+        changed = [p for p in LOGFILES if sigs[p] != self.sources[p]["sig"]]
+        if not changed:
+            return False
+        loaded = {p: _load_json(p) for p in changed}
+        appended = all(
+            self.sources[p]["sig"] is not None
+            and len(loaded[p]) >= self.sources[p]["rows"]
+            and (self.sources[p]["rows"] == 0 or _head_hash(loaded[p]) == self.sources[p]["head"])
+            for p in changed
+        )
+        if appended:
+            for p in changed:
+                self._fold(loaded[p][self.sources[p]["rows"]:])
+        else:
+            self._reset()
+            for p in LOGFILES:
+                loaded.setdefault(p, _load_json(p))
+                self._fold(loaded[p])
+        for p, rows in loaded.items():
+            self.sources[p] = {"sig": sigs[p], "rows": len(rows), "head": _head_hash(rows)}
+        return True
+
+    def totals(self, window_days: Optional[int] = None) -> Dict[str, List[int]]:
+        """Summen je Coin; Fenster in ganzen UTC-Tagen, undatierte Zeilen zählen immer."""
+        cutoff_day = None
+        if window_days and window_days > 0:
+            cutoff_day = (datetime.now(timezone.utc) - timedelta(days=window_days)).strftime("%Y-%m-%d")
+        out: Dict[str, List[int]] = {}
+        for day, coins in self.days.items():
+            if cutoff_day is not None and day != UNDATED and day < cutoff_day:
+                continue
+            for coin, c in coins.items():
+                acc = out.setdefault(coin, [0] * len(c))
+                for i, v in enumerate(c):
+                    acc[i] += v
+        return out
+
+def get_counters() -> ErrorCounters:
+    ec = ErrorCounters()
+    if ec.sync():
+        ec.save()
+    return ec
+
+# ---- Kernanalyse ----
+def _scan_stats(rows: List[Dict[str, Any]], window_days: Optional[int],
+                fail_success_cutoff_pct: float) -> Dict[str, Any]:
+    """Volle Auswertung über alle Zeilen (explizite Logdatei / abweichender Cutoff)."""
     # Zeitraumfilter (optional)
     if window_days and window_days > 0:
         cutoff = datetime.now(timezone.utc) - timedelta(days=window_days)
@@ -128,6 +249,54 @@ def analyze_errors_struct(
             s["fails"] += 1
             if decision in ("buy", "sell", "hold"):
                 s["by_action"][decision]["f"] += 1
+    return stats
+
+def analyze_errors_struct(
+    *,
+    logfile: Optional[str] = None,
+    window_days: Optional[int] = None,
+    min_errors_threshold: int = 2,
+    min_attempts_per_coin: int = 1,
+    fail_success_cutoff_pct: float = 0.0,
+    incremental: bool = True,
+) -> Dict[str, Any]:
+    """
+    Strukturierte Analyse der Fehlmuster.
+    Gibt IMMER die Keys: ok, found, offenders, coins, params zurück.
+    incremental: Zähler aus error_patterns.json (nur neue Zeilen werden gefaltet);
+    gilt für die Standard-Logs und Cutoff 0.0, sonst volle Auswertung.
+    """
+    use_counters = incremental and not logfile and float(fail_success_cutoff_pct) == CHECKPOINT_CUTOFF
+
+    params = {
+        "window_days": window_days,
+        "min_errors_threshold": min_errors_threshold,
+        "min_attempts_per_coin": min_attempts_per_coin,
+        "fail_success_cutoff_pct": fail_success_cutoff_pct,
+        "source": logfile or ",".join(LOGFILES),
+        "incremental": use_counters,
+    }
+
+    if use_counters:
+        stats = {}
+        for coin, c in get_counters().totals(window_days).items():
+            stats[coin] = {
+                "count": c[0], "fails": c[1],
+                "by_action": {act: {"c": c[2 + 2 * i], "f": c[3 + 2 * i]} for i, act in enumerate(ACTIONS)},
+            }
+    else:
+        stats = _scan_stats(_load_json(logfile) if logfile else _load_logs(),
+                            window_days, fail_success_cutoff_pct)
+
+    if not stats:
+        return {
+            "ok": True,
+            "found": False,
+            "offenders": [],
+            "coins": {},
+            "summary": "Keine Simulationsdaten.",
+            "params": params,
+        }
 
     coins_out: Dict[str, Any] = {}
     offenders: List[Tuple[str, float, int, int]] = []
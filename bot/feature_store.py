@@ -0,0 +1,280 @@
+# feature_store.py — persistenter Feature-Store je (Coin, Zeitstempel)
+# Rechnet die Preis-Features (RSI/EMA-MACD/Returns) inkrementell, sobald neue
+# history.json-Punkte auftauchen, und legt sie spaltenweise als .npz je Coin ab.
+# Training (ki_features.build_dataset) und Live-Scoring (logic) lesen von hier –
+# schon gesehene Zeitstempel werden nie neu berechnet.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ki_features import _rsi, _ema, _pct, load_json
+
+STORE_DIR = Path("models") / "feature_store"
+META_FILE = "_meta.json"
+SCHEMA_VERSION = 1
+
+# Spalten je Coin (neben "ts" = Epoch-Sekunden UTC)
+PRICE_FEATURES = ("close", "rsi", "macd", "ret_1h", "ret_6h", "ret_24h")
+LOOKBACK = 59   # längstes Fenster: EMA26 über die letzten 60 Preise
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+# ---------- Feature-Definition (einzige Quelle) ----------
+def price_features(closes, i) -> List[float]:
+    """Preis-Features am Index i einer Close-Serie (Fenster wie im ursprünglichen build_dataset)."""
+    curr = closes[i]
+    w30 = closes[max(0, i-29):i+1]
+    rsi = _rsi(w30)                                    # RSI(14) aus letzten 30
+    ema12 = _ema(w30, 12)
+    ema26 = _ema(closes[max(0, i-59):i+1], 26)
+    macd = (ema12 or curr) - (ema26 or curr)
+    ret_1h = _pct(curr, closes[i-1]) if i >= 1 else 0
+    ret_6h = _pct(curr, closes[i-6]) if i >= 6 else 0
+    ret_24h = _pct(curr, closes[i-24]) if i >= 24 else 0
+    return [curr, rsi or 50.0, macd, ret_1h, ret_6h, ret_24h]
+
+
+def _features_range(closes, first):
+    return [price_features(closes, i) for i in range(first, len(closes))]
+
+
+def _features_range_shared(shared_path, task):
+    """Worker: Kontext + neue Preise eines Coins per mmap lesen."""
+    from parallel_tools import attach_arrays
+    start, end, first = task
+    closes = attach_arrays(shared_path)["closes"][start:end].tolist()
+    return _features_range(closes, first)
+
+
+# ---------- History normalisieren ----------
+def _to_epoch(raw: str) -> Optional[int]:
+    try:
+        dt = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((dt - _EPOCH).total_seconds())
+
+
+def epoch_to_iso(e: int) -> str:
+    return (_EPOCH + timedelta(seconds=int(e))).isoformat()
+
+
+def history_series(history: Any) -> Dict[str, Tuple[List[int], List[float]]]:
+    """{date_iso: {COIN: price}} → {COIN: ([epoch...], [close...])}, zeitlich sortiert."""
+    out: Dict[str, Tuple[List[int], List[float]]] = {}
+    if not isinstance(history, dict):
+        return out
+    stamped = []
+    for t, snap in history.items():
+        e = _to_epoch(t)
+        if e is not None and isinstance(snap, dict):
+            stamped.append((e, snap))
+    stamped.sort(key=lambda x: x[0])
+    for e, snap in stamped:
+        for coin, p in snap.items():
+            if p is None:
+                continue
+            try:
+                p = float(p)
+            except Exception:
+                continue
+            eps, cls = out.setdefault(coin, ([], []))
+            eps.append(e)
+            cls.append(p)
+    return out
+
+
+# ---------- Store ----------
+class FeatureStore:
+    def __init__(self, root: Path = STORE_DIR):
+        self.root = Path(root)
+        self._cache: Dict[str, Dict[str, np.ndarray]] = {}
+        self._meta: Optional[Dict[str, Any]] = None
+
+    # --- I/O ---
+    def _path(self, coin: str) -> Path:
+        return self.root / f"{coin}.npz"
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            m = load_json(self.root / META_FILE)
+            if not isinstance(m, dict) or m.get("schema_version") != SCHEMA_VERSION:
+                m = {"schema_version": SCHEMA_VERSION, "columns": list(PRICE_FEATURES),
+                     "source": None, "coins": {}}
+                self._cache.clear()
+            self._meta = m
+        return self._meta
+
+    def _save_meta(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=self.root, suffix=".tmp", encoding="utf-8") as tf:
+            json.dump(self.meta, tf, ensure_ascii=False, indent=2)
+            tmp = tf.name
+        os.replace(tmp, self.root / META_FILE)
+
+    def _save_coin(self, coin: str, cols: Dict[str, np.ndarray]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=self.root, suffix=".tmp") as tf:
+            np.savez(tf, **cols)
+            tmp = tf.name
+        os.replace(tmp, self._path(coin))
+        self._cache[coin] = cols
+
+    def load(self, coin: str) -> Optional[Dict[str, np.ndarray]]:
+        """Alle Zeilen eines Coins: {"ts": int64[n], "close": float64[n], ...}."""
+        if coin in self._cache:
+            return self._cache[coin]
+        if coin not in self.meta["coins"] or not self._path(coin).exists():
+            return None
+        try:
+            with np.load(self._path(coin)) as z:
+                cols = {k: z[k] for k in ("ts",) + PRICE_FEATURES}
+        except Exception:
+            return None
+        self._cache[coin] = cols
+        return cols
+
+    def coins(self) -> List[str]:
+        return sorted(self.meta["coins"].keys())
+
+    # --- Lesen ---
+    def latest(self, coin: str) -> Optional[Dict[str, Any]]:
+        cols = self.load(coin)
+        if cols is None or len(cols["ts"]) == 0:
+            return None
+        row = {k: float(cols[k][-1]) for k in PRICE_FEATURES}
+        row["ts"] = int(cols["ts"][-1])
+        row["n"] = int(len(cols["ts"]))
+        return row
+
+    def matrix(self, coin: str, columns=PRICE_FEATURES) -> Optional[np.ndarray]:
+        cols = self.load(coin)
+        if cols is None:
+            return None
+        return np.column_stack([cols[c] for c in columns])
+
+    def close_matrix(self, coins: Optional[List[str]] = None, length: int = 100) -> Tuple[List[str], np.ndarray]:
+        """Letzte `length` Closes je Coin als Matrix [coins, length], links mit NaN aufgefüllt."""
+        coins = self.coins() if coins is None else [c for c in coins if c in self.meta["coins"]]
+        mat = np.full((len(coins), length), np.nan)
+        for i, coin in enumerate(coins):
+            cols = self.load(coin)
+            if cols is None:
+                continue
+            tail = cols["close"][-length:]
+            if len(tail):
+                mat[i, length - len(tail):] = tail
+        return coins, mat
+
+    # --- Schreiben ---
+    def update(self, history: Any, *, workers=None) -> Dict[str, int]:
+        """
+        Hängt Features für alle noch nicht gesehenen Zeitstempel an.
+        Nur der jeweils letzte Punkt eines Coins darf sich ändern (Tages-Merge im
+        live_logger) – dann wird genau diese Zeile ersetzt.
+        Rückgabe: {"coins": n, "added": neue Zeilen, "reused": vorhandene Zeilen}
+        """
+        series = history_series(history)
+        coins_meta = self.meta["coins"]
+        jobs = []   # (coin, stored_cols|None, keep, ctx_closes, new_eps, new_closes)
+        reused = 0
+        for coin in sorted(series):
+            eps, cls = series[coin]
+            info = coins_meta.get(coin)
+            last = info.get("last") if info else None
+            if last is None:
+                start = 0
+            else:
+                # erster Punkt nach dem letzten gespeicherten Zeitstempel
+                start = next((k for k in range(len(eps) - 1, -1, -1) if eps[k] <= last), -1) + 1
+                if start > 0 and eps[start - 1] == last and cls[start - 1] != info.get("last_close"):
+                    start -= 1   # letzter Punkt wurde überschrieben
+            if start >= len(eps):
+                reused += int(info.get("n", 0)) if info else 0
+                continue
+            stored = self.load(coin) if info else None
+            keep = 0
+            if stored is not None:
+                keep = len(stored["ts"])
+                if start < len(eps) and eps[start] == last:
+                    keep -= 1
+                reused += keep
+            ctx = stored["close"][max(0, keep - LOOKBACK):keep].tolist() if stored is not None else []
+            jobs.append((coin, stored, keep, ctx, eps[start:], cls[start:]))
+
+        if not jobs:
+            return {"coins": len(series), "added": 0, "reused": reused}
+
+        from parallel_tools import resolve_workers
+        workers = resolve_workers(workers)
+        if workers <= 1 or len(jobs) == 1:
+            parts = [_features_range(ctx + new_cls, len(ctx)) for _, _, _, ctx, _, new_cls in jobs]
+        else:
+            from parallel_tools import SharedArrays, run_sharded
+            tasks, flat, pos = [], [], 0
+            for _, _, _, ctx, _, new_cls in jobs:
+                seg = ctx + new_cls
+                tasks.append((pos, pos + len(seg), len(ctx)))
+                flat.extend(seg); pos += len(seg)
+            with SharedArrays({"closes": np.asarray(flat, dtype=np.float64)}) as shm:
+                parts = run_sharded(_features_range_shared, tasks, shm, workers=workers)
+
+        added = 0
+        for (coin, stored, keep, _, new_eps, new_cls), rows in zip(jobs, parts):
+            feats = np.asarray(rows, dtype=np.float64).reshape(len(rows), len(PRICE_FEATURES))
+            cols = {"ts": np.asarray(new_eps, dtype=np.int64)}
+            for j, c in enumerate(PRICE_FEATURES):
+                cols[c] = feats[:, j]
+            if stored is not None and keep > 0:
+                cols = {k: np.concatenate([stored[k][:keep], v]) for k, v in cols.items()}
+            self._save_coin(coin, cols)
+            coins_meta[coin] = {"n": int(len(cols["ts"])), "last": int(new_eps[-1]),
+                                "last_close": float(new_cls[-1])}
+            added += len(new_eps)
+        self._save_meta()
+        return {"coins": len(series), "added": added, "reused": reused}
+
+    def sync(self, history_path: str = "history.json", *, workers=None) -> Dict[str, int]:
+        """update() nur, wenn sich history.json seit dem letzten Sync geändert hat."""
+        try:
+            st = os.stat(history_path)
+            sig = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            return {"coins": 0, "added": 0, "reused": 0}
+        if self.meta.get("source") == sig:
+            return {"coins": len(self.meta["coins"]), "added": 0,
+                    "reused": sum(int(v.get("n", 0)) for v in self.meta["coins"].values())}
+        res = self.update(load_json(history_path), workers=workers)
+        self.meta["source"] = sig
+        self._save_meta()
+        return res
+
+
+_STORE: Optional[FeatureStore] = None
+
+
+def get_store() -> FeatureStore:
+    """Prozessweite Instanz (hält die geladenen Coins im Speicher)."""
+    global _STORE
+    if _STORE is None:
+        _STORE = FeatureStore()
+    return _STORE
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Feature-Store aus history.json aktualisieren")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    args = ap.parse_args()
+    print("[FeatureStore]", get_store().sync(workers=args.workers))
@@ -8,6 +8,11 @@ import tempfile
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from pending_index import file_sig, get_index
+from window_index import WindowIndex, _key as _epoch
+
 DECISION_LOG_FILE = "decision_log.json"
 HISTORY_FILE = "history.json"
 LEARNING_LOG_FILE = "learning_log.json"
@@ -52,23 +57,28 @@ def _parse_date_utc(date_str: str | None) -> Optional[datetime]:
     except Exception:
         return None
 
-def _nearest_price(history_idx: Dict[str, List[Tuple[datetime, float]]],
-                   coin: str,
-                   target_dt: datetime,
-                   tolerance_hours: float) -> Optional[Tuple[datetime, float]]:
-    rows = history_idx.get(coin.upper(), [])
-    if not rows:
-        return None
-    tol = timedelta(hours=float(tolerance_hours))
-    best: Optional[Tuple[datetime, float]] = None
-    best_delta = None
-    for ts, price in rows:
-        delta = abs(ts - target_dt)
-        if delta <= tol:
-            if best is None or delta < best_delta:
-                best = (ts, price)
-                best_delta = delta
-    return best
+def _asof_nearest(epochs: np.ndarray, targets: np.ndarray, tolerance_s: float) -> np.ndarray:
+    """
+    Vektorisierter As-of-Join: Index des nächstgelegenen Punkts je Ziel-Epoch
+    (|Δ| <= tolerance_s, bei Gleichstand der frühere), sonst -1. epochs aufsteigend.
+    """
+    n = len(epochs)
+    if n == 0 or len(targets) == 0:
+        return np.full(len(targets), -1, dtype=np.int64)
+    right = np.searchsorted(epochs, targets, side="left")     # erster Punkt >= Ziel
+    left = right - 1
+    has_left, has_right = left >= 0, right < n
+    left_c, right_c = np.where(has_left, left, 0), np.where(has_right, right, n - 1)
+    left_first = np.searchsorted(epochs, epochs[left_c], side="left")
+    d_left = np.where(has_left, targets - epochs[left_c], np.inf)
+    d_right = np.where(has_right, epochs[right_c] - targets, np.inf)
+    pick = np.where(d_left <= d_right, left_first, right_c)
+    return np.where(np.minimum(d_left, d_right) <= tolerance_s, pick, -1)
+
+def _epoch_index(history_idx: Dict[str, List[Tuple[datetime, float]]]) -> Dict[str, np.ndarray]:
+    """Sortiertes Epoch-Array je Coin (parallel zu den History-Zeilen)."""
+    return {c: np.fromiter((_epoch(ts) for ts, _ in rows), dtype=np.float64, count=len(rows))
+            for c, rows in history_idx.items()}
 
 def _build_history_index(history: List[Dict[str, Any]]) -> Dict[str, List[Tuple[datetime, float]]]:
     idx: Dict[str, List[Tuple[datetime, float]]] = {}
@@ -94,6 +104,25 @@ def _decision_time(entry: Dict[str, Any]) -> Optional[datetime]:
         return d
     return None
 
+def _decision_features(history_idx: Dict[str, List[Tuple[datetime, float]]],
+                       windows: Dict[str, WindowIndex],
+                       coin: str,
+                       dec_dt: datetime) -> Optional[List[float]]:
+    """ret_24h/vol_24h bis zur Entscheidung – Eingabe fürs Online-Modell."""
+    rows = history_idx.get(coin)
+    if not rows:
+        return None
+    try:
+        index = windows.get(coin)
+        if index is None:
+            index = windows[coin] = WindowIndex(rows)   # Prefix-Summen je Coin, einmal pro Lauf
+        r24, v24 = index.stats(dec_dt, hours=24)
+    except Exception:
+        return None
+    if r24 is None or v24 is None:
+        return None
+    return [r24, v24]
+
 def _normalize_percent(p_old: float, p_new: float) -> float:
     if p_old == 0:
         return 0.0
@@ -109,21 +138,37 @@ def run_feedback_loop(*,
     - tolerance_*_hours: wie weit um die relevanten Zeitpunkte wir Preise akzeptieren
     Rückgabe: Liste der ausgewerteten Einträge (coin, date/timestamp, success %).
     """
+    now_utc = datetime.now(timezone.utc)
+    cutoff = now_utc.timestamp() - int(horizon_days) * 86400.0
+
+    # Pending-Index: ohne fällige Entscheidungen gar nichts laden
+    pidx = get_index()
+    if pidx.fresh() and not pidx.has_due("feedback", cutoff):
+        return []
+
     decisions = _load_json_list(DECISION_LOG_FILE)
     history = _load_json_list(HISTORY_FILE)
-    learning_log = _load_json_list(LEARNING_LOG_FILE)
 
     if not decisions or not history:
         return []
+    pidx.ensure(decisions)
+    learning_log = _load_json_list(LEARNING_LOG_FILE)
+    learn_sig = file_sig(LEARNING_LOG_FILE)
+    learn_first_new = len(learning_log)
 
-    # History-Index je Coin → [(ts, price), ...]
+    # History-Index je Coin → [(ts, price), ...] + sortierte Epochen für den As-of-Join
     hidx = _build_history_index(history)
-    now_utc = datetime.now(timezone.utc)
+    eidx = _epoch_index(hidx)
+    windows: Dict[str, WindowIndex] = {}
 
     evaluated: List[Dict[str, Any]] = []
+    online_samples: List[Tuple[Optional[List[float]], float]] = []
     updated_any = False
 
-    for d in decisions:
+    # 1) Fällige Entscheidungen je Coin sammeln (nur die aus dem Pending-Index)
+    due: Dict[str, List[Tuple[int, datetime, datetime]]] = {}
+    for i in pidx.due("feedback", cutoff):
+        d = decisions[i]
         # Bereits ausgewertet? Dann überspringen
         status = (d.get("status") or "").lower()
         if status in ("evaluated", "closed", "done"):
@@ -140,25 +185,37 @@ def run_feedback_loop(*,
 
         # Zielzeitpunkt
         target_dt = dec_dt + timedelta(days=int(horizon_days))
-        if target_dt > now_utc:
-            # Noch nicht fällig
-            continue
-
-        # Einstiegspreis: vorhandene Felder nutzen, sonst aus History (nächster Preis um dec_dt)
-        base_price = d.get("price") or d.get("baseline_price")
-        if not isinstance(base_price, (int, float)):
-            nearest_base = _nearest_price(hidx, coin, dec_dt, tolerance_baseline_hours)
-            if not nearest_base:
-                # Kein Basispunkt gefunden → nicht bewertbar
-                continue
-            _, base_price = nearest_base
+        due.setdefault(coin, []).append((i, dec_dt, target_dt))
 
-        # Zielpreis: nächster Preis um target_dt
-        nearest_target = _nearest_price(hidx, coin, target_dt, tolerance_target_hours)
-        if not nearest_target:
+    # 2) As-of-Join je Coin: Basis- und Zielpreise aller fälligen Entscheidungen in einem Durchlauf
+    matches: Dict[int, Tuple[str, datetime, float, Tuple[datetime, float]]] = {}
+    for coin, items in due.items():
+        rows = hidx.get(coin)
+        if not rows:
             # Zielpreis nicht auffindbar → später nochmal
             continue
-        target_ts, target_price = nearest_target
+        ep = eidx[coin]
+        base_pos = _asof_nearest(ep, np.array([_epoch(dec) for _, dec, _ in items]),
+                                 float(tolerance_baseline_hours) * 3600.0)
+        target_pos = _asof_nearest(ep, np.array([_epoch(tgt) for _, _, tgt in items]),
+                                   float(tolerance_target_hours) * 3600.0)
+        for (i, dec_dt, _), bp, tp in zip(items, base_pos.tolist(), target_pos.tolist()):
+            # Einstiegspreis: vorhandene Felder nutzen, sonst aus History (nächster Preis um dec_dt)
+            base_price = decisions[i].get("price") or decisions[i].get("baseline_price")
+            if not isinstance(base_price, (int, float)):
+                if bp < 0:
+                    # Kein Basispunkt gefunden → nicht bewertbar
+                    continue
+                base_price = rows[bp][1]
+            if tp < 0:
+                # Zielpreis nicht auffindbar → später nochmal
+                continue
+            matches[i] = (coin, dec_dt, float(base_price), rows[tp])
+
+    # 3) In Log-Reihenfolge übernehmen
+    for i in sorted(matches):
+        d = decisions[i]
+        coin, dec_dt, base_price, (target_ts, target_price) = matches[i]
 
         success = _normalize_percent(float(base_price), float(target_price))
 
@@ -180,6 +237,8 @@ def run_feedback_loop(*,
             "origin": "feedback_loop"
         })
 
+        online_samples.append((_decision_features(hidx, windows, coin, dec_dt), success))
+
         evaluated.append({
             "coin": coin,
             "decision_time": dec_dt.replace(microsecond=0).isoformat(),
@@ -189,6 +248,20 @@ def run_feedback_loop(*,
 
     if updated_any:
         _atomic_write(DECISION_LOG_FILE, decisions)
+        pidx.refresh(decisions, matches.keys())
+        pidx.commit()
         _atomic_write(LEARNING_LOG_FILE, learning_log)
+        try:
+            from learning_stats import note_appended
+            note_appended(LEARNING_LOG_FILE, learn_sig, learning_log[learn_first_new:])
+        except Exception as e:
+            print(f"[Feedback] Lernstatistik nicht aktualisiert: {e}")
+
+        # Online-Modell sofort mit den neuen Ergebnissen fortschreiben
+        try:
+            from online_learner import learn_from_evaluations
+            learn_from_evaluations(online_samples)
+        except Exception as e:
+            print(f"[Feedback] Online-Update fehlgeschlagen: {e}")
 
     return evaluated
@@ -0,0 +1,261 @@
+# fill_model.py — realistische Order-Ausführung für Simulationen und Backtests
+# Statt "30 % des Guthabens zum exakten Tickerpreis" (trading.simulate_trade):
+#   - Lot-Größe: Menge auf stepSize abgerundet, minQty / minNotional (Binance-Filter)
+#   - Gebühren: Taker (Market-Order, Standard) bzw. Maker
+#   - Slippage: Kurve Order-Volumen (EUR) → Basispunkte, linear interpoliert
+# Die Filter und der EURUSDT-Kurs (minNotional ist in USDT, die Preise in EUR) kommen
+# gecacht aus exchange_filters.json (einmal täglich von Binance); ist Binance nicht
+# erreichbar, wird das ebenfalls gecacht (FILTERS_RETRY) und es gelten DEFAULT_* / Kurs 1,0.
+# Alle Funktionen rechnen auf Arrays – alle Fills eines Zeitschritts auf einmal.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+FILTERS_FILE = "exchange_filters.json"
+FILTERS_TTL = 24 * 3600
+FILTERS_RETRY = 3600          # nach fehlgeschlagenem Abruf erst wieder nach 1 h versuchen
+
+TAKER_FEE = float(os.getenv("SIM_TAKER_FEE", "0.001") or 0.001)   # 0,10 %
+MAKER_FEE = float(os.getenv("SIM_MAKER_FEE", "0.001") or 0.001)
+
+# (Order-Volumen in EUR, Slippage in Basispunkten) – dazwischen linear, darüber konstant
+SLIPPAGE_CURVE: Tuple[Tuple[float, float], ...] = (
+    (0.0, 2.0),
+    (1_000.0, 5.0),
+    (10_000.0, 15.0),
+    (100_000.0, 50.0),
+)
+
+DEFAULT_STEP = 1e-6          # wie round(qty, 6) in simulate_trade
+DEFAULT_MIN_QTY = 0.0
+DEFAULT_MIN_NOTIONAL = 5.0   # USDT, typischer Binance-Wert
+
+BUY_FRACTION = 0.3           # wie simulate_trade
+MIN_BALANCE = 10.0
+
+
+# ---------- Exchange-Filter (Cache) ----------
+def _parse_exchange_info(info: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for s in info.get("symbols", []):
+        if s.get("quoteAsset") != "USDT" or s.get("status") != "TRADING":
+            continue
+        f = {"step": DEFAULT_STEP, "min_qty": DEFAULT_MIN_QTY, "min_notional": DEFAULT_MIN_NOTIONAL}
+        for flt in s.get("filters", []):
+            kind = flt.get("filterType")
+            try:
+                if kind == "LOT_SIZE":
+                    f["step"] = float(flt.get("stepSize") or DEFAULT_STEP) or DEFAULT_STEP
+                    f["min_qty"] = float(flt.get("minQty") or 0.0)
+                elif kind in ("MIN_NOTIONAL", "NOTIONAL"):
+                    f["min_notional"] = float(flt.get("minNotional") or 0.0)
+            except Exception:
+                continue
+        out[s.get("baseAsset")] = f
+    return out
+
+
+def load_exchange_info(refresh: bool = False, path: str = FILTERS_FILE) -> Dict[str, Any]:
+    """
+    {"filters": {COIN: {"step", "min_qty", "min_notional" (USDT)}}, "eur_rate": USDT je EUR}
+    aus dem Cache. Ist er abgelaufen (oder refresh=True), wird über Binance erneuert; schlägt
+    das fehl, bleibt der alte Stand (oder leer/1,0) und wird mit FILTERS_RETRY neu gecacht,
+    damit nicht jedes FillModel erneut ins Netz geht.
+    """
+    cached: Dict[str, Any] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except Exception:
+        cached = {}
+    if not isinstance(cached, dict):
+        cached = {}
+    now = time.time()
+    expires = float(cached.get("expires_at") or float(cached.get("fetched_at", 0)) + FILTERS_TTL)
+    if cached and now < expires and not refresh:
+        return {"filters": cached.get("filters") or {}, "eur_rate": float(cached.get("eur_rate") or 1.0)}
+    try:
+        from binance.client import Client
+        client = Client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_API_SECRET"))
+        filters = _parse_exchange_info(client.get_exchange_info())
+        eur_rate = float(client.get_symbol_ticker(symbol="EURUSDT").get("price") or 0.0) or 1.0
+        data = {"fetched_at": now, "expires_at": now + FILTERS_TTL, "filters": filters, "eur_rate": eur_rate}
+    except Exception as e:
+        if refresh:
+            print(f"[Fills] Exchange-Filter nicht abrufbar: {e}")
+        data = {"fetched_at": float(cached.get("fetched_at", 0)), "expires_at": now + FILTERS_RETRY,
+                "filters": cached.get("filters") or {}, "eur_rate": float(cached.get("eur_rate") or 1.0),
+                "error": str(e)}
+    d = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(data, tf)
+        tmp = tf.name
+    os.replace(tmp, path)
+    return {"filters": data["filters"], "eur_rate": data["eur_rate"]}
+
+
+def load_filters(refresh: bool = False, path: str = FILTERS_FILE) -> Dict[str, Dict[str, float]]:
+    """Nur die Filter aus load_exchange_info."""
+    return load_exchange_info(refresh, path)["filters"]
+
+
+# ---------- Modell ----------
+class FillModel:
+    """
+    Ausführungsmodell für eine feste Coin-Liste (Spalten). Preise in EUR; eur_rate
+    (USDT je EUR) rechnet minNotional aus USDT um – ohne Angabe der gecachte EURUSDT-Kurs.
+    """
+
+    def __init__(self, coins: Sequence[str], *, filters: Optional[Dict[str, Dict[str, float]]] = None,
+                 taker_fee: float = TAKER_FEE, maker_fee: float = MAKER_FEE, maker: bool = False,
+                 slippage_curve: Sequence[Tuple[float, float]] = SLIPPAGE_CURVE,
+                 eur_rate: Optional[float] = None):
+        if filters is None or eur_rate is None:
+            info = load_exchange_info()
+            filters = info["filters"] if filters is None else filters
+            eur_rate = info["eur_rate"] if eur_rate is None else eur_rate
+        self.coins = list(coins)
+
+        def get(c: str, k: str, dflt: float) -> float:
+            return float((filters.get(c) or {}).get(k, dflt))
+
+        self.step = np.array([get(c, "step", DEFAULT_STEP) or DEFAULT_STEP for c in self.coins])
+        self.min_qty = np.array([get(c, "min_qty", DEFAULT_MIN_QTY) for c in self.coins])
+        self.min_notional = np.array([get(c, "min_notional", DEFAULT_MIN_NOTIONAL) for c in self.coins]) / (eur_rate or 1.0)
+        self.fee = float(maker_fee if maker else taker_fee)
+        curve = np.asarray(slippage_curve, dtype=float).reshape(-1, 2)
+        self._slip_x, self._slip_bps = curve[:, 0], curve[:, 1]
+
+    def slippage(self, notional: np.ndarray) -> np.ndarray:
+        """Slippage als Anteil (bps / 10 000) für Order-Volumina in EUR."""
+        return np.interp(np.abs(notional), self._slip_x, self._slip_bps) / 10_000.0
+
+    def _floor(self, qty: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        step = self.step[cols]
+        return np.floor(qty / step + 1e-9) * step
+
+    def buy(self, budget: np.ndarray, price: np.ndarray, cols: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Käufe für je budget EUR: Fill-Preis = Preis · (1 + Slippage), Menge auf stepSize
+        abgerundet, Gebühr auf den Betrag. ok = minQty/minNotional erfüllt.
+        """
+        budget, price = np.asarray(budget, dtype=float), np.asarray(price, dtype=float)
+        fill = price * (1.0 + self.slippage(budget))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            qty = self._floor(np.where(fill > 0, budget / (fill * (1.0 + self.fee)), 0.0), cols)
+        notional = qty * fill
+        ok = (qty > 0) & (qty >= self.min_qty[cols]) & (notional >= self.min_notional[cols])
+        qty = np.where(ok, qty, 0.0)
+        notional = np.where(ok, notional, 0.0)
+        fee = notional * self.fee
+        return {"qty": qty, "cost": notional + fee, "fee": fee,
+                "slippage": qty * (fill - price), "ok": ok}
+
+    def sell(self, qty: np.ndarray, price: np.ndarray, cols: np.ndarray) -> Dict[str, np.ndarray]:
+        """Verkäufe: verkaufbare Menge (stepSize), Erlös nach Slippage und Gebühr; Rest bleibt als Staub."""
+        qty, price = np.asarray(qty, dtype=float), np.asarray(price, dtype=float)
+        q = self._floor(qty, cols)
+        fill = price * (1.0 - self.slippage(q * price))
+        notional = q * fill
+        ok = (q > 0) & (q >= self.min_qty[cols]) & (notional >= self.min_notional[cols])
+        q = np.where(ok, q, 0.0)
+        notional = np.where(ok, notional, 0.0)
+        fee = notional * self.fee
+        return {"qty": q, "proceeds": notional - fee, "fee": fee,
+                "slippage": q * (price - fill), "ok": ok}
+
+    def _buy_chain(self, balance: float, price: np.ndarray, cols: np.ndarray
+                   ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Käufe in Reihenfolge wie nacheinander ausgeführt: Kauf k erhält BUY_FRACTION des
+        Guthabens, das nach den tatsächlichen Kosten der Käufe davor übrig ist (abgelehnte
+        Orders kosten nichts), solange es > MIN_BALANCE ist. Vektorisiert als Fixpunkt:
+        Kosten schätzen → Guthaben per cumsum → alle Käufe neu bewerten, bis die Kosten
+        stabil sind. Kauf k hängt nur von den Käufen davor ab, spätestens nach k+1
+        Durchläufen ist er exakt; meist reichen zwei bis drei.
+        Rückgabe: (aktiv [n] – Präfix der ausgeführten Versuche, buy()-Ergebnis).
+        """
+        n = len(cols)
+        cost = balance * BUY_FRACTION * (1.0 - BUY_FRACTION) ** np.arange(n)   # Schätzung: Kosten = Budget
+        for _ in range(n + 1):
+            left = balance - np.concatenate(([0.0], np.cumsum(cost)[:-1]))
+            active = left > MIN_BALANCE
+            b = self.buy(np.where(active, left * BUY_FRACTION, 0.0), price, cols)
+            if np.allclose(b["cost"], cost, rtol=0.0, atol=1e-9):
+                break
+            cost = b["cost"]
+        return active, b
+
+    def execute_step(self, balance: float, holdings: np.ndarray, decisions: np.ndarray,
+                     prices: np.ndarray, *, sell: int = 2, buy: int = 1) -> Dict[str, Any]:
+        """
+        Alle Fills eines Zeitschritts für ein Depot (holdings [C] wird angepasst), Reihenfolge
+        wie simulate_trade (Coin-Reihenfolge). Verkäufe werden auf einmal gerechnet, die Käufe
+        zwischen zwei Verkäufen je Abschnitt über _buy_chain (Budget aus dem tatsächlich
+        verbliebenen Guthaben; abgelehnte Orders verbrauchen nichts).
+        """
+        res = {"balance": float(balance), "n_buys": 0, "n_sells": 0, "fees": 0.0,
+               "slippage": 0.0, "rejected": 0, "bought": None, "sold": None}
+        s_idx = np.flatnonzero((decisions == sell) & (prices > 0) & (holdings >= self.step * (1 - 1e-9)))
+        b_idx = np.flatnonzero((decisions == buy) & (prices > 0))
+        proceeds = np.zeros(len(s_idx))
+        if len(s_idx):
+            s = self.sell(holdings[s_idx], prices[s_idx], s_idx)
+            holdings[s_idx] -= s["qty"]
+            proceeds = s["proceeds"]
+            res["n_sells"] = int(s["ok"].sum())
+            res["fees"] += float(s["fee"].sum())
+            res["slippage"] += float(s["slippage"].sum())
+            res["rejected"] += int((~s["ok"]).sum())
+            res["sold"] = (s_idx, s)
+
+        bal = res["balance"]
+        if len(b_idx):
+            seg = np.searchsorted(s_idx, b_idx)            # Anzahl Verkäufe vor dem Kauf
+            cuts = np.searchsorted(seg, np.arange(len(s_idx) + 2))
+            parts_idx, parts = [], []
+            for k in range(len(s_idx) + 1):
+                if k:
+                    bal += float(proceeds[k - 1])
+                lo, hi = cuts[k], cuts[k + 1]
+                if lo == hi or bal <= MIN_BALANCE:
+                    continue
+                idx = b_idx[lo:hi]
+                keep, b = self._buy_chain(bal, prices[idx], idx)
+                idx = idx[keep]
+                b = {key: v[keep] for key, v in b.items()}
+                bal -= float(b["cost"].sum())
+                parts_idx.append(idx)
+                parts.append(b)
+            if parts:
+                idx = np.concatenate(parts_idx)
+                b = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+                holdings[idx] += b["qty"]
+                res["n_buys"] = int(b["ok"].sum())
+                res["fees"] += float(b["fee"].sum())
+                res["slippage"] += float(b["slippage"].sum())
+                res["rejected"] += int((~b["ok"]).sum())
+                res["bought"] = (idx, b)
+        else:
+            bal += float(proceeds.sum())
+        res["balance"] = bal
+        return res
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Exchange-Filter für das Fill-Modell cachen/anzeigen")
+    ap.add_argument("--refresh", action="store_true", help="Filter jetzt von Binance holen")
+    ap.add_argument("coins", nargs="*", help="Coins anzeigen (z. B. BTC ETH)")
+    args = ap.parse_args()
+    info = load_exchange_info(refresh=args.refresh)
+    flt = info["filters"]
+    print(f"[Fills] {len(flt)} Coins mit Filtern in {FILTERS_FILE}, EURUSDT {info['eur_rate']}")
+    for c in args.coins:
+        print(c, flt.get(c.upper()))
@@ -157,6 +157,45 @@ def get_change_since(
     return _safe_pct_change(old_price, new_price)
 
 
+def get_changes_since_batch(
+    pairs: List[Tuple[str, str]],
+    to_date: Optional[str] = None,
+    *,
+    data: Optional[Dict[str, Dict[str, float]]] = None
+) -> List[Optional[float]]:
+    """
+    get_change_since für viele (coin, since_date)-Paare auf einmal: history.json wird
+    einmal geladen, das Ziel-Datum einmal bestimmt und alle Änderungen in einem
+    NumPy-Durchlauf gerechnet. Rückgabe in Eingabe-Reihenfolge (None = nicht berechenbar).
+    """
+    import numpy as np
+    if data is None:
+        data = _load_history()
+    if not data or not pairs:
+        return [None] * len(pairs)
+
+    if not to_date:
+        today = _today_str()
+        to_date = today if today in data else max(data.keys())
+    if not to_date or to_date not in data:
+        return [None] * len(pairs)
+    cur = data[to_date]
+
+    def _f(v):
+        try:
+            return float(v)
+        except Exception:
+            return np.nan
+
+    old = np.array([_f(data[d].get(c)) if d in data else np.nan for c, d in pairs], dtype=np.float64)
+    new = np.array([_f(cur.get(c)) for c, _ in pairs], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (new - old) / old * 100.0
+    ok = np.isfinite(pct) & (old != 0)
+    # Runden wie _safe_pct_change (Python-round je Wert)
+    return [round(float(v), 2) if k else None for v, k in zip(pct.tolist(), ok.tolist())]
+
+
 def get_changes_between(
     from_date: str,
     to_date: str,
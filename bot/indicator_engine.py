@@ -0,0 +1,224 @@
+# indicator_engine.py — Streaming-Indikatoren je Coin (O(1) pro neuem Preis)
+# Hält EMA20/50, MACD(12/26/9), Wilder-RSI(14) und Bollinger(20, 2σ) als laufenden
+# Zustand, persistiert ihn in indicator_state.json und liefert die aktuellen Werte
+# aller Coins ohne Neuberechnung. Rechenweise identisch zur `ta`-Library
+# (ewm adjust=False, Bollinger mit ddof=0).
+
+from __future__ import annotations
+import json
+import math
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional
+
+STATE_FILE = "indicator_state.json"
+
+RSI_WINDOW = 14
+EMA_SPANS = (12, 20, 26, 50)
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2.0
+
+NAN = float("nan")
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    d = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(data, tf, ensure_ascii=False)
+        tmp = tf.name
+    os.replace(tmp, path)
+
+
+def _load_json_dict(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        return obj if isinstance(obj, dict) else {}
+    except Exception:
+        return {}
+
+
+def _file_sig(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _alpha(span: int) -> float:
+    return 2.0 / (span + 1.0)
+
+
+def new_state() -> Dict[str, Any]:
+    return {
+        "n": 0, "last": None, "ts": None,
+        "ema": {str(s): None for s in EMA_SPANS},
+        "macd_sig": None, "macd_n": 0,
+        "gain": 0.0, "loss": 0.0,
+        # Bollinger: Fenster + verschobene Summen (Anker k gegen Auslöschung)
+        "win": [], "k": 0.0, "s1": 0.0, "s2": 0.0, "since_reset": 0,
+    }
+
+
+def _bb_reset(st: Dict[str, Any]) -> None:
+    win = st["win"]
+    k = sum(win) / len(win) if win else 0.0
+    st["k"] = k
+    st["s1"] = sum(x - k for x in win)
+    st["s2"] = sum((x - k) ** 2 for x in win)
+    st["since_reset"] = 0
+
+
+def update_state(st: Dict[str, Any], price: float) -> Dict[str, Any]:
+    """Verarbeitet genau einen neuen Schlusskurs – konstante Arbeit pro Aufruf."""
+    p = float(price)
+    prev = st["last"]
+    st["n"] += 1
+
+    # EMAs (Start mit dem ersten Preis, wie ewm(adjust=False))
+    ema = st["ema"]
+    for s in EMA_SPANS:
+        key = str(s)
+        a = _alpha(s)
+        ema[key] = p if ema[key] is None else p * a + ema[key] * (1 - a)
+
+    # MACD-Signal: EMA9 über die MACD-Werte ab dem ersten gültigen MACD
+    if st["n"] >= MACD_SLOW:
+        macd = ema[str(MACD_FAST)] - ema[str(MACD_SLOW)]
+        a = _alpha(MACD_SIGN)
+        st["macd_sig"] = macd if st["macd_sig"] is None else macd * a + st["macd_sig"] * (1 - a)
+        st["macd_n"] += 1
+
+    # Wilder-RSI (alpha = 1/14); erster Schritt ohne Vorgänger zählt als 0-Bewegung
+    d = 0.0 if prev is None else p - prev
+    a = 1.0 / RSI_WINDOW
+    if st["n"] == 1:
+        st["gain"], st["loss"] = 0.0, 0.0
+    else:
+        st["gain"] = max(d, 0.0) * a + st["gain"] * (1 - a)
+        st["loss"] = max(-d, 0.0) * a + st["loss"] * (1 - a)
+
+    # Bollinger: rollierende Summen
+    win = st["win"]
+    if not win:
+        st["k"] = p
+    k = st["k"]
+    win.append(p)
+    st["s1"] += p - k
+    st["s2"] += (p - k) ** 2
+    if len(win) > BB_WINDOW:
+        old = win.pop(0)
+        st["s1"] -= old - k
+        st["s2"] -= (old - k) ** 2
+    st["since_reset"] += 1
+    if st["since_reset"] >= BB_WINDOW:
+        _bb_reset(st)   # amortisiert O(1), hält die Summen numerisch sauber
+
+    st["last"] = p
+    return st
+
+
+def snapshot_state(st: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aktuelle Indikatorwerte im Format von indicators.calculate_indicators (NaN = noch nicht warm)."""
+    if not st or not st.get("n"):
+        return {"error": "Keine Kursdaten"}
+    n = st["n"]
+    ema = st["ema"]
+    out: Dict[str, Any] = {}
+
+    if n >= RSI_WINDOW:
+        g, l = st["gain"], st["loss"]
+        out["rsi"] = 100.0 if l == 0 else 100.0 - 100.0 / (1.0 + g / l)
+    else:
+        out["rsi"] = NAN
+
+    out["ema20"] = ema["20"] if n >= 20 else NAN
+    out["ema50"] = ema["50"] if n >= 50 else NAN
+
+    out["macd"] = ema[str(MACD_FAST)] - ema[str(MACD_SLOW)] if n >= MACD_SLOW else NAN
+    out["macd_signal"] = st["macd_sig"] if st["macd_n"] >= MACD_SIGN else NAN
+
+    win = st["win"]
+    if len(win) >= BB_WINDOW:
+        m = len(win)
+        mean_k = st["s1"] / m
+        var = max(st["s2"] / m - mean_k ** 2, 0.0)
+        mavg = st["k"] + mean_k
+        std = math.sqrt(var)
+        hb, lb = mavg + BB_DEV * std, mavg - BB_DEV * std
+        out["bb_upper"] = hb
+        out["bb_lower"] = lb
+        out["bb_percent"] = (st["last"] - lb) / (hb - lb) if hb != lb else NAN
+    else:
+        out["bb_upper"] = out["bb_lower"] = out["bb_percent"] = NAN
+
+    out["n"] = n
+    out["ts"] = st.get("ts")
+    return out
+
+
+class IndicatorEngine:
+    """Zustand aller Coins; update() ist O(1) pro Preis, snapshot() liest nur."""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.sig = _file_sig(path)
+        self.states: Dict[str, Dict[str, Any]] = _load_json_dict(path)
+
+    def update(self, coin: str, price: float, ts: Optional[str] = None) -> bool:
+        """Neuer Preis für einen Coin. Gleicher/älterer Zeitstempel wird ignoriert."""
+        try:
+            p = float(price)
+        except Exception:
+            return False
+        if not math.isfinite(p) or p <= 0:
+            return False
+        coin = str(coin).upper()
+        st = self.states.get(coin) or new_state()
+        if ts is not None and st.get("ts") is not None and str(ts) <= st["ts"]:
+            return False
+        update_state(st, p)
+        st["ts"] = str(ts) if ts is not None else st.get("ts")
+        self.states[coin] = st
+        return True
+
+    def update_many(self, prices: Dict[str, float], ts: Optional[str] = None) -> int:
+        return sum(1 for coin, p in prices.items() if self.update(coin, p, ts))
+
+    def seed(self, coin: str, closes: Iterable[float], ts: Optional[str] = None) -> Dict[str, Any]:
+        """Kaltstart: Zustand eines Coins komplett aus einer Close-Serie aufbauen."""
+        st = new_state()
+        for c in closes:
+            update_state(st, float(c))
+        st["ts"] = str(ts) if ts is not None else None
+        self.states[str(coin).upper()] = st
+        return snapshot_state(st)
+
+    def snapshot(self, coin: str) -> Dict[str, Any]:
+        return snapshot_state(self.states.get(str(coin).upper()))
+
+    def snapshot_all(self) -> Dict[str, Dict[str, Any]]:
+        return {c: snapshot_state(st) for c, st in sorted(self.states.items())}
+
+    def coins(self) -> List[str]:
+        return sorted(self.states.keys())
+
+    def save(self) -> None:
+        _atomic_write_json(self.path, self.states)
+        self.sig = _file_sig(self.path)
+
+
+_ENGINE: Optional[IndicatorEngine] = None
+
+
+def get_engine() -> IndicatorEngine:
+    """
+    Prozessweite Instanz. Der Zustand wird neu geladen, sobald indicator_state.json
+    (mtime/Größe) nicht mehr dem zuletzt gelesenen/geschriebenen Stand entspricht –
+    z. B. weil der Worker-Prozess stündlich fortgeschrieben hat.
+    """
+    global _ENGINE
+    if _ENGINE is None or _file_sig(_ENGINE.path) != _ENGINE.sig:
+        _ENGINE = IndicatorEngine()
+    return _ENGINE
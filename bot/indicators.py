@@ -1,56 +1,90 @@
 # indicators.py
-import pandas as pd
-from ta.trend import EMAIndicator, MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
-from typing import Dict, Any
+# Dünne Leser über der Streaming-Engine (indicator_engine.py): die Werte werden
+# pro neuem Preis in O(1) fortgeschrieben und hier nur noch ausgelesen/bewertet.
+import math
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 
-def calculate_indicators(df: pd.DataFrame) -> Dict[str, Any]:
+import numpy as np
+
+from indicator_engine import (
+    get_engine, new_state, update_state, snapshot_state,
+    RSI_WINDOW, MACD_FAST, MACD_SLOW, MACD_SIGN, BB_WINDOW, BB_DEV,
+)
+
+
+def hour_ts(dt: Optional[datetime] = None) -> str:
+    """Stunden-Zeitstempel (UTC) – ein Engine-Update pro Stunde und Coin."""
+    dt = dt or datetime.now(timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:00Z")
+
+
+def calculate_indicators(df: Any = None, coin: Optional[str] = None) -> Dict[str, Any]:
     """
-    Erwartet einen DataFrame mit Spalten: open, high, low, close, volume
     Gibt ein Dictionary mit RSI, EMA20, EMA50, MACD, MACD-Signal, Bollinger Bändern zurück.
+    - nur coin: aktueller Engine-Zustand des Coins (keine Neuberechnung)
+    - df mit Spalte close (z. B. Klines): Zustand aus den Kerzen aufbauen;
+      mit coin wird er als Startzustand des Coins in der Engine gespeichert
     """
-    result = {}
+    if df is None:
+        if not coin:
+            return {"error": "Weder DataFrame noch Coin angegeben"}
+        return get_engine().snapshot(coin)
 
     # Schutz gegen ungültige Daten
-    if df is None or df.empty or "close" not in df.columns:
+    if df.empty or "close" not in df.columns:
         return {"error": "Ungültiger DataFrame"}
 
     try:
-        # RSI
-        rsi = RSIIndicator(close=df["close"], window=14)
-        result["rsi"] = float(rsi.rsi().iloc[-1])
-
-        # EMA 20 & 50
-        ema20 = EMAIndicator(close=df["close"], window=20).ema_indicator().iloc[-1]
-        ema50 = EMAIndicator(close=df["close"], window=50).ema_indicator().iloc[-1]
-        result["ema20"] = float(ema20)
-        result["ema50"] = float(ema50)
-
-        # MACD
-        macd = MACD(close=df["close"])
-        result["macd"] = float(macd.macd().iloc[-1])
-        result["macd_signal"] = float(macd.macd_signal().iloc[-1])
-
-        # Bollinger Bands
-        bb = BollingerBands(close=df["close"], window=20, window_dev=2)
-        result["bb_upper"] = float(bb.bollinger_hband().iloc[-1])
-        result["bb_lower"] = float(bb.bollinger_lband().iloc[-1])
-        result["bb_percent"] = float(bb.bollinger_pband().iloc[-1])
-
+        closes = [float(c) for c in df["close"]]
+        if coin:
+            ts = None
+            if "timestamp" in df.columns:
+                ts = hour_ts(datetime.fromtimestamp(float(df["timestamp"].iloc[-1]) / 1000, tz=timezone.utc))
+            engine = get_engine()
+            result = engine.seed(coin, closes, ts=ts)
+            engine.save()
+            return result
+        st = new_state()
+        for c in closes:
+            update_state(st, c)
+        return snapshot_state(st)
     except Exception as e:
-        result["error"] = f"Fehler bei Berechnung: {e}"
+        return {"error": f"Fehler bei Berechnung: {e}"}
+
 
-    return result
+def update_indicators(prices: Dict[str, float], ts: Optional[str] = None) -> int:
+    """Schreibt einen Preis je Coin in die Engine fort und persistiert den Zustand."""
+    engine = get_engine()
+    n = engine.update_many(prices, ts or hour_ts())
+    if n:
+        engine.save()
+    return n
 
 
-def evaluate_indicators(indicators: Dict[str, Any]) -> str:
+def update_indicators_from_tickers(price_map_usdt: Dict[str, float], ts: Optional[str] = None) -> int:
+    """{SYMBOL: USDT-Preis} (z. B. trading.get_current_prices()) → Engine-Update für alle *USDT-Paare."""
+    prices = {}
+    for sym, p in (price_map_usdt or {}).items():
+        if sym.endswith("USDT") and len(sym) > 4:
+            prices[sym[:-4]] = p
+    return update_indicators(prices, ts)
+
+
+def evaluate_indicators(indicators: Union[Dict[str, Any], str]) -> str:
     """
-    Bewertet ein Indikator-Dictionary als bullish, bearish oder neutral.
+    Bewertet ein Indikator-Dictionary (oder direkt einen Coin aus der Engine)
+    als bullish, bearish oder neutral.
     Rückgabe: "bullish", "bearish" oder "neutral".
     """
+    if isinstance(indicators, str):
+        indicators = get_engine().snapshot(indicators)
     if not indicators or "error" in indicators:
         return "unbekannt"
+    # Engine noch nicht warm (zu wenige Preise) → keine Bewertung
+    if any(isinstance(indicators.get(k), float) and math.isnan(indicators[k])
+           for k in ("rsi", "ema20", "ema50", "macd", "macd_signal")):
+        return "unbekannt"
 
     score = 0
 
@@ -85,3 +119,132 @@ def evaluate_indicators(indicators: Dict[str, Any]) -> str:
         return "bearish"
     else:
         return "neutral"
+
+
+# =========================
+# Batch-Kernels: Coins × Zeit
+# =========================
+# Eingabe: float-Matrix P[coins, time], ältester Preis links. Coins mit kürzerer
+# Historie werden links mit NaN aufgefüllt; jede Zeile startet bei ihrem ersten
+# gültigen Preis. Rechenweise wie die Engine / `ta` (ewm adjust=False, ddof=0).
+
+def _ewm_2d(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """EMA je Zeile, Schleife über die Zeit, vektorisiert über alle Coins."""
+    n_rows, n_cols = x.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    state = np.full(n_rows, np.nan)
+    count = np.zeros(n_rows, dtype=np.int64)
+    for t in range(n_cols):
+        v = x[:, t]
+        ok = ~np.isnan(v)
+        first = ok & np.isnan(state)
+        state = np.where(first, v, state)
+        upd = ok & ~first
+        state[upd] = alpha * v[upd] + (1 - alpha) * state[upd]
+        count += ok
+        out[:, t] = np.where(count >= min_periods, state, np.nan)
+    return out
+
+
+def ema_2d(prices: np.ndarray, span: int) -> np.ndarray:
+    return _ewm_2d(np.asarray(prices, dtype=np.float64), 2.0 / (span + 1.0), span)
+
+
+def rsi_2d(prices: np.ndarray, window: int = RSI_WINDOW) -> np.ndarray:
+    p = np.asarray(prices, dtype=np.float64)
+    valid = ~np.isnan(p)
+    # Differenz zum vorherigen Preis; erster gültiger Wert zählt als 0-Bewegung
+    prev = np.concatenate([np.full((p.shape[0], 1), np.nan), p[:, :-1]], axis=1)
+    d = np.where(valid & ~np.isnan(prev), p - prev, 0.0)
+    d = np.where(valid, d, np.nan)
+    up = np.where(np.isnan(d), np.nan, np.maximum(d, 0.0))
+    dn = np.where(np.isnan(d), np.nan, np.maximum(-d, 0.0))
+    g = _ewm_2d(up, 1.0 / window, window)
+    l = _ewm_2d(dn, 1.0 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(l == 0, 100.0, 100.0 - 100.0 / (1.0 + g / l))
+    return np.where(np.isnan(g) | np.isnan(l), np.nan, rsi)
+
+
+def macd_2d(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    macd = ema_2d(prices, MACD_FAST) - ema_2d(prices, MACD_SLOW)
+    a = 2.0 / (MACD_SIGN + 1.0)
+    return macd, _ewm_2d(macd, a, MACD_SIGN)
+
+
+def bb_percent_2d(prices: np.ndarray, window: int = BB_WINDOW, dev: float = BB_DEV) -> np.ndarray:
+    """Bollinger %B über rollierende Summen (je Zeile um den ersten Preis verschoben)."""
+    p = np.asarray(prices, dtype=np.float64)
+    n_rows, n_cols = p.shape
+    valid = ~np.isnan(p)
+    first_idx = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+    anchor = p[np.arange(n_rows), first_idx]
+    anchor = np.where(np.isnan(anchor), 0.0, anchor)
+    x = np.where(valid, p - anchor[:, None], 0.0)
+    zero = np.zeros((n_rows, 1))
+    c1 = np.concatenate([zero, np.cumsum(x, axis=1)], axis=1)
+    c2 = np.concatenate([zero, np.cumsum(x * x, axis=1)], axis=1)
+    cn = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+    out = np.full((n_rows, n_cols), np.nan)
+    if n_cols < window:
+        return out
+    s1 = c1[:, window:] - c1[:, :-window]
+    s2 = c2[:, window:] - c2[:, :-window]
+    cnt = cn[:, window:] - cn[:, :-window]
+    mean = s1 / window
+    std = np.sqrt(np.maximum(s2 / window - mean * mean, 0.0))
+    width = 2.0 * dev * std
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pb = (x[:, window - 1:] - (mean - dev * std)) / width
+    pb = np.where((cnt == window) & (width > 0), pb, np.nan)
+    out[:, window - 1:] = pb
+    return out
+
+
+def calculate_indicators_batch(prices: np.ndarray, *, full: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Alle Indikatoren für eine Preis-Matrix [coins, time] in einem Aufruf.
+    Rückgabe: {"rsi","ema20","ema50","macd","macd_signal","bb_percent"} → Array je Coin
+    (letzter Zeitpunkt) bzw. volle Matrizen bei full=True.
+    """
+    p = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    macd, signal = macd_2d(p)
+    res = {
+        "rsi": rsi_2d(p),
+        "ema20": ema_2d(p, 20),
+        "ema50": ema_2d(p, 50),
+        "macd": macd,
+        "macd_signal": signal,
+        "bb_percent": bb_percent_2d(p),
+    }
+    if full:
+        return res
+    return {k: v[:, -1] for k, v in res.items()}
+
+
+_LABELS = np.array(["unbekannt", "bearish", "neutral", "bullish"])
+
+
+def evaluate_indicators_batch(ind: Dict[str, np.ndarray]) -> np.ndarray:
+    """Vektorisierte evaluate_indicators(): ein Label je Coin (gleiche Regeln/Schwellen)."""
+    rsi, ema20, ema50 = ind["rsi"], ind["ema20"], ind["ema50"]
+    macd, sig, bb = ind["macd"], ind["macd_signal"], ind["bb_percent"]
+    score = np.zeros(np.shape(rsi))
+    score -= (rsi > 70)
+    score += (rsi < 30)
+    score += np.where(ema20 > ema50, 1.0, -1.0)
+    score += np.where(macd > sig, 1.0, -1.0)
+    bb = np.where(np.isnan(bb), 0.5, bb)   # wie .get("bb_percent", 0.5)
+    score -= 0.5 * (bb > 0.9)
+    score += 0.5 * (bb < 0.1)
+    code = np.where(score >= 2, 3, np.where(score <= -2, 1, 2))
+    unknown = np.isnan(rsi) | np.isnan(ema20) | np.isnan(ema50) | np.isnan(macd) | np.isnan(sig)
+    return _LABELS[np.where(unknown, 0, code)]
+
+
+def technicals_for_coins(coins: Sequence[str], prices: np.ndarray) -> Dict[str, str]:
+    """{coin: bullish/bearish/neutral/unbekannt} für eine Preis-Matrix in Coin-Reihenfolge."""
+    if len(coins) == 0:
+        return {}
+    labels = evaluate_indicators_batch(calculate_indicators_batch(prices))
+    return dict(zip(coins, labels.tolist()))
@@ -1,12 +1,16 @@
 # ki_features.py
-import json, math
-from datetime import datetime, timezone
+import json
 from pathlib import Path
 
 HISTORY_FILE = "history.json"
 CRAWLER_FILE = "crawler_data.json"
 SENTI_FILE = "sentiment_snapshot.json"  # lege ich beim Training on-the-fly ab
 
+# Feature-Schema: Preis-Features (feature_store.PRICE_FEATURES) + diese Zusatzspalten.
+# Bei jeder Änderung an Definition/Reihenfolge hochzählen – live scoring prüft die Version.
+FEATURE_SCHEMA_VERSION = 1
+EXTRA_FEATURES = ("trend_score", "mentions", "senti_score")
+
 def _rsi(prices, period=14):
     gains, losses = [], []
     for i in range(1, len(prices)):
@@ -36,45 +40,55 @@ def load_json(path):
         try: return json.load(f)
         except: return {}
 
-def build_dataset(horizon_hours=6, min_history=60):
-    """Erzeugt X,y pro Coin aus history + optional crawler + sentiment."""
+def build_dataset(horizon_hours=6, min_history=60, *, workers=None):
+    """
+    Erzeugt X,y pro Coin aus history + optional crawler + sentiment.
+    Die Preis-Features kommen aus dem Feature-Store (feature_store.py); neu sind nur
+    Zeitstempel, die der Store noch nicht kennt. workers (None = $KI_WORKERS) > 1
+    verteilt diese Neuberechnung auf einen Prozess-Pool. Coins alphabetisch.
+    """
+    import numpy as np
+    from feature_store import get_store, history_series, epoch_to_iso
+
     history = load_json(HISTORY_FILE)  # {date_iso: {COIN: price_eur, ...}, ...}
     crawler = load_json(CRAWLER_FILE)  # {COIN: {...}}
     senti = load_json(SENTI_FILE)      # {COIN: {"score":..}, ...}
 
-    # sort timestamps
-    ts = sorted(history.keys())
-    if len(ts) < min_history: return [],[],[]
-    # make per-coin series
-    coins = set()
-    for t in ts: coins.update(history[t].keys())
+    if len(history) < min_history: return [],[],[]
+    store = get_store()
+    store.update(history, workers=workers)
 
     X, y, meta = [], [], []  # meta hält (coin, timestamp)
-    for coin in coins:
-        prices = [(t, history[t].get(coin)) for t in ts if coin in history[t]]
-        prices = [(datetime.fromisoformat(t), p) for t,p in prices if p is not None]
-        if len(prices) < min_history: continue
-        closes = [p for _,p in prices]
-        for i in range(min_history, len(closes)-horizon_hours):
-            window = closes[:i+1]
-            curr = window[-1]
-            future = closes[i+horizon_hours]
-            rsi = _rsi(window[-30:])      # RSI(14) aus letzten 30
-            ema12 = _ema(window[-30:], 12)
-            ema26 = _ema(window[-60:], 26)
-            macd = (ema12 or curr) - (ema26 or curr)
-            ret_1h = _pct(window[-1], window[-2]) if len(window) >=2 else 0
-            ret_6h = _pct(window[-1], window[-7]) if len(window) >=7 else 0
-            ret_24h= _pct(window[-1], window[-25]) if len(window) >=25 else 0
-            vol_trend = crawler.get(coin, {}).get("trend_score", 0.0)
-            mentions = crawler.get(coin, {}).get("mentions", 0)
-            senti_score = (senti.get(coin, {}) or {}).get("score", 0.0)
-
-            feat = [
-                curr, rsi or 50.0, macd, ret_1h, ret_6h, ret_24h,
-                vol_trend, mentions, senti_score
-            ]
-            X.append(feat)
-            y.append(1 if future > curr else 0)
-            meta.append((coin, prices[i][0].isoformat()))
+    for coin in sorted(history_series(history)):
+        feats = store.matrix(coin)
+        if feats is None or len(feats) < min_history: continue
+        ts = store.load(coin)["ts"]
+        closes = feats[:, 0]
+        idx = np.arange(min_history, len(closes)-horizon_hours)
+        if len(idx) == 0: continue
+        extras = np.array([
+            crawler.get(coin, {}).get("trend_score", 0.0),
+            crawler.get(coin, {}).get("mentions", 0),
+            (senti.get(coin, {}) or {}).get("score", 0.0),
+        ], dtype=np.float64)
+        rows = np.hstack([feats[idx], np.broadcast_to(extras, (len(idx), 3))])
+        X.extend(rows.tolist())
+        y.extend((closes[idx+horizon_hours] > closes[idx]).astype(int).tolist())
+        meta.extend((coin, epoch_to_iso(t)) for t in ts[idx])
     return X, y, meta
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="KI-Datensatz (9 Features) bauen")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    ap.add_argument("--bench", action="store_true", help="seriell vs. parallel messen")
+    args = ap.parse_args()
+    if args.bench:
+        import os
+        from parallel_tools import benchmark
+        n = args.workers or os.cpu_count() or 1
+        for r in benchmark(build_dataset, sorted({1, n})):
+            print("[Bench]", r)
+    else:
+        X, y, meta = build_dataset(workers=args.workers)
+        print(f"[KI] Datensatz: {len(X)} Zeilen, {len(set(c for c,_ in meta))} Coins")
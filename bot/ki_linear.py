@@ -0,0 +1,98 @@
+# ki_linear.py — kompaktes, pickle-freies Artefakt für lineare KI-Modelle
+# Speichert Koeffizienten, Intercept, Scaler-Mittelwert/-Skala und Feature-Namen als JSON
+# und rechnet die Vorhersage mit reinem NumPy nach (kein sklearn, kein pickle beim Laden).
+# Genutzt von train_ki_model (LogisticRegression) und online_learner (SGD, log_loss).
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+FORMAT = "omerta-linear"
+FORMAT_VERSION = 1
+
+# Cache: {pfad: (mtime_ns, LinearModel)}
+_CACHE: Dict[str, tuple] = {}
+
+
+class LinearModel:
+    """p(y=1) = sigmoid(((x - mean) / scale) · coef + intercept)"""
+
+    __slots__ = ("coef", "intercept", "mean", "scale", "features", "meta")
+
+    def __init__(self, coef, intercept, mean, scale, features, meta=None):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.features: List[str] = list(features)
+        self.meta: Dict = dict(meta or {})
+
+    def decision_function(self, X) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return ((X - self.mean) / self.scale) @ self.coef + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Wahrscheinlichkeit der Klasse 1 je Zeile (1-D, nicht [n, 2] wie sklearn)."""
+        z = self.decision_function(X)
+        return 0.5 * (1.0 + np.tanh(0.5 * z))   # numerisch stabile Sigmoid
+
+    def predict(self, X) -> np.ndarray:
+        return (self.decision_function(X) > 0).astype(int)
+
+    def to_dict(self) -> Dict:
+        return {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "features": self.features,
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+            "scaler_mean": self.mean.tolist(),
+            "scaler_scale": self.scale.tolist(),
+            "meta": self.meta,
+        }
+
+
+def from_sklearn(clf, scaler, features: Sequence[str], meta: Optional[Dict] = None) -> LinearModel:
+    """Binärer linearer sklearn-Klassifikator + StandardScaler → LinearModel."""
+    n = len(features)
+    mean = np.zeros(n) if scaler is None else np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.ones(n) if scaler is None or scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+    return LinearModel(np.ravel(clf.coef_), float(np.ravel(clf.intercept_)[0]), mean, scale, features, meta)
+
+
+def save_linear(model: LinearModel, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=path.parent, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(model.to_dict(), tf, ensure_ascii=False, indent=2)
+        tmp = tf.name
+    os.replace(tmp, path)
+    _CACHE.pop(str(path), None)
+    return path
+
+
+def load_linear(path) -> Optional[LinearModel]:
+    """Lädt ein Artefakt (mit mtime-Cache); None, wenn fehlt oder ungültig."""
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    hit = _CACHE.get(str(path))
+    if hit and hit[0] == mtime:
+        return hit[1]
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            d = json.load(f)
+        if d.get("format") != FORMAT or int(d.get("version", 0)) != FORMAT_VERSION:
+            return None
+        model = LinearModel(d["coef"], d["intercept"], d["scaler_mean"], d["scaler_scale"],
+                            d["features"], d.get("meta"))
+    except Exception:
+        return None
+    _CACHE[str(path)] = (mtime, model)
+    return model
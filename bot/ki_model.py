@@ -13,50 +13,203 @@ def save_json(p, obj):
     Path(p).parent.mkdir(parents=True, exist_ok=True)
     with open(p,"w") as f: json.dump(obj, f, indent=2, ensure_ascii=False)
 
-def train_model():
-    # sentiment snapshot speichern (damit Features reproduzierbar)
-    try:
-        from sentiment_parser import get_sentiment_data
-        save_json(SENTI_SNAPSHOT, get_sentiment_data())
-    except Exception:
-        save_json(SENTI_SNAPSHOT, {})
-
-    X, y, _ = build_dataset()
-    if len(X) < 200:
-        return {"ok": False, "msg": "Zu wenig Trainingsdaten"}
+# Modelltyp: "hgb" (HistGradientBoosting, Standard) oder "rf" (bisheriger RandomForest)
+MODEL_KIND = os.getenv("KI_MODEL", "hgb").strip().lower()
 
-    # kleiner RandomForest (keine Zusatz-Dep)
-    from sklearn.ensemble import RandomForestClassifier
-    from sklearn.metrics import roc_auc_score, accuracy_score
+TEST_FRACTION = 0.2     # jüngste 20 % (zeitlich) = Test
+VAL_FRACTION = 0.15     # jüngste 15 % des Trainingsteils = Early-Stopping-Validierung
+
+HGB_PARAMS = dict(learning_rate=0.1, max_leaf_nodes=15, max_depth=6,
+                  min_samples_leaf=20, l2_regularization=1.0, max_bins=63)
+HGB_MAX_ITER = 300
+HGB_STEP = 10           # Bäume pro Early-Stopping-Schritt
+HGB_PATIENCE = 3        # Schritte ohne Verbesserung bis Abbruch
+
+def _time_split(X, y, meta):
+    """Zeitlich sortiert (Timestamp, Coin) → Train/Test ohne Blick in die Zukunft."""
     import numpy as np
+    order = sorted(range(len(X)), key=lambda i: (meta[i][1], meta[i][0])) if meta else list(range(len(X)))
+    Xa, ya = np.asarray(X, dtype=np.float64)[order], np.asarray(y, dtype=int)[order]
+    split = int(len(Xa) * (1 - TEST_FRACTION))
+    return Xa[:split], Xa[split:], ya[:split], ya[split:]
 
+def _fit_rf(Xtr, ytr):
+    from sklearn.ensemble import RandomForestClassifier
     clf = RandomForestClassifier(
         n_estimators=120, max_depth=8, min_samples_leaf=5, random_state=42, n_jobs=-1
     )
-    # einfacher Train/Test Split
-    split = int(len(X)*0.8)
-    Xtr, Xte = np.array(X[:split]), np.array(X[split:])
-    ytr, yte = np.array(y[:split]), np.array(y[split:])
+    clf.fit(Xtr, ytr)
+    return clf, {}
 
+def _fit_hgb(Xtr, ytr):
+    """
+    HistGradientBoosting mit Early Stopping auf den jüngsten VAL_FRACTION des Trainingsteils
+    (statt der zufälligen internen Validierung). Danach Refit auf dem ganzen Trainingsteil
+    mit der besten Baumanzahl.
+    """
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.metrics import log_loss
+    cut = int(len(Xtr) * (1 - VAL_FRACTION))
+    Xfit, Xval, yfit, yval = Xtr[:cut], Xtr[cut:], ytr[:cut], ytr[cut:]
+
+    best_iter, best_loss = HGB_MAX_ITER, None
+    if len(set(yval.tolist())) > 1 and len(set(yfit.tolist())) > 1:
+        clf = HistGradientBoostingClassifier(max_iter=HGB_STEP, early_stopping=False, warm_start=True,
+                                             random_state=42, **HGB_PARAMS)
+        since_best = 0
+        for n_iter in range(HGB_STEP, HGB_MAX_ITER + 1, HGB_STEP):
+            clf.set_params(max_iter=n_iter)
+            clf.fit(Xfit, yfit)
+            loss = log_loss(yval, clf.predict_proba(Xval)[:, 1], labels=[0, 1])
+            if best_loss is None or loss < best_loss - 1e-6:
+                best_iter, best_loss, since_best = n_iter, loss, 0
+            else:
+                since_best += 1
+                if since_best >= HGB_PATIENCE:
+                    break
+
+    clf = HistGradientBoostingClassifier(max_iter=best_iter, early_stopping=False,
+                                         random_state=42, **HGB_PARAMS)
     clf.fit(Xtr, ytr)
+    return clf, {"n_iter": best_iter,
+                 "val_logloss": round(float(best_loss), 5) if best_loss is not None else None}
+
+_FITTERS = {"rf": _fit_rf, "hgb": _fit_hgb}
+
+def _evaluate(clf, Xte, yte):
+    from sklearn.metrics import roc_auc_score, accuracy_score
     proba = clf.predict_proba(Xte)[:,1]
     auc = float(roc_auc_score(yte, proba)) if len(set(yte))>1 else None
     acc = float(accuracy_score(yte, (proba>0.5).astype(int)))
+    return auc, acc
 
-    Path(MODEL_DIR).mkdir(exist_ok=True)
-    with open(MODEL_PATH,"wb") as f: pickle.dump(clf, f)
+def fit_price_model(X, y, meta, kind=None):
+    """Fit + zeitlich geordnete Testmetriken; Rückgabe (clf, metrics) oder (None, metrics)."""
+    if len(X) < 200:
+        return None, {"ok": False, "msg": "Zu wenig Trainingsdaten", "n_samples": len(X)}
+
+    kind = kind or MODEL_KIND
+    if kind not in _FITTERS:
+        kind = "hgb"
+    # zeitlich geordneter Split (jüngste Daten = Test)
+    Xtr, Xte, ytr, yte = _time_split(X, y, meta)
+
+    t0 = time.perf_counter()
+    clf, fit_info = _FITTERS[kind](Xtr, ytr)
+    fit_seconds = time.perf_counter() - t0
+    auc, acc = _evaluate(clf, Xte, yte)
 
     metrics = {
+        "ok": True,
         "trained_at": datetime.now(timezone.utc).isoformat(),
         "n_samples": len(X),
-        "auc": auc, "accuracy": acc
+        "auc": auc, "accuracy": acc,
+        "model": kind,
+        "fit_seconds": round(fit_seconds, 3),
+        **fit_info,
     }
-    save_json(METRICS_PATH, metrics)
-    return {"ok": True, **metrics}
+    return clf, metrics
+
+def save_price_model(clf):
+    """Atomar nach models/ki_model.pkl; Rückgabe: Dateigröße in Bytes."""
+    import tempfile
+    Path(MODEL_DIR).mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=MODEL_DIR, suffix=".tmp") as tf:
+        pickle.dump(clf, tf, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = tf.name
+    os.replace(tmp, MODEL_PATH)
+    return os.path.getsize(MODEL_PATH)
 
-def predict_live(feature_row):
-    import numpy as np, pickle
-    if not Path(MODEL_PATH).exists(): 
+def train_model(workers=None, kind=None):
+    """Kompatibilität: läuft über die gemeinsame Pipeline (ki_pipeline.train_all)."""
+    from ki_pipeline import train_all
+    return train_all(workers=workers, kind=kind)
+
+def benchmark_models(workers=None, kinds=("rf", "hgb"), n_predict=200):
+    """
+    RandomForest vs. HistGradientBoosting auf denselben Daten/Split:
+    Fit-Zeit, Einzelzeilen-Latenz (Median), Batch-Latenz, Dateigröße, Test-AUC/Accuracy.
+    Schreibt keine Modelle.
+    """
+    import numpy as np
+    X, y, meta = build_dataset(workers=workers)
+    if len(X) < 200:
+        return {"ok": False, "msg": "Zu wenig Trainingsdaten"}
+    Xtr, Xte, ytr, yte = _time_split(X, y, meta)
+    out = {"ok": True, "n_train": len(Xtr), "n_test": len(Xte), "models": {}}
+    for kind in kinds:
+        t0 = time.perf_counter()
+        clf, fit_info = _FITTERS[kind](Xtr, ytr)
+        fit_s = time.perf_counter() - t0
+        lat = []
+        for i in range(n_predict):
+            row = Xte[i % len(Xte)][None, :]
+            t1 = time.perf_counter()
+            clf.predict_proba(row)
+            lat.append(time.perf_counter() - t1)
+        t1 = time.perf_counter()
+        clf.predict_proba(Xte)
+        batch_s = time.perf_counter() - t1
+        auc, acc = _evaluate(clf, Xte, yte)
+        out["models"][kind] = {
+            "fit_seconds": round(fit_s, 3),
+            "predict_row_ms": round(float(np.median(lat)) * 1000, 3),
+            "predict_batch_ms": round(batch_s * 1000, 2),
+            "model_bytes": len(pickle.dumps(clf, protocol=pickle.HIGHEST_PROTOCOL)),
+            "auc": round(auc, 4) if auc is not None else None,
+            "accuracy": round(acc, 4),
+            **fit_info,
+        }
+    return out
+
+_LIVE = {"key": None, "clf": None}
+
+def predict_live(feature_row, features=None):
+    """
+    Wahrscheinlichkeit für eine Live-Zeile. Das Modell wird nur genutzt, wenn das Manifest
+    (ki_pipeline) passt: Schema-Version, Feature-Anzahl/-Namen und Prüfsumme der Datei.
+    Sonst neutral 0.5.
+    """
+    import numpy as np
+    from ki_pipeline import verify_price_model
+    if not Path(MODEL_PATH).exists():
+        return 0.5
+    key = verify_price_model(len(feature_row), features)
+    if key is None:
         return 0.5
-    with open(MODEL_PATH,"rb") as f: clf = pickle.load(f)
-    return float(clf.predict_proba(np.array([feature_row]))[0,1])
+    if _LIVE["key"] != key:
+        with open(MODEL_PATH,"rb") as f: _LIVE["clf"] = pickle.load(f)
+        _LIVE["key"] = key
+    return float(_LIVE["clf"].predict_proba(np.array([feature_row], dtype=float))[0,1])
+
+def predict_batch(X, features=None):
+    """
+    Wie predict_live, aber für eine ganze Matrix [n, Features] auf einmal (Paper-Trading).
+    Rückgabe: Wahrscheinlichkeiten [n] oder None, wenn kein gültiges Modell da ist.
+    """
+    import numpy as np
+    from ki_pipeline import verify_price_model
+    X = np.asarray(X, dtype=float)
+    if not Path(MODEL_PATH).exists() or X.ndim != 2:
+        return None
+    key = verify_price_model(X.shape[1], features)
+    if key is None:
+        return None
+    if _LIVE["key"] != key:
+        with open(MODEL_PATH,"rb") as f: _LIVE["clf"] = pickle.load(f)
+        _LIVE["key"] = key
+    if not len(X):
+        return np.empty(0)
+    return _LIVE["clf"].predict_proba(X)[:, 1]
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="KI-Modell (ki_features) trainieren / vergleichen")
+    ap.add_argument("--model", choices=sorted(_FITTERS), default=None, help="Modelltyp (Standard: $KI_MODEL oder hgb)")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse für den Datensatz (0 = alle Kerne)")
+    ap.add_argument("--bench", action="store_true", help="RandomForest vs. HistGradientBoosting messen (ohne Speichern)")
+    args = ap.parse_args()
+    if args.bench:
+        print(json.dumps(benchmark_models(workers=args.workers), indent=2))
+    else:
+        print("[KI]", train_model(workers=args.workers, kind=args.model))
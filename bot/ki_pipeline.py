@@ -0,0 +1,188 @@
+# ki_pipeline.py — gemeinsame KI-Trainings-Pipeline für OmertaTradeBot
+# Ein Lauf, ein Artefakt-Satz unter models/, beschrieben durch models/ki_manifest.json:
+#   price   → ki_model.pkl          (ki_model, Features aus dem Feature-Store, live scoring in logic)
+#   outcome → ki_model_linear.json  (train_ki_model, ret_24h/vol_24h, predict_ki + Online-Learner)
+# Preis-Features werden genau einmal pro Lauf über den Feature-Store berechnet.
+# ki_metrics.json wird nur noch hier geschrieben (Kopfzeilen = Preis-Modell).
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from feature_store import PRICE_FEATURES
+from ki_features import EXTRA_FEATURES, FEATURE_SCHEMA_VERSION, load_json
+
+MODELS_DIR = Path("models")
+MANIFEST_PATH = MODELS_DIR / "ki_manifest.json"
+METRICS_PATH = MODELS_DIR / "ki_metrics.json"
+LEGACY_FILES = (MODELS_DIR / "ki_scaler.pkl",)   # alter Pickle-Scaler aus train_ki_model
+
+PRICE_MODEL_FEATURES: List[str] = list(PRICE_FEATURES) + list(EXTRA_FEATURES)
+
+
+def _atomic_write(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=path.parent, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(data, tf, ensure_ascii=False, indent=2)
+        tmp = tf.name
+    os.replace(tmp, path)
+
+
+def _sha256(path: Path) -> Optional[str]:
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+def load_manifest() -> Dict[str, Any]:
+    m = load_json(str(MANIFEST_PATH))
+    return m if isinstance(m, dict) else {}
+
+
+# ---------- Prüfung beim Live-Scoring ----------
+# Cache: (manifest-mtime, modell-mtime) → Ergebnis, damit die Prüfsumme nur einmal pro Datei läuft
+_VERIFIED: Dict[str, Any] = {"key": None, "ok": False, "entry": None}
+_WARNED: set = set()
+
+
+def _warn_once(msg: str) -> None:
+    if msg not in _WARNED:
+        _WARNED.add(msg)
+        print(f"[KI] {msg}")
+
+
+def verify_price_model(n_features: int, features: Optional[List[str]] = None):
+    """
+    Prüft models/ki_model.pkl gegen das Manifest. Rückgabe: Cache-Schlüssel (zum
+    Nachladen des Modells) oder None, wenn das Modell nicht benutzt werden darf.
+    """
+    try:
+        key = (MANIFEST_PATH.stat().st_mtime_ns, (MODELS_DIR / "ki_model.pkl").stat().st_mtime_ns)
+    except OSError:
+        _warn_once("Kein Manifest/Modell – bitte Pipeline laufen lassen (ki_pipeline.py).")
+        return None
+    if _VERIFIED["key"] != key:
+        m = load_manifest()
+        entry = (m.get("models") or {}).get("price") or {}
+        ok = (m.get("schema_version") == FEATURE_SCHEMA_VERSION
+              and entry.get("features") == PRICE_MODEL_FEATURES
+              and entry.get("sha256") == _sha256(MODELS_DIR / entry.get("file", "ki_model.pkl")))
+        if not ok:
+            _warn_once("Manifest passt nicht zu ki_model.pkl (Schema/Features/Prüfsumme) – Score neutral.")
+        _VERIFIED.update(key=key, ok=ok, entry=entry)
+    if not _VERIFIED["ok"]:
+        return None
+    entry = _VERIFIED["entry"]
+    if n_features != len(entry["features"]) or (features is not None and list(features) != entry["features"]):
+        _warn_once(f"Live-Zeile mit {n_features} Features, Modell erwartet {len(entry['features'])} – Score neutral.")
+        return None
+    return _VERIFIED["key"]
+
+
+# ---------- Training ----------
+def _save_sentiment_snapshot() -> None:
+    # sentiment snapshot speichern (damit Features reproduzierbar)
+    from ki_model import save_json, SENTI_SNAPSHOT
+    try:
+        from sentiment_parser import get_sentiment_data
+        save_json(SENTI_SNAPSHOT, get_sentiment_data())
+    except Exception:
+        save_json(SENTI_SNAPSHOT, {})
+
+
+def train_all(workers=None, kind=None, rebuild: bool = False,
+              consolidate_online: bool = True) -> Dict[str, Any]:
+    """
+    Nächtlicher Lauf: Feature-Store einmal aktualisieren → Preis-Modell; Lernlog-Matrix
+    inkrementell → Outcome-Modell; dann Manifest + Metriken schreiben.
+    Rückgabe: Metriken (Kopfzeilen n_samples/auc/accuracy/trained_at wie bisher).
+    """
+    from ki_features import build_dataset
+    from ki_model import MODEL_PATH, fit_price_model, save_price_model
+    from train_ki_model import LINEAR_PATH, FEATURES as OUTCOME_FEATURES, train_outcome_model
+
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest()
+    if manifest.get("schema_version") != FEATURE_SCHEMA_VERSION:
+        manifest = {}
+    models = dict(manifest.get("models") or {})
+
+    _save_sentiment_snapshot()
+
+    # 1) Preis-Modell (live scoring)
+    price_metrics: Dict[str, Any]
+    try:
+        X, y, meta = build_dataset(workers=workers)
+        clf, price_metrics = fit_price_model(X, y, meta, kind)
+        if clf is not None:
+            price_metrics["model_bytes"] = save_price_model(clf)
+            models["price"] = {
+                "file": Path(MODEL_PATH).name,
+                "format": "pickle",
+                "kind": price_metrics["model"],
+                "features": PRICE_MODEL_FEATURES,
+                "sha256": _sha256(Path(MODEL_PATH)),
+                "trained_at": price_metrics["trained_at"],
+            }
+    except ModuleNotFoundError as e:
+        price_metrics = {"ok": False, "msg": f"Abhängigkeit fehlt: {e.name}"}
+
+    # 2) Outcome-Modell (predict_ki, Online-Learner)
+    outcome_metrics = train_outcome_model(workers=workers, consolidate_online=consolidate_online,
+                                          rebuild=rebuild)
+    if outcome_metrics.get("ok"):
+        models["outcome"] = {
+            "file": LINEAR_PATH.name,
+            "format": "ki_linear",
+            "kind": "logreg",
+            "features": list(OUTCOME_FEATURES),
+            "sha256": _sha256(LINEAR_PATH),
+            "trained_at": outcome_metrics["trained_at"],
+        }
+
+    for legacy in LEGACY_FILES:
+        if legacy.exists():
+            legacy.unlink()
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _atomic_write(MANIFEST_PATH, {
+        "schema_version": FEATURE_SCHEMA_VERSION,
+        "written_at": now,
+        "models": models,
+    })
+
+    head = price_metrics if price_metrics.get("ok") else outcome_metrics
+    metrics = {
+        "n_samples": head.get("n_samples"),
+        "auc": head.get("auc"),
+        "accuracy": head.get("accuracy"),
+        "trained_at": now,
+        "schema_version": FEATURE_SCHEMA_VERSION,
+        "models": {"price": price_metrics, "outcome": outcome_metrics},
+    }
+    notes = [m.get("note") or m.get("msg") for m in (price_metrics, outcome_metrics)
+             if not m.get("ok") and (m.get("note") or m.get("msg"))]
+    if notes:
+        metrics["note"] = " | ".join(notes)
+    _atomic_write(METRICS_PATH, metrics)
+    return metrics
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Gemeinsame KI-Pipeline (Preis- + Outcome-Modell, Manifest)")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    ap.add_argument("--model", choices=("hgb", "rf"), default=None, help="Preis-Modell (Standard: $KI_MODEL oder hgb)")
+    ap.add_argument("--rebuild", action="store_true", help="Lernlog-Datensatz-Cache neu bauen")
+    args = ap.parse_args()
+    print("[KI]", json.dumps(train_all(workers=args.workers, kind=args.model, rebuild=args.rebuild),
+                             ensure_ascii=False, indent=2))
@@ -4,8 +4,9 @@ import os
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from autolearn import learn_from_decision
-from history_tools import get_change_since
+from autolearn import LearnBatch
+from history_tools import get_changes_since_batch
+from pending_index import get_index
 
 # --- Zeitzone Berlin ---
 try:
@@ -64,17 +65,18 @@ def _write_json_safely(path: str, data) -> None:
 # Logging fürs Lernen
 # ---------------------------
 
-def log_learning_result(coin: str, decision: str, change: float) -> None:
-    logs = _read_json_safely(LEARNING_LOG, default=[])
-    if not isinstance(logs, list):
-        logs = []
-    logs.append({
+def _learning_record(coin: str, decision: str, change: float) -> Dict[str, Any]:
+    return {
         "date": _iso(now_dt()),
         "coin": str(coin).upper(),
         "decision": decision,
         "change": round(float(change), 2)
-    })
-    _write_json_safely(LEARNING_LOG, logs)
+    }
+
+def log_learning_result(coin: str, decision: str, change: float) -> None:
+    batch = LearnBatch(LEARNING_LOG)
+    batch.append_raw(_learning_record(coin, decision, change))
+    batch.flush()
 
 # ---------------------------
 # Kernlogik
@@ -100,6 +102,13 @@ def _mark_evaluated(entry: Dict[str, Any]) -> None:
     entry["evaluated_at"] = _iso(now_dt())
 
 def evaluate_pending_learnings(evaluation_delay_days: int = EVAL_DELAY_DAYS, max_retry: int = MAX_RETRY) -> None:
+    # Pending-Index: ohne fällige Einträge decision_log.json gar nicht laden
+    cutoff = (now_dt() - timedelta(days=evaluation_delay_days)).timestamp()
+    pidx = get_index()
+    if pidx.fresh() and not pidx.has_due("learn", cutoff):
+        print("ℹ️ Keine fälligen Lernbewertungen.")
+        return
+
     logs = _read_json_safely(DECISION_LOG, default=[])
     if not isinstance(logs, list):
         print("❌ Fehler: decision_log.json ist beschädigt oder kein Listentyp.")
@@ -109,54 +118,63 @@ def evaluate_pending_learnings(evaluation_delay_days: int = EVAL_DELAY_DAYS, max
         print("ℹ️ Keine Einträge in decision_log.json.")
         return
 
-    updated: List[Dict[str, Any]] = []
+    pidx.ensure(logs)
+    due = pidx.due("learn", cutoff)
+    if not due:
+        print("ℹ️ Keine fälligen Lernbewertungen.")
+        return
+
     learned_count = 0
     still_open = 0
 
-    for entry in logs:
+    # 1) Fällige Einträge vorbereiten (Startdatum je Eintrag)
+    batch: List[tuple] = []   # (entry, coin, decision, since_date)
+    for i in due:
+        entry = logs[i]
         coin = str(entry.get("coin", "")).upper()
         decision = entry.get("decision") or entry.get("action") or ""   # <<< Fix
-        ts_str = entry.get("timestamp")
 
         if entry.get("evaluated_at"):
-            updated.append(entry)
             continue
 
         if not _eligible_for_eval(entry, evaluation_delay_days):
-            updated.append(entry)
             continue
 
         try:
-            created_dt = _parse_ts(ts_str)
-            since_date = created_dt.strftime("%Y-%m-%d")
-            change = get_change_since(coin, since_date)
-
-            if change is not None:
-                learn_from_decision(coin, decision, change)
-                log_learning_result(coin, decision, change)
-                _mark_evaluated(entry)
-                updated.append(entry)
-                learned_count += 1
-                print(f"📘 Gelernt: {coin} → {decision} → {round(change, 2)}%")
-            else:
-                _increment_retry(entry)
-                if entry["retry_count"] <= max_retry:
-                    updated.append(entry)
-                    still_open += 1
-                    print(f"⚠️ Keine Kursdaten für {coin} seit {since_date}. Retry {entry['retry_count']}/{max_retry}.")
-                else:
-                    entry["eval_note"] = "max_retry_reached_no_data"
-                    _mark_evaluated(entry)
-                    updated.append(entry)
-                    print(f"⛔ Max. Retries erreicht für {coin} ({since_date}). Markiere als abgeschlossen.")
-
+            since_date = _parse_ts(entry.get("timestamp")).strftime("%Y-%m-%d")
         except Exception as e:
             _increment_retry(entry)
-            updated.append(entry)
             still_open += 1
             print(f"⚠️ Fehler bei Bewertung von {coin}: {e}. Retry {entry['retry_count']}/{max_retry}.")
+            continue
+        batch.append((entry, coin, decision, since_date))
+
+    # 2) Alle Kursänderungen in einem Durchlauf (history.json einmal geladen)
+    changes = get_changes_since_batch([(coin, since) for _, coin, _, since in batch])
+
+    # 3) Ergebnisse übernehmen – Lern-Einträge gesammelt, ein Schreibvorgang je Datei
+    batch_log = LearnBatch(LEARNING_LOG)
+    for (entry, coin, decision, since_date), change in zip(batch, changes):
+        if change is not None:
+            batch_log.add(coin, decision, change)
+            batch_log.append_raw(_learning_record(coin, decision, change))
+            _mark_evaluated(entry)
+            learned_count += 1
+            print(f"📘 Gelernt: {coin} → {decision} → {round(change, 2)}%")
+        else:
+            _increment_retry(entry)
+            if entry["retry_count"] <= max_retry:
+                still_open += 1
+                print(f"⚠️ Keine Kursdaten für {coin} seit {since_date}. Retry {entry['retry_count']}/{max_retry}.")
+            else:
+                entry["eval_note"] = "max_retry_reached_no_data"
+                _mark_evaluated(entry)
+                print(f"⛔ Max. Retries erreicht für {coin} ({since_date}). Markiere als abgeschlossen.")
 
-    _write_json_safely(DECISION_LOG, updated)
+    batch_log.flush()
+    _write_json_safely(DECISION_LOG, logs)
+    pidx.refresh(logs, due)
+    pidx.commit()
     print(f"✅ Lernbewertung: {learned_count} gelernt, {still_open} offen.")
 
 if __name__ == "__main__":
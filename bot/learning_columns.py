@@ -0,0 +1,268 @@
+# learning_columns.py — Lernlog als spaltenweises NumPy-Array
+# learning_log.json wird einmal pro Dateiversion (mtime/Größe) geparst und normalisiert:
+#   coin (id), epoch (UTC), decision (Code), success / success_rate (Rohwerte), correct, origin (Code),
+#   indicator (id). success wird nicht skaliert – Normalisierung bleibt beim jeweiligen Verbraucher.
+# Alle Auswertungen (analyze_learning, learning_stats, visualize_learning, train_ki_model,
+# logic.get_learning_log) gruppieren auf diesem Array statt eigene Dict-Listen zu bauen.
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DTYPE = np.dtype([
+    ("coin", np.int32),        # Index in .coins, -1 = kein Coin
+    ("epoch", np.float64),     # UTC-Epoch-Sekunden, NaN = kein lesbarer Zeitstempel
+    ("decision", np.int8),     # Index in DECISIONS, -1 = unbekannt
+    ("success", np.float32),   # Feld success wie geloggt, NaN = fehlt/nicht lesbar
+    ("success_rate", np.float32),   # Feld success_rate wie geloggt, NaN = fehlt/nicht lesbar
+    ("correct", np.int8),      # 1/0 (correct → success → result, sonst 0)
+    ("origin", np.int8),       # Index in ORIGINS
+    ("indicator", np.int16),   # Index in .indicators, -1 = keiner
+])
+
+DECISIONS = ("buy", "sell", "hold")
+ORIGINS = ("other", "feedback_loop", "autolearn", "learn_scheduler")
+_DECISION_ALIASES = {
+    "gekauft": "buy", "kauf": "buy",
+    "verkauft": "sell", "verkauf": "sell",
+    "gehalten": "hold", "halte": "hold",
+}
+
+# Cache: {abspath: (file_sig, LearningColumns)}
+_CACHE: Dict[str, Tuple[Optional[List[int]], "LearningColumns"]] = {}
+
+
+# ---------- Normalisierung (einmal pro Zeile) ----------
+def _parse_iso(ts: Any) -> Optional[datetime]:
+    if not isinstance(ts, str):
+        return None
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def _to_bool_or_percent(entry: Dict[str, Any]) -> Tuple[Optional[bool], Optional[float]]:
+    if "correct" in entry:
+        try:
+            cb = bool(entry["correct"])
+            return cb, 100.0 if cb else 0.0
+        except Exception:
+            pass
+    if "success" in entry:
+        try:
+            s = entry["success"]
+            if isinstance(s, bool):
+                return s, 100.0 if s else 0.0
+            val = float(s)
+            if 0.0 <= val <= 1.0:
+                return val >= 0.5, val * 100.0
+            val = max(0.0, min(100.0, val))
+            return val >= 50.0, val
+        except Exception:
+            pass
+    return None, None
+
+
+def _raw_number(entry: Dict[str, Any], key: str) -> float:
+    """Feld als Zahl ohne Skalierung (bool → 1/0, "55%" → 55); NaN, wenn nicht vorhanden/lesbar."""
+    s = entry.get(key)
+    if s is None:
+        return float("nan")
+    try:
+        if isinstance(s, str):
+            s = s.strip().replace("%", "")
+        return float(s)
+    except Exception:
+        return float("nan")
+
+
+def _correct(entry: Dict[str, Any]) -> bool:
+    corr, _ = _to_bool_or_percent(entry)
+    if corr is None:
+        res = str(entry.get("result", "")).lower()
+        corr = res in ("win", "success", "correct", "true")
+    return bool(corr)
+
+
+def _epoch(entry: Dict[str, Any]) -> float:
+    ts = entry.get("timestamp") or entry.get("time") or entry.get("date") or entry.get("evaluated_at")
+    dt = _parse_iso(ts) if ts else None
+    if dt is None:
+        return float("nan")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)   # naive Zeiten (z. B. feedback_loop) als UTC
+    return dt.timestamp()
+
+
+def _decision_code(entry: Dict[str, Any]) -> int:
+    d = str(entry.get("decision") or entry.get("action") or "").strip().lower()
+    d = _DECISION_ALIASES.get(d, d)
+    return DECISIONS.index(d) if d in DECISIONS else -1
+
+
+def _origin_code(entry: Dict[str, Any]) -> int:
+    meta = entry.get("meta")
+    o = entry.get("origin") or (meta.get("origin") if isinstance(meta, dict) else None)
+    if o in ORIGINS:
+        return ORIGINS.index(o)
+    if "actual_percent" in entry and "correct" in entry:
+        return ORIGINS.index("autolearn")
+    if "change" in entry and "date" in entry:
+        return ORIGINS.index("learn_scheduler")
+    return 0
+
+
+def _head_hash(rows: Sequence[Any]) -> Optional[str]:
+    if not rows:
+        return None
+    return hashlib.sha1(json.dumps(rows[0], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+# ---------- Spalten ----------
+class LearningColumns:
+    """
+    Strukturiertes Array (eine Zeile je Lernlog-Zeile, gleiche Reihenfolge) + Namenslisten.
+    error: Lesefehler der Datei (beschädigt/nicht lesbar), sonst None – rows ist dann leer.
+    """
+
+    __slots__ = ("rows", "coins", "indicators", "head", "error")
+
+    def __init__(self, rows: np.ndarray, coins: List[str], indicators: List[str], head: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.rows = rows
+        self.coins = coins
+        self.indicators = indicators
+        self.head = head
+        self.error = error
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def success_any(self) -> np.ndarray:
+        """success, wo vorhanden, sonst success_rate (Rohwerte wie Heatmap/Lernverlauf sie lesen)."""
+        r = self.rows
+        return np.where(np.isnan(r["success"]), r["success_rate"], r["success"])
+
+    def mask(self, days: Optional[float] = None, *, now: Optional[float] = None) -> np.ndarray:
+        """Zeilen mit Coin (und bei days: Zeitstempel >= jetzt - days)."""
+        m = self.rows["coin"] >= 0
+        if days and days > 0:
+            t = datetime.now(timezone.utc).timestamp() if now is None else now
+            with np.errstate(invalid="ignore"):
+                m &= self.rows["epoch"] >= t - days * 86400.0
+        return m
+
+    def group_by(self, field: str, mask: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+        """
+        field: "coin" | "decision" | "origin" | "indicator"
+        → {name: {"total", "correct", "success_sum", "success_n"}} per np.bincount
+        (success_sum über die Rohwerte von success).
+        """
+        names = {"coin": self.coins, "decision": list(DECISIONS), "origin": list(ORIGINS),
+                 "indicator": self.indicators}[field]
+        r = self.rows if mask is None else self.rows[mask]
+        keys = r[field].astype(np.int64)
+        ok = keys >= 0
+        keys, r = keys[ok], r[ok]
+        if not len(keys):
+            return {}
+        n = len(names)
+        has_s = ~np.isnan(r["success"])
+        total = np.bincount(keys, minlength=n)
+        correct = np.bincount(keys, weights=r["correct"], minlength=n)
+        s_sum = np.bincount(keys[has_s], weights=r["success"][has_s].astype(np.float64), minlength=n)
+        s_n = np.bincount(keys[has_s], minlength=n)
+        return {names[k]: {"total": int(total[k]), "correct": int(correct[k]),
+                           "success_sum": float(s_sum[k]), "success_n": int(s_n[k])}
+                for k in np.flatnonzero(total)}
+
+    def order(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Zeilen-Indizes zeitlich aufsteigend (stabil, undatierte zuerst)."""
+        idx = np.arange(len(self.rows)) if mask is None else np.flatnonzero(mask)
+        ep = np.nan_to_num(self.rows["epoch"][idx], nan=-np.inf)
+        return idx[np.argsort(ep, kind="stable")]
+
+
+def columns_from_records(records: Sequence[Any], *, coins: Optional[List[str]] = None,
+                         indicators: Optional[List[str]] = None) -> LearningColumns:
+    """Roh-Einträge → LearningColumns (Namenslisten werden ggf. fortgeschrieben)."""
+    coins = list(coins or [])
+    indicators = list(indicators or [])
+    coin_pos = {c: k for k, c in enumerate(coins)}
+    ind_pos = {c: k for k, c in enumerate(indicators)}
+    n = len(records)
+    coin_c, epoch_c, dec_c, succ_c, rate_c, corr_c, orig_c, ind_c = ([0] * n for _ in range(8))
+    nan = float("nan")
+    for i, e in enumerate(records):
+        if not isinstance(e, dict):
+            coin_c[i], epoch_c[i], dec_c[i], succ_c[i], rate_c[i], ind_c[i] = -1, nan, -1, nan, nan, -1
+            continue
+        coin = str(e.get("coin") or "").upper().strip()
+        if coin:
+            cid = coin_pos.get(coin)
+            if cid is None:
+                cid = coin_pos[coin] = len(coins)
+                coins.append(coin)
+        else:
+            cid = -1
+        ind = e.get("indicator") or e.get("indicator_name") or e.get("metric")
+        if ind:
+            ind = str(ind)
+            iid = ind_pos.get(ind)
+            if iid is None:
+                iid = ind_pos[ind] = len(indicators)
+                indicators.append(ind)
+        else:
+            iid = -1
+        coin_c[i], epoch_c[i], dec_c[i] = cid, _epoch(e), _decision_code(e)
+        succ_c[i], rate_c[i] = _raw_number(e, "success"), _raw_number(e, "success_rate")
+        corr_c[i], orig_c[i], ind_c[i] = _correct(e), _origin_code(e), iid
+
+    arr = np.empty(n, dtype=DTYPE)
+    for name, col in zip(DTYPE.names, (coin_c, epoch_c, dec_c, succ_c, rate_c, corr_c, orig_c, ind_c)):
+        arr[name] = col
+    arr.flags.writeable = False
+    return LearningColumns(arr, coins, indicators, _head_hash(records))
+
+
+def _file_sig(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_columns(path: str = "learning_log.json") -> LearningColumns:
+    """Lernlog als LearningColumns; geparst wird nur bei neuer Dateiversion."""
+    key = os.path.abspath(path)
+    sig = _file_sig(key)
+    hit = _CACHE.get(key)
+    if hit is not None and hit[0] == sig and sig is not None:
+        return hit[1]
+    records: List[Any] = []
+    error = None
+    if sig is not None:
+        try:
+            with open(key, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            if isinstance(obj, list):
+                records = obj
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"[Learning] Warnung: {path} konnte nicht gelesen werden: {e}")
+    cols = columns_from_records(records)
+    cols.error = error
+    del records
+    _CACHE[key] = (sig, cols)
+    return cols
+
+
+def epoch_to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).isoformat()
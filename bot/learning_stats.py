@@ -0,0 +1,222 @@
+# learning_stats.py — laufende Aggregate über learning_log.json / learn_log.json
+# Je Quelldatei: Tages-Buckets {UTC-Tag: {COIN: {decision: [n, korrekt]}}} plus die
+# letzten Einträge. Schreiber (autolearn, learn_scheduler, feedback_loop) melden neue
+# Zeilen über note_appended(); Abfragen (/learningstats, /autostatus, Report) lesen
+# dann nur noch den kleinen Checkpoint learning_stats.json.
+# Passt die Signatur (mtime/Größe) einer Quelle nicht mehr (Pruning, Handarbeit),
+# wird sie einmal gelesen: reine Anhänge werden nachgefaltet, sonst neu aufgebaut.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from analyze_learning import LEGACY_FILE, PRIMARY_FILE
+from learning_columns import DECISIONS, LearningColumns, columns_from_records, epoch_to_iso, load_columns
+from pending_index import file_sig
+
+STATS_FILE = "learning_stats.json"
+STATS_VERSION = 2
+SOURCES = (PRIMARY_FILE, LEGACY_FILE)
+KEEP_LATEST = 10
+UNDATED = ""   # Bucket für Einträge ohne lesbaren Zeitstempel
+
+
+def _empty_source() -> Dict[str, Any]:
+    return {"sig": None, "rows": 0, "head": None, "days": {}, "latest": []}
+
+
+def _fold(src: Dict[str, Any], cols: LearningColumns, start: int = 0) -> None:
+    """Spalten (Log-Index ab start) gruppiert in die Buckets eines Quell-Eintrags falten."""
+    r = cols.rows
+    valid = np.flatnonzero(r["coin"] >= 0)
+    if len(valid):
+        ep = r["epoch"][valid]
+        dated = ~np.isnan(ep)
+        day_no = np.where(dated, np.floor(np.nan_to_num(ep) / 86400.0), -1).astype(np.int64)
+        keys = np.stack([day_no, r["coin"][valid].astype(np.int64), r["decision"][valid].astype(np.int64)], axis=1)
+        uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+        inv = inv.ravel()
+        n = np.bincount(inv, minlength=len(uniq))
+        ok = np.bincount(inv, weights=r["correct"][valid], minlength=len(uniq))
+        day_names: Dict[int, str] = {}
+        for (d, c, dec), cnt, good in zip(uniq.tolist(), n.tolist(), ok.tolist()):
+            if d not in day_names:
+                day_names[d] = UNDATED if d < 0 else epoch_to_iso(d * 86400.0)[:10]
+            cell = (src["days"].setdefault(day_names[d], {})
+                    .setdefault(cols.coins[c], {})
+                    .setdefault(DECISIONS[dec] if dec >= 0 else "?", [0, 0]))
+            cell[0] += int(cnt)
+            cell[1] += int(good)
+
+        # letzte Einträge: nur datierte, zeitlich stabil sortiert
+        idx = cols.order(r["coin"] >= 0)
+        idx = idx[~np.isnan(r["epoch"][idx])][-KEEP_LATEST:]
+        src["latest"].extend([float(r["epoch"][i]), start + int(i), epoch_to_iso(r["epoch"][i]),
+                              cols.coins[r["coin"][i]], bool(r["correct"][i])] for i in idx)
+        src["latest"].sort()
+        del src["latest"][:-KEEP_LATEST]
+    src["rows"] = start + len(r)
+
+
+class LearningStats:
+    def __init__(self, path: str = STATS_FILE):
+        self.path = path
+        self.sources: Dict[str, Dict[str, Any]] = {s: _empty_source() for s in SOURCES}
+        self.dirty = False
+        self._load()
+
+    # --- Persistenz ---
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except Exception:
+            return
+        if not isinstance(obj, dict) or obj.get("version") != STATS_VERSION:
+            return
+        for s in SOURCES:
+            src = (obj.get("sources") or {}).get(s)
+            if isinstance(src, dict):
+                self.sources[s] = {**_empty_source(), **src}
+
+    def save(self) -> None:
+        d = os.path.dirname(self.path) or "."
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+            json.dump({"version": STATS_VERSION, "sources": self.sources}, tf, ensure_ascii=False)
+            tmp = tf.name
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    # --- Aktualisieren ---
+    def sync(self) -> None:
+        """Quellen mit fremder Signatur nachziehen (nur dann werden Logs gelesen)."""
+        for s in SOURCES:
+            src = self.sources[s]
+            sig = file_sig(s)
+            if sig == src["sig"] and (sig is not None or src["rows"] == 0):
+                continue
+            cols = load_columns(s)
+            if (src["sig"] is not None and src["head"] is not None
+                    and len(cols) >= src["rows"] and cols.head == src["head"]):
+                start = src["rows"]   # nur angehängt
+                _fold(src, LearningColumns(cols.rows[start:], cols.coins, cols.indicators), start)
+            else:
+                src = self.sources[s] = _empty_source()
+                _fold(src, cols)
+                src["head"] = cols.head
+            src["sig"] = sig
+            self.dirty = True
+
+    def appended(self, source: str, before_sig: Optional[List[int]], records: List[Any]) -> bool:
+        """Neue Zeilen nach dem Schreiben übernehmen; False, wenn der Stand nicht passte."""
+        src = self.sources.get(source)
+        if src is None:
+            return False
+        if src["sig"] != before_sig or (before_sig is None and src["rows"]):
+            return False
+        cols = columns_from_records(records)
+        if src["rows"] == 0:
+            src["head"] = cols.head
+        _fold(src, cols, src["rows"])
+        src["sig"] = file_sig(source)
+        self.dirty = True
+        return True
+
+    # --- Abfragen ---
+    def query(self, days: Optional[int] = None) -> Dict[str, Any]:
+        """Gleiche Struktur wie analyze_learning.compute_stats (+ by_decision)."""
+        cutoff_day = None
+        cutoff_ts = None
+        if days and days > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+            cutoff_day = cutoff.strftime("%Y-%m-%d")
+            cutoff_ts = cutoff.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+        by_coin: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        by_dec: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        latest: List[list] = []
+        for order, s in enumerate(SOURCES):
+            src = self.sources[s]
+            for day, coins in src["days"].items():
+                if cutoff_day is not None and (day == UNDATED or day < cutoff_day):
+                    continue
+                for coin, decs in coins.items():
+                    for dec, (n, ok) in decs.items():
+                        by_coin[coin][0] += n
+                        by_coin[coin][1] += ok
+                        by_dec[dec][0] += n
+                        by_dec[dec][1] += ok
+            latest.extend([ts, order, i, iso, coin, ok] for ts, i, iso, coin, ok in src["latest"]
+                          if cutoff_ts is None or ts >= cutoff_ts)
+
+        total = sum(n for n, _ in by_coin.values())
+        if not total:
+            return {
+                "overall": {"total": 0, "correct": 0, "wrong": 0, "accuracy_pct": 0.0},
+                "by_coin": {},
+                "by_decision": {},
+                "latest": [],
+            }
+        correct = sum(ok for _, ok in by_coin.values())
+        latest.sort()
+        latest_fmt = [
+            f"{k+1}. {coin} — {'✅' if ok else '❌'} {iso}"
+            for k, (_, _, _, iso, coin, ok) in enumerate(latest[-KEEP_LATEST:])
+        ]
+        return {
+            "overall": {"total": total, "correct": correct, "wrong": total - correct,
+                        "accuracy_pct": round(100.0 * correct / total, 2)},
+            "by_coin": {c: _kpi(n, ok) for c, (n, ok) in by_coin.items()},
+            "by_decision": {d: _kpi(n, ok) for d, (n, ok) in by_dec.items()},
+            "latest": latest_fmt,
+        }
+
+
+def _kpi(n: int, ok: int) -> Dict[str, Any]:
+    return {"total": n, "correct": ok, "wrong": n - ok,
+            "accuracy_pct": round(100.0 * ok / n, 2) if n else 0.0}
+
+
+def get_stats() -> LearningStats:
+    """Frisch von Platte und mit den Logs abgeglichen."""
+    st = LearningStats()
+    st.sync()
+    if st.dirty:
+        st.save()
+    return st
+
+
+def window_stats(days: Optional[int] = None) -> Dict[str, Any]:
+    """7/30/90-Tage-Fenster (oder gesamt) nur aus den Tages-Buckets."""
+    return get_stats().query(days)
+
+
+def note_appended(source: str, before_sig: Optional[List[int]], records: List[Any]) -> None:
+    """
+    Für Schreiber der Lernlogs: nach dem Schreiben aufrufen. before_sig = file_sig vor
+    dem Schreiben, records = die angehängten Einträge. Passt der Checkpoint nicht,
+    passiert nichts – die nächste Abfrage gleicht dann über die Datei ab.
+    """
+    source = os.path.normpath(source)
+    if source not in SOURCES:
+        return
+    st = LearningStats()
+    if st.appended(source, before_sig, records):
+        st.save()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Lernstatistik aus den laufenden Aggregaten")
+    ap.add_argument("--days", type=int, default=None, help="Zeitfenster in Tagen (Standard: gesamt)")
+    ap.add_argument("--rebuild", action="store_true", help="Checkpoint verwerfen und neu aufbauen")
+    args = ap.parse_args()
+    if args.rebuild and os.path.exists(STATS_FILE):
+        os.remove(STATS_FILE)
+    print(json.dumps(window_stats(args.days), ensure_ascii=False, indent=2))
@@ -9,30 +9,23 @@ from trading import get_profit_estimates, list_all_tradeable_coins
 from sentiment_parser import get_sentiment_data
 from crawler import get_crawler_data
 from ghost_mode import detect_stealth_entry
-from ki_features import _rsi, _ema, _pct, load_json
+from ki_features import load_json, EXTRA_FEATURES
+from feature_store import get_store as get_feature_store, price_features, PRICE_FEATURES
 from ki_model import predict_live
+from indicators import technicals_for_coins
 
 # =========================
-# Zentrale Schwellenwerte
+# Zentrale Schwellenwerte (thresholds.py)
 # =========================
-PANIC_DROP_PCT = -25.0
-
-BULLISH_SELL_PCT = 20.0
-BULLISH_HOLD_FLOOR_PCT = -15.0
-
-BEARISH_SELL_PCT = 12.0
-
-NEUTRAL_SELL_PCT = 18.0
-NEUTRAL_HOLD_FLOOR_PCT = -10.0
-
-RECOMMEND_STRONG_GAIN_BULL = 12.0
-RECOMMEND_STRONG_LOSS_BULL = -18.0
-
-RECOMMEND_STRONG_GAIN_BEAR = 8.0
-RECOMMEND_STRONG_LOSS_BEAR = -10.0
-
-RECOMMEND_STRONG_GAIN_NEUT = 15.0
-RECOMMEND_STRONG_LOSS_NEUT = -15.0
+from thresholds import (
+    PANIC_DROP_PCT,
+    BULLISH_SELL_PCT, BULLISH_HOLD_FLOOR_PCT,
+    BEARISH_SELL_PCT,
+    NEUTRAL_SELL_PCT, NEUTRAL_HOLD_FLOOR_PCT,
+    RECOMMEND_STRONG_GAIN_BULL, RECOMMEND_STRONG_LOSS_BULL,
+    RECOMMEND_STRONG_GAIN_BEAR, RECOMMEND_STRONG_LOSS_BEAR,
+    RECOMMEND_STRONG_GAIN_NEUT, RECOMMEND_STRONG_LOSS_NEUT,
+)
 
 
 # =========================
@@ -123,6 +116,23 @@ def get_trading_decision() -> List[str]:
     return decisions
 
 
+# =========================
+# Technische Lage aller Coins (Batch)
+# =========================
+_TA_EMOJI = {"bullish": "📈", "bearish": "📉", "neutral": "➖"}
+
+def get_universe_technicals(coins: Optional[List[str]] = None, length: int = 100) -> Dict[str, str]:
+    """bullish/bearish/neutral je Coin aus den Store-Closes – ein Kernel-Aufruf für alle Coins."""
+    try:
+        store = get_feature_store()
+        store.sync("history.json")
+        names, prices = store.close_matrix(coins, length=length)
+        return technicals_for_coins(names, prices)
+    except Exception as e:
+        print(f"[Logic] Technicals nicht verfügbar: {e}")
+        return {}
+
+
 # =========================
 # Empfehlungen (Text)
 # =========================
@@ -134,6 +144,7 @@ def recommend_trades() -> List[str]:
     sentiment_info = get_sentiment_data()
     market_sent = _normalize_market_sentiment(sentiment_info)
     recommendations: List[str] = []
+    technicals = get_universe_technicals([p.get("coin", "?") for p in profits])
 
     for p in profits:
         coin = p.get("coin", "?")
@@ -163,6 +174,10 @@ def recommend_trades() -> List[str]:
             else:
                 recommendations.append(f"{coin}: 🤝 Halten ({percent:.2f}%)")
 
+        ta = technicals.get(coin)
+        if ta in _TA_EMOJI:
+            recommendations[-1] += f" | TA {_TA_EMOJI[ta]} {ta}"
+
     return recommendations
 
 
@@ -211,26 +226,23 @@ def make_trade_decision() -> Dict[str, str]:
 # Lern-Log Ausgabe
 # =========================
 def get_learning_log() -> str:
+    from learning_columns import epoch_to_iso, load_columns
     filepath = os.path.join(os.path.dirname(__file__), "learning_log.json")
     if not os.path.exists(filepath):
         return "❌ Noch kein Lernverlauf vorhanden."
 
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
+    cols = load_columns(filepath)
+    if cols.error is not None:
         return "⚠️ Lernlog-Datei beschädigt oder nicht lesbar."
-
-    if not isinstance(data, list) or not data:
+    if not len(cols):
         return "📘 Lernlog ist leer."
 
     output = "📘 Lernverlauf (letzte 5 Einträge):\n"
-    for eintrag in data[-5:]:
-        datum = eintrag.get("date") or eintrag.get("evaluated_at") or "???"
-        coin = eintrag.get("coin", "???")
-        erfolg = eintrag.get("success") or eintrag.get("success_rate") or "?"
-        if isinstance(erfolg, (int, float)):
-            erfolg = f"{float(erfolg):.1f}"
+    success = cols.success_any()[-5:]
+    for r, s in zip(cols.rows[-5:], success):
+        datum = epoch_to_iso(r["epoch"])[:19].replace("T", " ") if r["epoch"] == r["epoch"] else "???"
+        coin = cols.coins[r["coin"]] if r["coin"] >= 0 else "???"
+        erfolg = f"{float(s):.1f}" if s == s else "?"
         output += f"📅 {datum} | {coin} | Erfolg: {erfolg}%\n"
     return output
 
@@ -248,29 +260,24 @@ def run_ghost_analysis() -> list:
 # =========================
 # KI-Score-Berechnung
 # =========================
-def build_live_features(coin, last_prices, crawler_coin, senti_coin):
-    curr = last_prices[-1]
-    rsi = _rsi(last_prices[-30:])
-    ema12 = _ema(last_prices[-30:], 12)
-    ema26 = _ema(last_prices[-60:], 26)
-    macd = (ema12 or curr) - (ema26 or curr)
-    ret_1h = _pct(last_prices[-1], last_prices[-2]) if len(last_prices) >= 2 else 0
-    ret_6h = _pct(last_prices[-1], last_prices[-7]) if len(last_prices) >= 7 else 0
-    ret_24h = _pct(last_prices[-1], last_prices[-25]) if len(last_prices) >= 25 else 0
+def _live_extras(crawler_coin, senti_coin):
     vol_trend = (crawler_coin or {}).get("trend_score", 0.0)
     mentions = (crawler_coin or {}).get("mentions", 0)
     senti_score = (senti_coin or {}).get("score", 0.0)
-    return [curr, rsi or 50.0, macd, ret_1h, ret_6h, ret_24h, vol_trend, mentions, senti_score]
+    return [vol_trend, mentions, senti_score]
+
+def build_live_features(coin, last_prices, crawler_coin, senti_coin):
+    return price_features(last_prices, len(last_prices) - 1) + _live_extras(crawler_coin, senti_coin)
 
 def get_ki_score_for_coin(coin):
-    hist = load_json("history.json")
-    if not hist:
-        return 0.5
-    ts = sorted(hist.keys())[-30:]
-    prices = [hist[t].get(coin) for t in ts if coin in hist[t]]
-    if len(prices) < 30:
+    # Preis-Features aus dem Feature-Store (identisch zum Training, nur neue Zeitstempel werden gerechnet)
+    store = get_feature_store()
+    store.sync("history.json")
+    row = store.latest(coin)
+    newest = max((v.get("last", 0) for v in store.meta["coins"].values()), default=None)
+    if row is None or row["n"] < 30 or row["ts"] != newest:
         return 0.5
     crawler = load_json("crawler_data.json").get(coin, {})
     senti = load_json("sentiment_snapshot.json").get(coin, {})
-    row = build_live_features(coin, prices, crawler, senti)
-    return predict_live(row)
+    row = [row[c] for c in PRICE_FEATURES] + _live_extras(crawler, senti)
+    return predict_live(row, features=list(PRICE_FEATURES) + list(EXTRA_FEATURES))
@@ -28,12 +28,12 @@ from logic import (
 )
 from bootstrap_learning import bootstrap_learning_if_empty
 from sentiment_parser import get_sentiment_data
-from indicators import calculate_indicators
+from indicators import calculate_indicators, evaluate_indicators
 from binance.client import Client
 from trading import get_portfolio, get_profit_estimates
 from decision_logger import log_trade_decisions
 from feedback_loop import run_feedback_loop
-from visualize_learning import generate_heatmap
+from visualize_learning import generate_heatmap_async
 from ghost_mode import (
     run_ghost_mode,
     run_ghost_analysis,
@@ -174,7 +174,7 @@ def cmd_commands(message):
 📈 *Trading & Analyse*
 /portfolio — Zeigt dein Portfolio
 /profit — Gewinn- & Verlustübersicht
-/indicators — RSI, MACD, EMA, Bollinger (BTCUSDT live)
+/indicators BTC — RSI, MACD, EMA, Bollinger (alle Coins, live)
 /recommend — Trading-Empfehlungen
 /tradelogic — Entscheidungssimulation
 /panic — Notbremsenprüfung
@@ -190,6 +190,7 @@ def cmd_commands(message):
 /histsim — Alias für historisches Szenario
 /livesim — Live-Simulation (loggt alle Coins)
 /simstatus — Status der letzten Simulationen
+/paper — Paper-Trading aller Strategien (/paper NAME → Equity-Kurve)
 
 👻 *Ghost Mode*
 /ghostmode — Scannt neue Ghost Entries
@@ -279,6 +280,27 @@ def cmd_simstatus(message):
     except Exception as e:
         safe_send(message.chat.id, f"❌ Fehler bei /simstatus: {e}")
 
+# ——— Paper-Trading: Strategien + Equity-Kurven
+@bot.message_handler(commands=['paper'])
+def cmd_paper(message):
+    if not is_admin(message): return
+    try:
+        from paper_trading import CHART_FILE, PaperEngine, format_summary
+        engine = PaperEngine()
+        parts = message.text.split()[1:]
+        unknown = [n for n in parts if n not in engine.spec.names]
+        if unknown:
+            safe_send(message.chat.id, f"❓ Unbekannte Strategie: {', '.join(unknown)}\n"
+                                       f"Verfügbar: {', '.join(engine.spec.names)}")
+            return
+        safe_send(message.chat.id, format_summary(engine))
+        path = engine.render(parts or None, CHART_FILE)
+        if path and os.path.isfile(path):
+            with open(path, "rb") as f:
+                bot.send_photo(message.chat.id, f, caption="📈 Equity: " + (", ".join(parts) or "alle Strategien"))
+    except Exception as e:
+        safe_send(message.chat.id, f"❌ Fehler bei /paper: {e}")
+
 @bot.message_handler(commands=['recommend'])
 def cmd_recommend(message):
     if not is_admin(message): return
@@ -346,20 +368,26 @@ def cmd_sentiment(message):
 def cmd_indicators(message):
     if not is_admin(message): return
     try:
-        client = Client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_API_SECRET"))
-        klines = client.get_klines(symbol='BTCUSDT', interval='1h', limit=100)
-        import pandas as pd
-        df = pd.DataFrame(klines, columns=[
-            "timestamp", "open", "high", "low", "close", "volume",
-            "close_time", "quote_asset_volume", "trades", "taker_buy_base", "taker_buy_quote", "ignore"
-        ]).astype(float)
-        result = calculate_indicators(df)
+        args = (message.text or "").split()
+        coin = args[1].upper().replace("USDT", "") if len(args) > 1 else "BTC"
+        result = calculate_indicators(coin=coin)
+        if "error" in result or result.get("n", 0) < 50:
+            # Kaltstart: Engine-Zustand einmalig aus 100 Stundenkerzen aufbauen
+            client = Client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_API_SECRET"))
+            klines = client.get_klines(symbol=f"{coin}USDT", interval='1h', limit=100)
+            import pandas as pd
+            df = pd.DataFrame(klines, columns=[
+                "timestamp", "open", "high", "low", "close", "volume",
+                "close_time", "quote_asset_volume", "trades", "taker_buy_base", "taker_buy_quote", "ignore"
+            ]).astype(float)
+            result = calculate_indicators(df, coin=coin)
         msg = (
-            f"📈 Technische Analyse BTCUSDT\n"
+            f"📈 Technische Analyse {coin}USDT\n"
             f"RSI: {result.get('rsi',0):.2f}\n"
             f"MACD: {result.get('macd',0):.4f} | Signal: {result.get('macd_signal',0):.4f}\n"
             f"EMA20: {result.get('ema20',0):.2f} | EMA50: {result.get('ema50',0):.2f}\n"
-            f"Bollinger%: {result.get('bb_percent',0):.2f}"
+            f"Bollinger%: {result.get('bb_percent',0):.2f}\n"
+            f"Bewertung: {evaluate_indicators(result)}"
         )
         safe_send(message.chat.id, msg)
     except Exception as e:
@@ -368,15 +396,22 @@ def cmd_indicators(message):
 @bot.message_handler(commands=['heatmap'])
 def cmd_heatmap(message):
     if not is_admin(message): return
-    try:
-        path = generate_heatmap()
-        if path and os.path.isfile(path):
-            with open(path, "rb") as f:
-                bot.send_photo(message.chat.id, f, caption="📊 Heatmap der Lernbewertung")
-        else:
-            safe_send(message.chat.id, "📭 Keine Heatmap erzeugt.")
-    except Exception as e:
-        safe_send(message.chat.id, f"❌ Fehler bei /heatmap: {e}")
+    chat_id = message.chat.id
+
+    # Rendern im Hintergrund, damit der Webhook sofort antwortet
+    def _done(path, err):
+        try:
+            if err is not None:
+                raise err
+            if path and os.path.isfile(path):
+                with open(path, "rb") as f:
+                    bot.send_photo(chat_id, f, caption="📊 Heatmap der Lernbewertung")
+            else:
+                safe_send(chat_id, "📭 Keine Heatmap erzeugt.")
+        except Exception as e:
+            safe_send(chat_id, f"❌ Fehler bei /heatmap: {e}")
+
+    generate_heatmap_async(_done)
 
 @bot.message_handler(commands=['learninglog'])
 def cmd_learninglog(message):
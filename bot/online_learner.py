@@ -0,0 +1,174 @@
+# online_learner.py — inkrementelles KI-Modell (partial_fit) für OmertaTradeBot
+# Wird mit jeder Auswertung aus feedback_loop.run_feedback_loop fortgeschrieben,
+# statt nur einmal täglich von Grund auf neu zu trainieren.
+# Features wie train_ki_model: ret_24h / vol_24h (Fenster bis zum Entscheidungszeitpunkt).
+# Der nächtliche Voll-Retrain (train_ki_model.train_model) bleibt als Konsolidierung.
+
+import json, os, pickle, time
+from datetime import datetime
+from pathlib import Path
+
+MODELS_DIR      = Path("models")
+ONLINE_PATH     = MODELS_DIR / "ki_online.pkl"
+ONLINE_META     = MODELS_DIR / "ki_online.json"
+ONLINE_LINEAR   = MODELS_DIR / "ki_online_linear.json"   # pickle-freies Artefakt für predict_ki
+
+CHECKPOINT_EVERY   = 25      # spätestens nach so vielen Updates speichern
+CHECKPOINT_SECONDS = 3600    # ... oder nach dieser Zeit (falls ungesicherte Updates)
+CONSOLIDATE_EPOCHS = 5       # Durchläufe beim Neuaufbau aus dem Gesamtdatensatz
+
+FEATURES = ["ret_24h", "vol_24h"]
+
+
+class OnlineLearner:
+    """StandardScaler + SGDClassifier(log_loss), beide über partial_fit."""
+
+    def __init__(self, path: Path = ONLINE_PATH, meta_path: Path = ONLINE_META):
+        self.path = Path(path)
+        self.meta_path = Path(meta_path)
+        self.scaler = None
+        self.clf = None
+        self.n_updates = 0
+        self.n_pos = 0
+        self.pending = 0
+        self.last_save = time.monotonic()
+        self.updated_at = None
+        self.loaded_mtime = None
+        self._load()
+
+    # --- Persistenz ---
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            self.loaded_mtime = self.path.stat().st_mtime
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            self.scaler = state["scaler"]
+            self.clf = state["clf"]
+            self.n_updates = int(state.get("n_updates", 0))
+            self.n_pos = int(state.get("n_pos", 0))
+            self.updated_at = state.get("updated_at")
+        except Exception as e:
+            print(f"[KI-Online] Checkpoint nicht lesbar ({e}) – starte neu.")
+            self.scaler = self.clf = None
+
+    def checkpoint(self):
+        if self.clf is None:
+            return
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"scaler": self.scaler, "clf": self.clf, "n_updates": self.n_updates,
+                         "n_pos": self.n_pos, "updated_at": self.updated_at}, f)
+        os.replace(tmp, self.path)
+        self.loaded_mtime = self.path.stat().st_mtime
+        with self.meta_path.open("w", encoding="utf-8") as f:
+            json.dump(self.status(), f, ensure_ascii=False, indent=2)
+        from ki_linear import from_sklearn, save_linear
+        save_linear(from_sklearn(self.clf, self.scaler, FEATURES,
+                                 meta={"n_updates": self.n_updates, "updated_at": self.updated_at}),
+                    ONLINE_LINEAR)
+        self.pending = 0
+        self.last_save = time.monotonic()
+
+    def _maybe_checkpoint(self):
+        if self.pending >= CHECKPOINT_EVERY or (
+                self.pending and time.monotonic() - self.last_save >= CHECKPOINT_SECONDS):
+            self.checkpoint()
+
+    # --- Lernen ---
+    def _fresh(self):
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.linear_model import SGDClassifier
+        self.scaler = StandardScaler()
+        self.clf = SGDClassifier(loss="log_loss", alpha=1e-4, learning_rate="optimal", random_state=42)
+        self.n_updates = 0
+        self.n_pos = 0
+
+    def partial_fit(self, X, y):
+        """Ein Mini-Batch neuer Auswertungen; Rückgabe: Anzahl verarbeiteter Zeilen."""
+        if not X:
+            return 0
+        if self.clf is None:
+            self._fresh()
+        self.scaler.partial_fit(X)
+        self.clf.partial_fit(self.scaler.transform(X), y, classes=[0, 1])
+        self.n_updates += len(y)
+        self.n_pos += sum(y)
+        self.pending += len(y)
+        self.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._maybe_checkpoint()
+        return len(y)
+
+    def consolidate(self, X, y, epochs: int = CONSOLIDATE_EPOCHS):
+        """Neuaufbau aus dem kompletten Datensatz (nächtlicher Retrain) + sofortiger Checkpoint."""
+        if not X:
+            return 0
+        import numpy as np
+        self._fresh()
+        Xa, ya = np.asarray(X, dtype=float), np.asarray(y, dtype=int)
+        self.scaler.fit(Xa)
+        Xs = self.scaler.transform(Xa)
+        rng = np.random.default_rng(42)
+        for _ in range(max(1, epochs)):
+            order = rng.permutation(len(ya))
+            self.clf.partial_fit(Xs[order], ya[order], classes=[0, 1])
+        self.n_updates = int(len(ya))
+        self.n_pos = int(ya.sum())
+        self.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.checkpoint()
+        return len(ya)
+
+    # --- Vorhersage ---
+    def ready(self) -> bool:
+        return self.clf is not None and self.n_updates > 0
+
+    def predict_proba(self, features):
+        if not self.ready():
+            return None
+        return float(self.clf.predict_proba(self.scaler.transform([features]))[0, 1])
+
+    def status(self):
+        return {
+            "n_updates": self.n_updates,
+            "positives": self.n_pos,
+            "pending_checkpoint": self.pending,
+            "updated_at": self.updated_at,
+            "features": FEATURES,
+        }
+
+
+_LEARNER = None
+
+
+def get_learner() -> OnlineLearner:
+    """Prozessweite Instanz; lädt neu, wenn ein anderer Prozess (Web/Worker) gespeichert hat."""
+    global _LEARNER
+    if _LEARNER is None:
+        _LEARNER = OnlineLearner()
+    elif not _LEARNER.pending and ONLINE_PATH.exists() and \
+            ONLINE_PATH.stat().st_mtime != _LEARNER.loaded_mtime:
+        _LEARNER = OnlineLearner()
+    return _LEARNER
+
+
+def learn_from_evaluations(samples):
+    """
+    samples: Liste [(features, success_pct), ...] aus dem Feedback-Loop.
+    Label = 1, wenn success > 0 (wie im Voll-Training).
+    Am Ende des Batches wird immer gesichert – die stündlichen Batches sind meist kleiner
+    als CHECKPOINT_EVERY, und predict_ki (anderer Prozess) liest nur den Checkpoint.
+    """
+    X = [list(f) for f, _ in samples if f is not None]
+    y = [1 if float(s) > 0 else 0 for f, s in samples if f is not None]
+    if not X:
+        return 0
+    try:
+        learner = get_learner()
+        n = learner.partial_fit(X, y)
+        if learner.pending:
+            learner.checkpoint()
+        return n
+    except ModuleNotFoundError:
+        return 0
@@ -0,0 +1,378 @@
+# paper_trading.py — Paper-Trading mehrerer Strategie-Varianten nebeneinander
+# Eine Preis-Aktualisierung wird genau einmal verarbeitet: Entscheidungen aller Strategien
+# als Matrix [Strategien, Coins] (Schwellen wie make_trade_decision, optional KI-Filter und
+# Ghost-Regeln), Ausführung wie trading.simulate_trade – vektorisiert über die Strategien.
+# Zustand (Guthaben [S], Bestände [S, C], Equity-Kurven [N, S]) liegt in paper_trading.npz.
+# Strategien: paper_strategies.json (Liste) oder DEFAULT_STRATEGIES; neue Varianten starten
+# beim nächsten Lauf mit START_BALANCE, entfernte fallen heraus.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backtest import BUY, BUY_FRACTION, HOLD, MIN_BALANCE, SELL, START_BALANCE, max_drawdown_pct
+from thresholds import DECISION_KEYS, decision_thresholds
+
+STATE_FILE = "paper_trading.npz"
+STRATEGIES_FILE = "paper_strategies.json"
+CHART_FILE = "paper_equity.png"
+MAX_POINTS = 24 * 365          # Equity-Kurve: höchstens ein Jahr stündlicher Punkte
+
+# Ghost-Regeln wie ghost_mode.detect_stealth_entry / _should_exit_now
+GHOST_ENTRY_MAX_PCT = 2.0
+GHOST_ENTRY_MAX_MENTIONS = 50
+GHOST_ENTRY_MIN_SENTI = 0.6
+GHOST_ENTRY_MIN_TREND = 0.4
+GHOST_EXIT_SENTI = 0.75
+GHOST_EXIT_MENTIONS = 200
+GHOST_EXIT_TREND = 0.70
+
+# name, thresholds (Überschreibungen), ki_buy_min (BUY nur ab KI-Score), ki_sell_below
+# (gehaltene Coins unter KI-Score verkaufen), ghost (Ghost-Entry kauft, Ghost-Exit verkauft)
+DEFAULT_STRATEGIES: List[Dict[str, Any]] = [
+    {"name": "basis"},
+    {"name": "ki_filter", "ki_buy_min": 0.55},
+    {"name": "ki_exit", "ki_buy_min": 0.5, "ki_sell_below": 0.4},
+    {"name": "defensiv", "thresholds": {"BULLISH_SELL_PCT": 12.0, "BULLISH_HOLD_FLOOR_PCT": -8.0,
+                                        "NEUTRAL_SELL_PCT": 10.0, "NEUTRAL_HOLD_FLOOR_PCT": -5.0}},
+    {"name": "ghost", "ghost": True},
+]
+
+
+# ---------- Strategien ----------
+def load_strategies(path: str = STRATEGIES_FILE) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        if isinstance(obj, list) and obj:
+            return [s for s in obj if isinstance(s, dict) and s.get("name")]
+    except Exception:
+        pass
+    return list(DEFAULT_STRATEGIES)
+
+
+class StrategySet:
+    """Strategie-Parameter als Spalten: th [S, 5] (DECISION_KEYS), ki_buy_min/ki_sell_below [S], ghost [S]."""
+
+    def __init__(self, strategies: Sequence[Dict[str, Any]]):
+        base = decision_thresholds()
+        self.names = [str(s["name"]) for s in strategies]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Strategie-Namen müssen eindeutig sein")
+        self.th = np.array([[float({**base, **(s.get("thresholds") or {})}[k]) for k in DECISION_KEYS]
+                            for s in strategies]).reshape(len(strategies), len(DECISION_KEYS))
+        self.ki_buy_min = np.array([float(s.get("ki_buy_min") or 0.0) for s in strategies])
+        self.ki_sell_below = np.array([float(s.get("ki_sell_below") or 0.0) for s in strategies])
+        self.ghost = np.array([bool(s.get("ghost")) for s in strategies])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def uses_ki(self) -> bool:
+        return bool((self.ki_buy_min > 0).any() or (self.ki_sell_below > 0).any())
+
+    @property
+    def uses_ghost(self) -> bool:
+        return bool(self.ghost.any())
+
+    def decide(self, pct: np.ndarray, sentiment: str, held: np.ndarray,
+               ki: Optional[np.ndarray] = None, ghost_entry: Optional[np.ndarray] = None,
+               ghost_exit: Optional[np.ndarray] = None) -> np.ndarray:
+        """Entscheidungen [S, C] für einen Zeitpunkt (pct [C], NaN = kein Vergleichskurs)."""
+        col = {k: self.th[:, i][:, None] for i, k in enumerate(DECISION_KEYS)}
+        valid = ~np.isnan(pct)[None, :]
+        p = np.nan_to_num(pct)[None, :]
+        if sentiment == "bullish":
+            sell, hold = p > col["BULLISH_SELL_PCT"], p < col["BULLISH_HOLD_FLOOR_PCT"]
+        elif sentiment == "bearish":
+            sell, hold = p > col["BEARISH_SELL_PCT"], np.ones_like(p, dtype=bool)
+        else:
+            sell, hold = p > col["NEUTRAL_SELL_PCT"], p < col["NEUTRAL_HOLD_FLOOR_PCT"]
+        # ohne Vergleichskurs: HOLD (live übersprungen)
+        dec = np.where(valid & sell, SELL, np.where(hold | ~valid, HOLD, BUY)).astype(np.int8)
+
+        if ki is not None:
+            k = ki[None, :]
+            dec[(dec == BUY) & (k < self.ki_buy_min[:, None])] = HOLD
+            dec[held & valid & (k < self.ki_sell_below[:, None])] = SELL
+        if ghost_entry is not None and self.uses_ghost:
+            g = self.ghost[:, None]
+            dec[g & ghost_entry[None, :] & (dec == HOLD) & valid] = BUY
+            if ghost_exit is not None:
+                dec[g & ghost_exit[None, :] & held] = SELL
+        return dec
+
+
+# ---------- Engine ----------
+class PaperEngine:
+    def __init__(self, strategies: Optional[Sequence[Dict[str, Any]]] = None, path: str = STATE_FILE):
+        self.path = path
+        self.spec = StrategySet(strategies if strategies is not None else load_strategies())
+        S = len(self.spec)
+        self.coins: List[str] = []
+        self.balance = np.full(S, START_BALANCE)
+        self.holdings = np.zeros((S, 0))
+        self.last_px = np.zeros(0)        # letzter bekannter Preis je Spalte (Bewertung fehlender Ticker)
+        self.trades = np.zeros(S, dtype=np.int64)
+        self.epochs = np.empty(0, dtype=np.int64)
+        self.equity = np.empty((0, S))
+        self._load()
+
+    # --- Persistenz ---
+    def _load(self) -> None:
+        try:
+            with np.load(self.path) as z:
+                names = [str(n) for n in z["names"]]
+                coins = [str(c) for c in z["coins"]]
+                balance, holdings, trades = z["balance"], z["holdings"], z["trades"]
+                epochs, equity = z["epochs"], z["equity"]
+                last_px = z["last_px"] if "last_px" in z.files else np.zeros(len(coins))
+        except Exception:
+            return
+        self.coins = coins
+        self.last_px = last_px.astype(np.float64)
+        self.holdings = np.zeros((len(self.spec), len(coins)))
+        self.equity = np.full((len(epochs), len(self.spec)), np.nan)
+        self.epochs = epochs.astype(np.int64)
+        pos = {n: i for i, n in enumerate(names)}
+        for s, name in enumerate(self.spec.names):   # bekannte Strategien übernehmen, neue frisch
+            i = pos.get(name)
+            if i is None:
+                continue
+            self.balance[s] = balance[i]
+            self.holdings[s] = holdings[i]
+            self.trades[s] = trades[i]
+            self.equity[:, s] = equity[:, i]
+
+    def save(self) -> None:
+        d = os.path.dirname(self.path) or "."
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=d, suffix=".tmp") as tf:
+            np.savez(tf, names=np.asarray(self.spec.names), coins=np.asarray(self.coins, dtype=str),
+                     balance=self.balance, holdings=self.holdings, last_px=self.last_px, trades=self.trades,
+                     epochs=self.epochs, equity=self.equity)
+            tmp = tf.name
+        os.replace(tmp, self.path)
+
+    # --- Aktualisieren ---
+    def _columns(self, coins: Sequence[str]) -> np.ndarray:
+        """Spalten-Indizes für coins; unbekannte Coins werden angehängt."""
+        pos = {c: j for j, c in enumerate(self.coins)}
+        new = [c for c in coins if c not in pos]
+        if new:
+            for c in new:
+                pos[c] = len(self.coins)
+                self.coins.append(c)
+            self.holdings = np.hstack([self.holdings, np.zeros((len(self.spec), len(new)))])
+            self.last_px = np.concatenate([self.last_px, np.zeros(len(new))])
+        return np.array([pos[c] for c in coins], dtype=np.int64)
+
+    def step(self, prices: Dict[str, float], pct: Dict[str, float], sentiment: str = "neutral", *,
+             ki: Optional[Dict[str, float]] = None, ghost: Optional[Dict[str, Tuple[bool, bool]]] = None,
+             epoch: Optional[int] = None) -> np.ndarray:
+        """
+        Eine Preis-Aktualisierung für alle Strategien. prices/pct: {COIN: EUR / % ggü. letztem
+        Snapshot}; ki: {COIN: Score}; ghost: {COIN: (entry, exit)}. Rückgabe: Equity [S] –
+        Bestände ohne Preis in diesem Update zählen mit ihrem letzten bekannten Preis.
+        """
+        coins = sorted(c for c, p in prices.items() if p and p > 0)
+        idx = self._columns(coins)
+        px = np.array([float(prices[c]) for c in coins])
+        self.last_px[idx] = px
+        pc = np.array([float(pct[c]) if pct.get(c) is not None else np.nan for c in coins])
+        held = self.holdings[:, idx] > 0
+        ki_arr = np.array([float(ki.get(c, 0.5)) for c in coins]) if ki is not None else None
+        g_in = g_out = None
+        if ghost is not None:
+            g_in = np.array([bool(ghost.get(c, (False, False))[0]) for c in coins], dtype=bool)
+            g_out = np.array([bool(ghost.get(c, (False, False))[1]) for c in coins], dtype=bool)
+        dec = self.spec.decide(pc, sentiment, held, ki_arr, g_in, g_out)
+
+        # Ausführung wie simulate_trade: Coins in fester Reihenfolge, je Coin alle Strategien
+        bal, hold = self.balance, self.holdings
+        for k in np.flatnonzero((dec != HOLD).any(axis=0)):
+            d, p, j = dec[:, k], px[k], idx[k]
+            buy = (d == BUY) & (bal > MIN_BALANCE)
+            if buy.any():
+                qty = np.round(bal[buy] * BUY_FRACTION / p, 6)
+                hold[buy, j] = np.round(hold[buy, j] + qty, 6)
+                bal[buy] = np.round(bal[buy] - qty * p, 2)
+                self.trades += buy
+            sell = (d == SELL) & (hold[:, j] > 0)
+            if sell.any():
+                bal[sell] = np.round(bal[sell] + hold[sell, j] * p, 2)
+                hold[sell, j] = 0.0
+                self.trades += sell
+
+        eq = bal + hold @ self.last_px
+        ep = int(time.time()) if epoch is None else int(epoch)
+        self.epochs = np.append(self.epochs, ep)[-MAX_POINTS:]
+        self.equity = np.vstack([self.equity, eq[None, :]])[-MAX_POINTS:]
+        return eq
+
+    # --- Abfragen ---
+    def curve(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        s = self.spec.names.index(name)
+        ok = ~np.isnan(self.equity[:, s])
+        return self.epochs[ok], self.equity[ok, s]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = []
+        for s, name in enumerate(self.spec.names):
+            _, eq = self.curve(name)
+            last = float(eq[-1]) if len(eq) else float(self.balance[s])
+            rows.append({
+                "name": name,
+                "equity": round(last, 2),
+                "return_pct": round((last / START_BALANCE - 1.0) * 100.0, 2),
+                "max_drawdown_pct": max_drawdown_pct(eq),
+                "balance": round(float(self.balance[s]), 2),
+                "positions": int((self.holdings[s] > 0).sum()),
+                "trades": int(self.trades[s]),
+                "points": int(len(eq)),
+            })
+        return sorted(rows, key=lambda r: r["equity"], reverse=True)
+
+    def render(self, names: Optional[Sequence[str]] = None, save_path: str = CHART_FILE) -> Optional[str]:
+        """Equity-Kurven als PNG (Figure ohne pyplot, wie visualize_learning)."""
+        from matplotlib.figure import Figure
+        names = list(names) if names else self.spec.names
+        fig = Figure(figsize=(10, 5))
+        ax = fig.add_subplot(111)
+        drawn = 0
+        for name in names:
+            ep, eq = self.curve(name)
+            if len(eq):
+                ax.plot([datetime.fromtimestamp(int(e), tz=timezone.utc) for e in ep], eq, label=name)
+                drawn += 1
+        if not drawn:
+            return None
+        ax.axhline(START_BALANCE, color="grey", linewidth=0.8, linestyle="--")
+        ax.set_ylabel("Equity (EUR)")
+        ax.set_title("Paper-Trading: Equity je Strategie")
+        ax.legend(loc="best", fontsize=8)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        fig.savefig(save_path, dpi=110)
+        return save_path
+
+
+# ---------- Live-Zyklus ----------
+def _ki_scores(coins: Sequence[str]) -> Dict[str, float]:
+    """KI-Score je Coin wie logic.get_ki_score_for_coin, aber ein predict_proba für alle."""
+    from feature_store import PRICE_FEATURES, get_store
+    from ki_features import CRAWLER_FILE, EXTRA_FEATURES, SENTI_FILE, load_json
+    from ki_model import predict_batch
+
+    store = get_store()
+    store.sync("history.json")
+    newest = max((v.get("last", 0) for v in store.meta["coins"].values()), default=None)
+    crawler, senti = load_json(CRAWLER_FILE), load_json(SENTI_FILE)
+    rows, names = [], []
+    for c in coins:
+        r = store.latest(c)
+        if r is None or r["n"] < 30 or r["ts"] != newest:
+            continue
+        rows.append([r[k] for k in PRICE_FEATURES] + [(crawler.get(c) or {}).get("trend_score", 0.0),
+                                                      (crawler.get(c) or {}).get("mentions", 0),
+                                                      (senti.get(c) or {}).get("score", 0.0)])
+        names.append(c)
+    p = predict_batch(rows, features=list(PRICE_FEATURES) + list(EXTRA_FEATURES)) if rows else None
+    return {} if p is None else dict(zip(names, p.tolist()))
+
+
+def _ghost_flags(pct: Dict[str, float]) -> Dict[str, Tuple[bool, bool]]:
+    from crawler import get_crawler_data
+    from ghost_mode import _normalize_crawler, _normalize_sentiment
+    from sentiment_parser import get_sentiment_data
+    senti = _normalize_sentiment(get_sentiment_data())
+    crawl = _normalize_crawler(get_crawler_data())
+    out = {}
+    for c, p in pct.items():
+        s = float(senti.get(c, {}).get("score", 0) or 0)
+        m = int(crawl.get(c, {}).get("mentions", 0) or 0)
+        t = float(crawl.get(c, {}).get("trend_score", 0) or 0)
+        entry = (p is not None and p < GHOST_ENTRY_MAX_PCT and m < GHOST_ENTRY_MAX_MENTIONS
+                 and s > GHOST_ENTRY_MIN_SENTI and t > GHOST_ENTRY_MIN_TREND)
+        exit_ = s >= GHOST_EXIT_SENTI or m >= GHOST_EXIT_MENTIONS or t >= GHOST_EXIT_TREND
+        out[c] = (entry, exit_)
+    return out
+
+
+def run_paper_cycle() -> str:
+    """Stündlich: aktuelle Schätzungen einmal laden und alle Strategien einen Schritt handeln lassen."""
+    from logic import _normalize_market_sentiment
+    from sentiment_parser import get_sentiment_data
+    from trading import get_profit_estimates
+
+    profits = get_profit_estimates() or []
+    prices = {p["coin"]: float(p["current"]) for p in profits if p.get("coin") and p.get("current")}
+    if not prices:
+        return "⚠️ Paper-Trading: keine Kursdaten."
+    pct = {p["coin"]: p.get("percent") for p in profits if p.get("coin") in prices}
+    engine = PaperEngine()
+    engine.step(prices, pct, _normalize_market_sentiment(get_sentiment_data()),
+                ki=_ki_scores(sorted(prices)) if engine.spec.uses_ki else None,
+                ghost=_ghost_flags(pct) if engine.spec.uses_ghost else None)
+    engine.save()
+    best = engine.summary()[0]
+    return f"📒 Paper-Trading: {len(engine.spec)} Strategien, {len(prices)} Coins | vorne: {best['name']} {best['return_pct']} %"
+
+
+def replay_history(history: Any = None, strategies: Optional[Sequence[Dict[str, Any]]] = None, *,
+                   sentiment: Any = "breadth", path: str = STATE_FILE) -> PaperEngine:
+    """
+    Spielt history.json in einem Durchlauf durch alle Strategien (ohne KI/Ghost-Daten,
+    also KI neutral 0.5). Zum Vergleichen/Vorbefüllen; gespeichert wird nicht automatisch.
+    """
+    from backtest import SENTIMENTS, load_prices, market_sentiment, percent_change
+    epochs, coins, prices = load_prices(history)
+    engine = PaperEngine(strategies, path=path)
+    engine.coins, engine.holdings = [], np.zeros((len(engine.spec), 0))
+    engine.balance[:] = START_BALANCE
+    engine.trades[:] = 0
+    engine.epochs, engine.equity = np.empty(0, dtype=np.int64), np.empty((0, len(engine.spec)))
+    if not coins:
+        return engine
+    pct = percent_change(prices)
+    sent = market_sentiment(pct, sentiment)
+    neutral = {c: 0.5 for c in coins} if engine.spec.uses_ki else None
+    for t in range(len(epochs)):
+        row, prow = prices[t], pct[t]
+        px = {c: float(row[j]) for j, c in enumerate(coins) if row[j] == row[j]}
+        pc = {c: (None if prow[j] != prow[j] else float(prow[j])) for j, c in enumerate(coins)}
+        engine.step(px, pc, SENTIMENTS[sent[t]], ki=neutral, epoch=int(epochs[t]))
+    return engine
+
+
+def format_summary(engine: Optional[PaperEngine] = None) -> str:
+    engine = engine or PaperEngine()
+    rows = engine.summary()
+    if not rows or not rows[0]["points"]:
+        return "📭 Noch keine Paper-Trading-Daten."
+    lines = ["📒 Paper-Trading (Equity | Rendite | Max-DD | Trades | Positionen)"]
+    for r in rows:
+        lines.append(f"• {r['name']}: {r['equity']:.2f} € | {r['return_pct']} % | "
+                     f"{r['max_drawdown_pct']} % | {r['trades']} | {r['positions']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Paper-Trading mehrerer Strategien")
+    ap.add_argument("--replay", action="store_true", help="history.json einmal durch alle Strategien spielen")
+    ap.add_argument("--save", action="store_true", help=f"Replay-Zustand nach {STATE_FILE} schreiben")
+    ap.add_argument("--chart", action="store_true", help=f"Equity-Kurven nach {CHART_FILE}")
+    args = ap.parse_args()
+    eng = replay_history() if args.replay else PaperEngine()
+    if args.replay and args.save:
+        eng.save()
+    print(format_summary(eng))
+    if args.chart:
+        print(eng.render() or "Keine Kurven.")
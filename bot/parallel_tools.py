@@ -0,0 +1,123 @@
+# parallel_tools.py — Prozess-Pool + Shared-Memory-Arrays für Datensatz-Jobs
+# Preis-Arrays werden einmal als .npy (bevorzugt in /dev/shm) abgelegt und in den
+# Workern per mmap geöffnet, statt sie für jeden Task zu pickeln.
+
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+WORKERS_ENV = "KI_WORKERS"
+_SHM_DIR = "/dev/shm"
+
+# pro Prozess gecachte mmap-Handles: {pfad: {name: array}}
+_ATTACHED: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def default_workers() -> int:
+    """Worker-Anzahl aus KI_WORKERS (0 = alle Kerne), Standard 1 (seriell)."""
+    raw = os.getenv(WORKERS_ENV, "").strip()
+    try:
+        n = int(raw) if raw else 1
+    except Exception:
+        n = 1
+    if n <= 0:
+        n = os.cpu_count() or 1
+    return max(1, n)
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    if workers is None:
+        return default_workers()
+    if workers <= 0:
+        return max(1, os.cpu_count() or 1)
+    return int(workers)
+
+
+class SharedArrays:
+    """
+    Context-Manager: schreibt Arrays als .npy in ein temporäres Verzeichnis
+    und liefert dessen Pfad. Worker öffnen sie mit attach_arrays(pfad).
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.path: Optional[str] = None
+
+    def __enter__(self) -> str:
+        base = _SHM_DIR if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK) else None
+        self.path = tempfile.mkdtemp(prefix="omerta_arr_", dir=base)
+        for name, arr in self.arrays.items():
+            np.save(os.path.join(self.path, f"{name}.npy"), np.ascontiguousarray(arr))
+        return self.path
+
+    def __exit__(self, *exc) -> None:
+        if self.path:
+            _ATTACHED.pop(self.path, None)
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+
+def attach_arrays(path: str) -> Dict[str, np.ndarray]:
+    """Öffnet alle Arrays eines SharedArrays-Verzeichnisses read-only per mmap."""
+    arrs = _ATTACHED.get(path)
+    if arrs is None:
+        arrs = {}
+        for fname in os.listdir(path):
+            if fname.endswith(".npy"):
+                arrs[fname[:-4]] = np.load(os.path.join(path, fname), mmap_mode="r")
+        _ATTACHED[path] = arrs
+    return arrs
+
+
+def run_sharded(fn: Callable[[str, Any], Any],
+                tasks: Sequence[Any],
+                shared_path: str,
+                *,
+                workers: int) -> List[Any]:
+    """
+    Führt fn(shared_path, task) für alle Tasks aus.
+    Ergebnisse kommen immer in Task-Reihenfolge zurück (deterministischer Merge).
+    """
+    if not tasks:
+        return []
+    if workers <= 1 or len(tasks) == 1:
+        return [fn(shared_path, t) for t in tasks]
+    workers = min(workers, len(tasks))
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, [shared_path] * len(tasks), tasks, chunksize=chunksize))
+
+
+def benchmark(build_fn: Callable[..., Any],
+              workers_list: Sequence[int] = (1, 2, 4),
+              repeat: int = 1) -> List[Dict[str, Any]]:
+    """
+    Misst build_fn(workers=n) für jede Worker-Anzahl (beste von `repeat` Läufen).
+    Rückgabe: [{"workers": n, "seconds": s, "rows": len(X), "speedup": x}, ...]
+    """
+    out: List[Dict[str, Any]] = []
+    base = None
+    for n in workers_list:
+        best = None
+        rows = 0
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            res = build_fn(workers=n)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+            rows = len(res[0]) if isinstance(res, tuple) and res else 0
+        if base is None:
+            base = best
+        out.append({
+            "workers": n,
+            "seconds": round(best, 4),
+            "rows": rows,
+            "speedup": round(base / best, 2) if best else None,
+        })
+    return out
@@ -0,0 +1,168 @@
+# pending_index.py — Warteschlangen offener Entscheidungen neben decision_log.json
+# Je Verbraucher eine nach Startzeit sortierte Liste [(epoch, index im Log)]:
+#   "feedback" → feedback_loop.run_feedback_loop (status offen, fällig nach horizon_days)
+#   "learn"    → learn_scheduler.evaluate_pending_learnings (ohne evaluated_at, fällig nach Delay)
+# Ist nichts fällig, wird decision_log.json gar nicht gelesen; sonst werden nur die fälligen
+# Einträge angefasst. Die Signatur (mtime/Größe) des Logs nach dem letzten bekannten
+# Schreibvorgang steht im Index – schreibt jemand anderes (Pruning, Handarbeit), wird
+# einmal komplett neu aufgebaut.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+from bisect import bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE = "decision_pending.json"
+DECISION_LOG_FILE = "decision_log.json"
+INDEX_VERSION = 1
+
+
+def file_sig(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+# ---------- Warteschlangen-Definitionen ----------
+def _feedback_key(entry: Dict[str, Any]) -> Optional[float]:
+    from feedback_loop import _decision_time, _epoch
+    status = (entry.get("status") or "").lower()
+    if status in ("evaluated", "closed", "done"):
+        return None
+    if not str(entry.get("coin", "")).strip():
+        return None
+    dt = _decision_time(entry)
+    return _epoch(dt) if dt is not None else None
+
+
+def _learn_key(entry: Dict[str, Any]) -> Optional[float]:
+    from learn_scheduler import _parse_ts
+    if entry.get("evaluated_at"):
+        return None
+    ts = entry.get("timestamp")
+    if not ts:
+        return None
+    try:
+        return _parse_ts(ts).timestamp()
+    except Exception:
+        return None
+
+
+QUEUES: Dict[str, Callable[[Dict[str, Any]], Optional[float]]] = {
+    "feedback": _feedback_key,
+    "learn": _learn_key,
+}
+
+
+class PendingIndex:
+    def __init__(self, path: str = INDEX_FILE, log_path: str = DECISION_LOG_FILE):
+        self.path = path
+        self.log_path = log_path
+        self.sig: Optional[List[int]] = None
+        self.queues: Dict[str, List[Tuple[float, int]]] = {q: [] for q in QUEUES}
+        self._load()
+
+    # --- Persistenz ---
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except Exception:
+            return
+        if not isinstance(obj, dict) or obj.get("version") != INDEX_VERSION:
+            return
+        self.sig = obj.get("log_sig")
+        for q in QUEUES:
+            self.queues[q] = [(float(k), int(i)) for k, i in obj.get("queues", {}).get(q, [])]
+
+    def _save(self) -> None:
+        d = os.path.dirname(self.path) or "."
+        data = {"version": INDEX_VERSION, "log_sig": self.sig,
+                "queues": {q: [[k, i] for k, i in items] for q, items in self.queues.items()}}
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+            json.dump(data, tf)
+            tmp = tf.name
+        os.replace(tmp, self.path)
+
+    # --- Lesen ---
+    def fresh(self) -> bool:
+        """Passt der Index noch zum Log auf der Platte?"""
+        return self.sig is not None and self.sig == file_sig(self.log_path)
+
+    def due(self, queue: str, cutoff: float) -> List[int]:
+        """Log-Indizes mit Startzeit <= cutoff (Epoch), aufsteigend nach Index."""
+        items = self.queues[queue]
+        return sorted(i for _, i in items[:bisect_right(items, (cutoff, float("inf")))])
+
+    def has_due(self, queue: str, cutoff: float) -> bool:
+        items = self.queues[queue]
+        return bool(items) and items[0][0] <= cutoff
+
+    # --- Schreiben ---
+    def rebuild(self, log: List[Dict[str, Any]]) -> None:
+        """Kompletter Neuaufbau aus dem (bereits geladenen) Log."""
+        for q, key_fn in QUEUES.items():
+            items = []
+            for i, e in enumerate(log):
+                k = key_fn(e) if isinstance(e, dict) else None
+                if k is not None:
+                    items.append((k, i))
+            items.sort()
+            self.queues[q] = items
+
+    def ensure(self, log: List[Dict[str, Any]]) -> None:
+        """Vor der Verarbeitung: bei fremdem Schreibzugriff neu aufbauen."""
+        if not self.fresh():
+            self.rebuild(log)
+            self.commit()
+
+    def add(self, log: List[Dict[str, Any]], indices: Iterable[int]) -> None:
+        for i in indices:
+            for q, key_fn in QUEUES.items():
+                k = key_fn(log[i])
+                if k is not None:
+                    insort(self.queues[q], (k, i))
+
+    def refresh(self, log: List[Dict[str, Any]], indices: Iterable[int]) -> None:
+        """Angefasste Einträge neu bewerten – nicht mehr offene fliegen aus allen Queues."""
+        touched = set(indices)
+        if not touched:
+            return
+        for q, key_fn in QUEUES.items():
+            keep = [(k, i) for k, i in self.queues[q] if i not in touched]
+            for i in touched:
+                k = key_fn(log[i])
+                if k is not None:
+                    keep.append((k, i))
+            keep.sort()
+            self.queues[q] = keep
+
+    def commit(self) -> None:
+        """Nach dem Schreiben des Logs: neue Signatur merken und Index speichern."""
+        self.sig = file_sig(self.log_path)
+        self._save()
+
+
+def get_index() -> PendingIndex:
+    """Frisch von Platte – mehrere Prozesse (Web/Scheduler) schreiben den Log."""
+    return PendingIndex()
+
+
+def note_appended(log: List[Dict[str, Any]], before_sig: Optional[List[int]], first_new: int,
+                  changed: Iterable[int] = ()) -> None:
+    """
+    Für Schreiber von decision_log.json (decision_logger): nach dem Schreiben aufrufen.
+    before_sig = file_sig vor dem Schreiben; passte der Index dazu, werden nur die neuen
+    (ab first_new) und geänderten Einträge nachgetragen, sonst komplett neu aufgebaut.
+    """
+    idx = get_index()
+    if idx.sig is not None and idx.sig == before_sig:
+        idx.refresh(log, changed)
+        idx.add(log, range(first_new, len(log)))
+    else:
+        idx.rebuild(log)
+    idx.commit()
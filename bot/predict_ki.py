@@ -1,16 +1,24 @@
 # predict_ki.py — KI-Vorhersage für OmertaTradeBot
-# Lädt trainiertes Modell + Scaler, berechnet Erfolgswahrscheinlichkeit für einen Coin.
+# Lädt das lineare Modell als JSON-Artefakt (ki_linear) und rechnet mit reinem NumPy –
+# beim Import weder sklearn noch pickle.
 
-import json, math, pickle
+import json, os
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from ki_linear import load_linear
+from window_index import window_stats
+
 MODELS_DIR   = Path("models")
-MODEL_PATH   = MODELS_DIR / "ki_model.pkl"
+MODEL_PATH   = MODELS_DIR / "ki_model.pkl"     # nur Altbestand (vor ki_pipeline)
 SCALER_PATH  = MODELS_DIR / "ki_scaler.pkl"
 METRICS_PATH = MODELS_DIR / "ki_metrics.json"
+LINEAR_PATH  = MODELS_DIR / "ki_model_linear.json"
+ONLINE_LINEAR_PATH = MODELS_DIR / "ki_online_linear.json"
 
 HISTORY_PATH = Path("history.json")
+USE_ONLINE   = os.getenv("KI_ONLINE", "1").strip() != "0"   # Online-Modell bevorzugen, wenn aktueller
+FEATURES     = ["ret_24h", "vol_24h"]                        # Outcome-Schema (siehe models/ki_manifest.json)
 
 # ---------- Utils ----------
 def _parse_dt(s: str):
@@ -58,29 +66,39 @@ def _history_to_timeseries(history):
     return out
 
 def _window_stats(series_tp, t_center: datetime, hours: int = 24):
-    if not series_tp or not t_center:
-        return None, None
-    t_min = t_center - timedelta(hours=hours)
-    window = [(t, p) for (t, p) in series_tp if t_min <= t <= t_center]
-    if len(window) < 2:
-        return None, None
-    window.sort(key=lambda x: x[0])
-    prices = [p for (_, p) in window if isinstance(p, (int, float))]
-    if len(prices) < 2 or prices[0] <= 0:
-        return None, None
-    ret_24 = (prices[-1] / prices[0]) - 1.0
-    logrets = []
-    for i in range(1, len(prices)):
-        prev, cur = prices[i - 1], prices[i]
-        if prev > 0 and cur > 0:
-            logrets.append(math.log(cur / prev))
-    if not logrets:
-        vol_24 = 0.0
-    else:
-        mean_lr = sum(logrets) / len(logrets)
-        var = sum((x - mean_lr) ** 2 for x in logrets) / max(1, (len(logrets) - 1))
-        vol_24 = math.sqrt(var)
-    return ret_24, vol_24
+    return window_stats(series_tp, t_center, hours)
+
+def _migrate_pickle():
+    """Altbestand: nur ki_model.pkl/ki_scaler.pkl vorhanden → einmalig ins JSON-Artefakt überführen."""
+    if not (MODEL_PATH.exists() and SCALER_PATH.exists()):
+        return None
+    try:
+        import pickle
+        from ki_linear import from_sklearn, save_linear
+        with open(MODEL_PATH, "rb") as f:
+            clf = pickle.load(f)
+        with open(SCALER_PATH, "rb") as f:
+            scaler = pickle.load(f)
+        if not hasattr(clf, "coef_"):
+            return None
+        save_linear(from_sklearn(clf, scaler, FEATURES), LINEAR_PATH)
+        return load_linear(LINEAR_PATH)
+    except Exception:
+        return None
+
+def _load_model():
+    """(Modell, Quelle): Online-Artefakt, falls aktiv und neuer als das Batch-Artefakt."""
+    batch = load_linear(LINEAR_PATH) or _migrate_pickle()
+    online = load_linear(ONLINE_LINEAR_PATH) if USE_ONLINE else None
+    # nie ein Modell mit anderem Feature-Schema füttern
+    batch = batch if batch is not None and batch.features == FEATURES else None
+    online = online if online is not None and online.features == FEATURES else None
+    if online is not None and (batch is None or
+                               ONLINE_LINEAR_PATH.stat().st_mtime >= LINEAR_PATH.stat().st_mtime):
+        return online, "online"
+    if batch is not None:
+        return batch, "batch"
+    return None, None
 
 # ---------- Prediction ----------
 def predict_success(coin: str):
@@ -88,15 +106,10 @@ def predict_success(coin: str):
     Gibt Erfolgswahrscheinlichkeit (0–1) für einen Coin zurück
     """
     coin = str(coin).upper()
-    if not MODEL_PATH.exists() or not SCALER_PATH.exists():
+    model, source = _load_model()
+    if model is None:
         return {"error": "Kein trainiertes Modell vorhanden. Bitte erst trainieren (train_ki_model.py)."}
 
-    # Lade Modell + Scaler
-    with open(MODEL_PATH, "rb") as f:
-        clf = pickle.load(f)
-    with open(SCALER_PATH, "rb") as f:
-        scaler = pickle.load(f)
-
     # Lade History
     hist = _load_json_safe(HISTORY_PATH, [])
     ts   = _history_to_timeseries(hist)
@@ -110,16 +123,15 @@ def predict_success(coin: str):
     if r24 is None or v24 is None:
         return {"error": f"Nicht genug Daten für {coin} (24h-Fenster)."}
 
-    X = [[r24, v24]]
-    Xs = scaler.transform(X)
-    prob = clf.predict_proba(Xs)[0, 1]
-    pred = clf.predict(Xs)[0]
+    prob = float(model.predict_proba([r24, v24])[0])
+    pred = 1 if prob > 0.5 else 0
 
     return {
         "coin": coin,
         "probability_success": round(float(prob), 4),
         "prediction": int(pred),
         "features": {"ret_24h": r24, "vol_24h": v24},
+        "model": source,
         "evaluated_at": now.strftime("%Y-%m-%d %H:%M:%S")
     }
 
@@ -20,14 +20,15 @@ except Exception:
 bot = TeleBot(BOT_TOKEN) if BOT_TOKEN else None
 
 # ==== Projekt-Imports ====
-from trading import get_portfolio, get_profit_estimates
+from trading import get_portfolio, get_profit_estimates, get_current_prices
 from sentiment_parser import get_sentiment_data
 from live_logger import write_history, load_history_safe
 from feedback_loop import run_feedback_loop
 from error_pattern_analyzer import analyze_errors
-from simulator import run_simulation, run_live_simulation
+from simulator import run_simulation, run_live_simulation, log_walkforward_simulation
 from crawler import run_crawler
 from crawler_alert import detect_hype_signals
+from indicators import update_indicators_from_tickers
 from ghost_mode import run_ghost_mode, check_ghost_exit
 from learn_scheduler import evaluate_pending_learnings
 from bootstrap_learning import ensure_min_learning_entries
@@ -322,6 +323,21 @@ def live_sim_cycle():
         print(f"[LiveSim] Fehler: {e}")
 
 
+def paper_cycle():
+    """Stündlich: alle Paper-Trading-Strategien auf denselben Schätzungen handeln lassen."""
+    from paper_trading import run_paper_cycle
+    print(f"[Paper] {run_paper_cycle()}")
+
+
+def indicator_cycle():
+    """Stündlich: ein Preis je Coin in die Streaming-Indikatoren (indicator_state.json)."""
+    try:
+        n = update_indicators_from_tickers(get_current_prices())
+        print(f"[Indicators] {n} Coins aktualisiert")
+    except Exception as e:
+        print(f"[Indicators] Fehler: {e}")
+
+
 def ghost_cycle():
     """Regelmäßiger Ghost-Scan (Entries & Exits) -> ghost_log.json."""
     try:
@@ -347,7 +363,23 @@ def crawler_cycle():
 
 
 # ---------------- KI-Training ----------------
+# Das Online-Modell lernt stündlich über den Feedback-Loop; der Voll-Retrain ist die
+# nächtliche Konsolidierung und lässt sich mit KI_NIGHTLY_RETRAIN=0 abschalten.
+KI_NIGHTLY_RETRAIN = os.getenv("KI_NIGHTLY_RETRAIN", "1").strip() != "0"
+# Walk-Forward-Check nach dem Training (Folds parallel über KI_WORKERS)
+KI_WALKFORWARD = os.getenv("KI_WALKFORWARD", "1").strip() != "0"
+
 def train_ki_daily():
+    if not KI_NIGHTLY_RETRAIN:
+        try:
+            from online_learner import get_learner
+            learner = get_learner()
+            learner.checkpoint()
+            st = learner.status()
+            _send(f"🤖 KI-Online: {st['n_updates']} Updates, Stand {st['updated_at']} (Voll-Retrain aus)")
+        except Exception as e:
+            print(f"[KI-Online] Checkpoint-Fehler: {e}")
+        return
     res = train_model()
     try:
         if bot and ADMIN_ID:
@@ -360,11 +392,34 @@ def train_ki_daily():
             )
             if res.get("note"):
                 msg += f"\n• Hinweis: {res['note']}"
+            if KI_WALKFORWARD:
+                try:
+                    from walk_forward import walk_forward
+                    wf = walk_forward("learn", "lr")
+                    msg += (f"\n• Walk-Forward ({wf['n_folds']} Folds): Ø AUC {wf['mean_auc']}, "
+                            f"Ø Acc {wf['mean_accuracy']} in {wf['wall_seconds']}s")
+                except Exception as e:
+                    print(f"[WF] Fehler: {e}")
             bot.send_message(ADMIN_ID, msg)
     except Exception:
         pass
 
 
+# ---------------- Parameter-Suche ----------------
+# Nächtliche Suche nach besseren Entscheidungs-Schwellen (sweep.py). SWEEP_APPLY=1 schreibt
+# den besten Satz nach logic_thresholds.json, wenn er auch auf dem zurückgehaltenen jüngsten
+# Block besser ist – logic lädt ihn beim nächsten Start.
+SWEEP_NIGHTLY = os.getenv("SWEEP_NIGHTLY", "0").strip() == "1"
+SWEEP_APPLY = os.getenv("SWEEP_APPLY", "0").strip() == "1"
+SWEEP_SAMPLES = int(os.getenv("SWEEP_SAMPLES", "2000") or 2000)
+
+def sweep_nightly():
+    from sweep import format_summary, sweep
+    rep = sweep(n=SWEEP_SAMPLES, apply=SWEEP_APPLY)
+    print(f"[Sweep] {rep.get('combinations')} Kombinationen, bester Score {rep.get('best', {}).get('score')}")
+    _send(format_summary(rep))
+
+
 # ---------------- Zeitplan ----------------
 def run_scheduler():
     print("⏰ Omerta Scheduler läuft...")
@@ -376,8 +431,10 @@ def run_scheduler():
 
     # Automatische Datenfeeds
     schedule.every(1).hours.do(decisions_cycle)     # decision_log + feedback
+    schedule.every(1).hours.do(indicator_cycle)     # indicator_state (alle Coins)
     schedule.every(2).hours.do(live_sim_cycle)      # simulation_log
     schedule.every(3).hours.do(ghost_cycle)         # ghost_log
+    schedule.every(1).hours.do(lambda: _job("PaperTrading", paper_cycle))   # paper_trading.npz
     schedule.every(6).hours.do(crawler_cycle)       # crawler_data
 
     # Lernen & Checks
@@ -393,13 +450,17 @@ def run_scheduler():
     _schedule_daily_berlin(9, 0,  lambda: _job("FeedbackLoop (Daily)", run_feedback_loop))
     _schedule_daily_berlin(10, 0, lambda: _job("ErrorAnalysis", analyze_errors))
     _schedule_daily_berlin(13, 0, lambda: _job("Simulation (Historical)", run_simulation))
+    _schedule_daily_berlin(13, 30, lambda: _job("Simulation (Walk-Forward)", log_walkforward_simulation))
     _schedule_daily_berlin(3, 15, train_ki_daily, tag="ki_training")  # echtes KI-Training täglich 03:15
+    if SWEEP_NIGHTLY:
+        _schedule_daily_berlin(4, 30, lambda: _job("Parameter-Suche", sweep_nightly), tag="sweep")
 
     print("✅ Scheduler gestartet und alle Tasks geladen.")
 
     # Sofortläufe beim Start (sanft)
     try:
         decisions_cycle()
+        indicator_cycle()
         live_sim_cycle()
         ghost_cycle()
         crawler_cycle()
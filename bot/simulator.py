@@ -6,6 +6,11 @@
 #  - Jeder Entry kompatibel zu decision_logger (coin, action, percent, price, signal, reason, source)
 #  - Prozent-Berechnung vs. letztem EUR-Preis aus history.json (falls vorhanden)
 #  - Helpers zum direkten Loggen in log_simulation.json + decision_log.json
+#  - Walk-Forward: komplette history.json Bar für Bar durch die Entscheidungsregeln
+#    (logic.make_trade_decision, vektorisiert über backtest.py) + Out-of-sample-KI-Score, mit
+#    realisiertem Ergebnis nach WF_HORIZON Schritten; Ergebnisse gesammelt geschrieben
+#  - Stresstest: tausende korrelierte Pfade je historischem Szenario (stress_scenarios.py)
+#  - Walk-Forward-Depot mit Gebühren, Slippage und Lot-Größen (fill_model.py, SIM_FILLS)
 
 from __future__ import annotations
 import os
@@ -18,6 +23,7 @@ from typing import Any, Dict, List, Optional
 from binance.client import Client
 from trading import get_current_prices, get_eur_rate, list_all_tradeable_coins  # All-Coins
 from decision_logger import log_trade_decisions
+from stress_scenarios import historical_scenarios  # Szenarien + Monte-Carlo-Stresstest
 
 # === Binance API ===
 API_KEY = os.getenv("BINANCE_API_KEY")
@@ -28,47 +34,22 @@ client = Client(API_KEY, API_SECRET)
 SIM_LOG_FILE = "log_simulation.json"
 SIM_META_FILE = "log_simulation_meta.json"
 HISTORY_FILE = "history.json"  # erwartet Struktur {"BTC": [{"time": "...", "eur": 123.45}, ...], ...}
+WF_RESULT_FILE = "walkforward_sim.npz"   # spaltenweise Ergebnisse des letzten Walk-Forward-Laufs
+
+# === Walk-Forward ===
+WF_HORIZON = 6          # Ergebnis nach n Schritten = n Snapshots in history.json (live_logger: 1/Tag → 6 Tage),
+                        # wie das KI-Label in ki_features (6 Zeilen)
+WF_FILLS = os.getenv("SIM_FILLS", "1") == "1"   # Depot-Verlauf mit fill_model statt Idealpreis
+WF_KI_BUY_MIN = 0.5     # BUY nur bei KI-Score >= Schwelle (ohne gültiges Modell: neutral 0.5)
+WF_KI_MIN_ROWS = 30     # wie get_ki_score_for_coin: erst ab 30 Feature-Zeilen
+WF_KI_FOLDS = 5         # Zeitblöcke für die Out-of-sample-Scores (walk_forward.make_folds)
+WF_KI_MIN_TRAIN = 200   # Mindestzeilen je Block-Modell (wie fit_price_model)
+WF_HOLD_BAND = 2.0      # HOLD gilt als richtig, wenn |Ergebnis| < 2 %
+WF_LOG_TAIL = 24        # höchstens so viele neue Schritte je Lauf ins Simulations-Log
 
 BERLIN = ZoneInfo("Europe/Berlin")
 
 
-# ========== HISTORISCHE SZENARIEN (Multi-Coin) ==========
-historical_scenarios = [
-    {
-        "name": "FTX Collapse",
-        "date": "2022-11-09",
-        "coins": ["FTT", "BTC", "ETH", "SOL", "BNB"],
-        "price_before": 22.00,
-        "price_after": 1.50,
-        "volume_crash": True,
-    },
-    {
-        "name": "Terra Luna Crash",
-        "date": "2022-05-10",
-        "coins": ["LUNA", "UST", "BTC", "ETH"],
-        "price_before": 85.00,
-        "price_after": 0.0001,
-        "volume_crash": True,
-    },
-    {
-        "name": "Elon Doge Pump",
-        "date": "2021-04-15",
-        "coins": ["DOGE", "SHIB", "BTC"],
-        "price_before": 0.08,
-        "price_after": 0.32,
-        "volume_crash": False,
-    },
-    {
-        "name": "Corona Market Crash",
-        "date": "2020-03-12",
-        "coins": ["BTC", "ETH", "XRP", "LTC", "ADA"],
-        "price_before": 9200,
-        "price_after": 4800,
-        "volume_crash": True,
-    }
-]
-
-
 # ========== Helpers ==========
 def _now_str() -> str:
     return datetime.now(BERLIN).strftime("%Y-%m-%d %H:%M:%S")
@@ -291,6 +272,171 @@ def run_live_simulation() -> List[Dict[str, Any]]:
     return entries
 
 
+# ========== Walk-Forward über die gespeicherte Historie ==========
+def _wf_ki_scores(epochs, coins, history, horizon: int = WF_HORIZON) -> Optional[Any]:
+    """
+    Out-of-sample-KI-Score [T, C]. Zeilen wie ki_features.build_dataset (Preis-Features aus
+    dem Feature-Store, Label = Close nach `horizon` Zeilen höher), zeitlich in Blöcke geteilt
+    (walk_forward.make_folds). Jeder Block wird von einem eigenen Modell (KI_MODEL) bewertet,
+    das nur Zeilen kennt, deren Label vor Blockbeginn feststand – nicht vom Live-Modell, das
+    auf genau diesen Zeilen trainiert ist. Crawler/Sentiment gibt es nicht historisch, die
+    Extra-Features sind deshalb 0 statt des heutigen Snapshots.
+    Schritte vor dem ersten Block, ohne eigenen Kurs oder mit < WF_KI_MIN_ROWS Zeilen
+    bleiben neutral 0.5. None, wenn sklearn fehlt oder kein Block trainiert werden konnte.
+    """
+    import numpy as np
+    from feature_store import get_store
+    from ki_features import EXTRA_FEATURES
+    from walk_forward import make_folds
+    try:
+        from ki_model import _FITTERS, MODEL_KIND
+        fit = _FITTERS.get(MODEL_KIND, _FITTERS["hgb"])
+    except ModuleNotFoundError:
+        return None
+
+    store = get_store()
+    store.update(history)
+    parts = []   # je Coin: (Features, ts, Label-ts, Label, Schritt, Coin)
+    for j, coin in enumerate(coins):
+        cols = store.load(coin)
+        if cols is None or len(cols["ts"]) < WF_KI_MIN_ROWS:
+            continue
+        feats, ts = store.matrix(coin), cols["ts"]
+        idx = np.arange(WF_KI_MIN_ROWS - 1, len(ts))
+        pos = np.searchsorted(epochs, ts[idx])
+        ok = (pos < len(epochs)) & (epochs[np.minimum(pos, len(epochs) - 1)] == ts[idx])
+        idx, pos = idx[ok], pos[ok]
+        if not len(idx):
+            continue
+        lab = idx + horizon
+        known = lab < len(ts)
+        label = np.full(len(idx), -1, dtype=np.int8)
+        label[known] = feats[lab[known], 0] > feats[idx[known], 0]
+        label_ts = np.full(len(idx), np.inf)
+        label_ts[known] = ts[lab[known]]
+        parts.append((feats[idx], ts[idx].astype(np.float64), label_ts, label, pos, np.full(len(idx), j)))
+    if not parts:
+        return None
+
+    X, ts, label_ts, label, pos, col = (np.concatenate(p) for p in zip(*parts))
+    X = np.hstack([X, np.zeros((len(X), len(EXTRA_FEATURES)))])
+    order = np.argsort(ts, kind="stable")
+    X, ts, label_ts, label, pos, col = X[order], ts[order], label_ts[order], label[order], pos[order], col[order]
+
+    scores = np.full((len(epochs), len(coins)), 0.5)
+    fitted = 0
+    for _, test_start, test_end in make_folds(ts, n_folds=WF_KI_FOLDS, min_train=WF_KI_MIN_TRAIN):
+        train = (label_ts < ts[test_start]) & (label >= 0)
+        if train.sum() < WF_KI_MIN_TRAIN or len(np.unique(label[train])) < 2:
+            continue
+        clf, _ = fit(X[train], label[train].astype(int))
+        block = slice(test_start, test_end)
+        scores[pos[block], col[block]] = clf.predict_proba(X[block])[:, 1]
+        fitted += 1
+    return scores if fitted else None
+
+
+def run_walkforward_simulation(history: Any = None, *, horizon: int = WF_HORIZON, lookback: int = 1,
+                               sentiment: Any = "breadth", use_ki: bool = True,
+                               ki_buy_min: float = WF_KI_BUY_MIN, fills: Any = WF_FILLS) -> Dict[str, Any]:
+    """
+    Spielt die komplette history.json ({date: {COIN: EUR}}) für alle Coins in einem Lauf
+    durch: Prozent-Änderung → make_trade_decision-Regeln (aktuelle Schwellen) → KI-Filter
+    für BUY (out-of-sample, _wf_ki_scores) → realisiertes Ergebnis nach `horizon` Schritten.
+    Zusätzlich Depot-Verlauf wie trading.simulate_trade (backtest.simulate); fills=True (Standard über SIM_FILLS)
+    rechnet Gebühren, Slippage und Lot-Größen ein (fill_model.FillModel, oder ein fertiges Modell).
+    Rückgabe: {"summary": {...}, "columns": {epoch, coin, action, percent, ki_score,
+    outcome_pct, success, correct}} – eine Zeile je (Schritt, Coin) mit Ergebnis.
+    """
+    import numpy as np
+    from backtest import (BUY, HOLD, SELL, START_BALANCE, decide, load_prices, market_sentiment,
+                          max_drawdown_pct, percent_change, simulate)
+    from feature_store import epoch_to_iso
+
+    if history is None:
+        try:
+            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except Exception:
+            history = {}
+    epochs, coins, prices = load_prices(history)
+    T = len(epochs)
+    if not coins or T <= max(lookback, horizon):
+        return {"summary": {"ok": False, "msg": "Zu wenig Historie für den Walk-Forward."}, "columns": {}}
+
+    pct = percent_change(prices, lookback)
+    dec = decide(pct, market_sentiment(pct, sentiment))
+    ki = _wf_ki_scores(epochs, coins, history, horizon) if use_ki else None
+    ki_active = ki is not None
+    if ki is None:
+        ki = np.full(dec.shape, 0.5)
+    gated = (dec == BUY) & (ki < ki_buy_min)
+    dec[gated] = HOLD
+
+    # realisiertes Ergebnis: Kursänderung von t nach t + horizon
+    fwd = np.full(prices.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        now = prices[:-horizon]
+        fwd[:-horizon] = np.where(now > 0, (prices[horizon:] - now) / now * 100.0, np.nan)
+    success = np.where(dec == BUY, fwd, np.where(dec == SELL, -fwd, 0.0))
+    correct = np.where(dec == BUY, fwd > 0, np.where(dec == SELL, fwd < 0, np.abs(fwd) < WF_HOLD_BAND))
+
+    t_idx, c_idx = np.nonzero(~np.isnan(pct) & ~np.isnan(fwd))
+    columns = {
+        "epoch": epochs[t_idx].astype(np.int64),
+        "coin": c_idx.astype(np.int32),
+        "action": dec[t_idx, c_idx],
+        "percent": pct[t_idx, c_idx],
+        "ki_score": np.round(ki[t_idx, c_idx], 4),
+        "outcome_pct": np.round(fwd[t_idx, c_idx], 4),
+        "success": np.round(success[t_idx, c_idx], 4),
+        "correct": correct[t_idx, c_idx].astype(np.int8),
+    }
+
+    if fills is True:
+        from fill_model import FillModel
+        fills = FillModel(coins)
+    sim = simulate(prices, np.where(np.isnan(pct), HOLD, dec).astype(np.int8), fills=fills or None)
+    final = float(sim["equity"][-1])
+    by_action = {}
+    for code, name in ((BUY, "buy"), (SELL, "sell"), (HOLD, "hold")):
+        m = columns["action"] == code
+        n = int(m.sum())
+        by_action[name] = {
+            "n": n,
+            "hit_rate_pct": round(float(columns["correct"][m].mean()) * 100.0, 2) if n else 0.0,
+            "avg_success_pct": round(float(columns["success"][m].mean()), 4) if n else 0.0,
+        }
+    n_rows = len(t_idx)
+    summary = {
+        "ok": True,
+        "from": epoch_to_iso(int(epochs[0])),
+        "to": epoch_to_iso(int(epochs[-1])),
+        "until": int(epochs[-1 - horizon]),   # letzter Schritt mit realisiertem Ergebnis
+        "steps": T,
+        "coins": len(coins),
+        "rows": n_rows,
+        "horizon": horizon,
+        "lookback": lookback,
+        "sentiment": sentiment if isinstance(sentiment, str) else "custom",
+        "ki_model": ki_active,
+        "ki_filtered_buys": int(gated.sum()),
+        "hit_rate_pct": round(float(columns["correct"].mean()) * 100.0, 2) if n_rows else 0.0,
+        "by_action": by_action,
+        "final_equity": round(final, 2),
+        "return_pct": round((final / START_BALANCE - 1.0) * 100.0, 2),
+        "max_drawdown_pct": max_drawdown_pct(sim["equity"]),
+        "n_buys": sim["n_buys"],
+        "n_sells": sim["n_sells"],
+        "fills": bool(fills),
+        "fees": round(float(sim.get("fees", 0.0)), 2),
+        "slippage": round(float(sim.get("slippage", 0.0)), 2),
+        "rejected_orders": int(sim.get("rejected", 0)),
+        "coin_names": coins,
+    }
+    return {"summary": summary, "columns": columns}
+
+
 # ========== Logging-Wrapper (bequem) ==========
 def log_historical_simulation_and_decisions() -> str:
     """
@@ -345,6 +491,106 @@ def log_live_simulation_and_decisions() -> str:
     return f"✅ Live-Simulation abgeschlossen: {len(entries)} Coins (Decision-Log +{added})."
 
 
+def _wf_last_until() -> Optional[int]:
+    for m in reversed(_load_json_list(SIM_META_FILE)):
+        if isinstance(m, dict) and m.get("type") == "walkforward":
+            return (m.get("info") or {}).get("until")
+    return None
+
+
+def _save_wf_result(res: Dict[str, Any], path: str = WF_RESULT_FILE) -> None:
+    import tempfile
+    import numpy as np
+    summary = dict(res["summary"])
+    coins = summary.pop("coin_names")
+    d = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=d, suffix=".tmp") as tf:
+        np.savez_compressed(tf, coins=np.asarray(coins), summary=np.asarray(json.dumps(summary)),
+                            **res["columns"])
+        tmp = tf.name
+    os.replace(tmp, path)
+
+
+def log_walkforward_simulation(**kwargs) -> str:
+    """
+    Führt run_walkforward_simulation() aus und schreibt gesammelt:
+      - alle Zeilen spaltenweise nach walkforward_sim.npz (ein Schreibvorgang),
+      - die noch nicht geloggten jüngsten Schritte (max. WF_LOG_TAIL) als Einträge nach
+        log_simulation.json (mit realisiertem "success" für error_pattern_analyzer – als Anteil
+        −1..1, weil _norm_success Beträge <= 1 als Anteil liest; Prozent in "outcome_pct"),
+      - eine Zusammenfassung nach log_simulation_meta.json.
+    decision_log.json bleibt unberührt – vergangene Entscheidungen sollen nicht in den
+    Feedback-Loop laufen.
+    """
+    import numpy as np
+    from backtest import ACTIONS
+    from feature_store import epoch_to_iso
+
+    res = run_walkforward_simulation(**kwargs)
+    summary = res["summary"]
+    if not summary.get("ok"):
+        return f"⚠️ Walk-Forward: {summary.get('msg')}"
+    _save_wf_result(res)
+
+    cols = res["columns"]
+    coins = summary["coin_names"]
+    last = _wf_last_until()
+    steps = np.unique(cols["epoch"] if last is None else cols["epoch"][cols["epoch"] > last])[-WF_LOG_TAIL:]
+    signal = {"BUY": "gekauft", "SELL": "verkauft", "HOLD": "gehalten"}
+    entries: List[Dict[str, Any]] = []
+    if len(steps):
+        for i in np.flatnonzero(cols["epoch"] >= steps[0]):
+            action = ACTIONS[cols["action"][i]]
+            ok = bool(cols["correct"][i])
+            entries.append({
+                "timestamp": epoch_to_iso(int(cols["epoch"][i])),
+                "mode": "walkforward",
+                "coin": coins[cols["coin"][i]],
+                "decision": signal[action],
+                "action": action.lower(),
+                "percent": round(float(cols["percent"][i]), 2),
+                "ki_score": float(cols["ki_score"][i]),
+                "outcome_pct": float(cols["outcome_pct"][i]),
+                "success": round(min(max(float(cols["success"][i]) / 100.0, -1.0), 1.0), 6),
+                "correct": ok,
+                "assessment": f"{'Richtig' if ok else 'Falsch'} nach {summary['horizon']} Schritten",
+                "source": "walkforward-sim",
+            })
+        _append_json_list(SIM_LOG_FILE, entries)
+
+    info = {k: v for k, v in summary.items() if k != "coin_names"}
+    _append_json_list(SIM_META_FILE, [{
+        "timestamp": _now_str(),
+        "type": "walkforward",
+        "items": len(entries),
+        "info": info,
+    }])
+    fees = f", Gebühren {summary['fees']} €" if summary["fills"] else ""
+    return (f"🧭 Walk-Forward: {summary['rows']} Entscheidungen ({summary['coins']} Coins, "
+            f"{summary['steps']} Schritte) | Trefferquote {summary['hit_rate_pct']} % | "
+            f"Depot {summary['return_pct']} % (DD {summary['max_drawdown_pct']} %"
+            f"{fees}) | "
+            f"KI {'aktiv' if summary['ki_model'] else 'neutral'} | Log +{len(entries)}")
+
+
+def log_stress_simulation(**kwargs) -> str:
+    """
+    Monte-Carlo-Stresstest aller historischen Szenarien (stress_scenarios.run_stress_tests);
+    schreibt stress_report.json und eine Zusammenfassung nach log_simulation_meta.json.
+    """
+    from stress_scenarios import format_report, run_stress_tests
+    report = run_stress_tests(**kwargs)
+    _append_json_list(SIM_META_FILE, [{
+        "timestamp": _now_str(),
+        "type": "stress",
+        "items": sum(s["paths"] for s in report["scenarios"]),
+        "info": {s["name"]: {"method": s["method"], "median_pct": s["return_pct"]["p50"],
+                             "p5_pct": s["return_pct"]["p5"], "panic_rate_pct": s["panic_rate_pct"]}
+                 for s in report["scenarios"]},
+    }])
+    return format_report(report)
+
+
 # ========== Status ==========
 def get_simulation_status() -> str:
     logs = _load_json_list(SIM_LOG_FILE)
@@ -360,3 +606,17 @@ def get_simulation_status() -> str:
         last_type = last.get("type", "—")
 
     return f"🧪 Simulationen: {count} | Letzter Lauf: {last_time} | Typ: {last_type}"
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Walk-Forward-Simulation über history.json")
+    ap.add_argument("--horizon", type=int, default=WF_HORIZON, help="Ergebnis nach n Schritten")
+    ap.add_argument("--lookback", type=int, default=1, help="Vergleichskurs n Schritte zurück")
+    ap.add_argument("--sentiment", default="breadth", help="neutral | bullish | bearish | breadth")
+    ap.add_argument("--no-ki", action="store_true", help="ohne KI-Filter (nur Schwellen)")
+    ap.add_argument("--ideal", action="store_true", help="ohne Gebühren/Slippage/Lot-Größen (Idealpreis)")
+    args = ap.parse_args()
+    print(log_walkforward_simulation(horizon=args.horizon, lookback=args.lookback,
+                                     sentiment=args.sentiment, use_ki=not args.no_ki,
+                                     fills=WF_FILLS and not args.ideal))
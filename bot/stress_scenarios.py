@@ -0,0 +1,299 @@
+# stress_scenarios.py — Monte-Carlo-Stresstests auf Basis der historischen Szenarien
+# Je Szenario werden tausende korrelierte Preispfade (Coins × Schritte) als NumPy-Batch
+# erzeugt – per Block-Bootstrap aus den gespeicherten Renditen (history.json, gleiche
+# Zeitpunkte für alle Coins → Korrelation bleibt erhalten) oder, ohne Historie, aus einem
+# korrelierten Normalmodell. Darüber liegt das Crash-Profil des Szenarios (Gesamt-
+# änderung price_before → price_after, Leit-Coin voll, übrige Coins mit einem Anteil
+# der einfachen Rendite).
+# Auf jeden Pfad laufen die make_trade_decision-Regeln (backtest.decide) und die
+# Ausführung wie simulate_trade; berichtet werden Ergebnis-Verteilung und Panik-Quote.
+# Die Pfade werden in Blöcken von batch_size erzeugt, damit der Speicher begrenzt bleibt.
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backtest import (BUY, BUY_FRACTION, MIN_BALANCE, SELL, START_BALANCE, decide,
+                      load_prices, market_sentiment)
+from thresholds import PANIC_DROP_PCT
+
+REPORT_FILE = "stress_report.json"
+
+# ========== HISTORISCHE SZENARIEN (Multi-Coin) ==========
+historical_scenarios = [
+    {
+        "name": "FTX Collapse",
+        "date": "2022-11-09",
+        "coins": ["FTT", "BTC", "ETH", "SOL", "BNB"],
+        "price_before": 22.00,
+        "price_after": 1.50,
+        "volume_crash": True,
+    },
+    {
+        "name": "Terra Luna Crash",
+        "date": "2022-05-10",
+        "coins": ["LUNA", "UST", "BTC", "ETH"],
+        "price_before": 85.00,
+        "price_after": 0.0001,
+        "volume_crash": True,
+    },
+    {
+        "name": "Elon Doge Pump",
+        "date": "2021-04-15",
+        "coins": ["DOGE", "SHIB", "BTC"],
+        "price_before": 0.08,
+        "price_after": 0.32,
+        "volume_crash": False,
+    },
+    {
+        "name": "Corona Market Crash",
+        "date": "2020-03-12",
+        "coins": ["BTC", "ETH", "XRP", "LTC", "ADA"],
+        "price_before": 9200,
+        "price_after": 4800,
+        "volume_crash": True,
+    }
+]
+
+# === Pfad-Modell ===
+N_PATHS = 5000
+STEPS = 14                 # Schritte je Szenario = Snapshots von history.json (live_logger: täglich → 2 Wochen)
+BATCH_SIZE = int(os.getenv("STRESS_BATCH_SIZE", "2000") or 2000)   # Pfade je Block
+BLOCK = 6                  # Block-Länge beim Bootstrap (erhält kurze Autokorrelation)
+CONTAGION = 0.35           # Anteil der einfachen Rendite des Leit-Coins für die übrigen Coins
+SEVERITY_SIGMA = 0.35      # Streuung der Crash-Stärke je Pfad (lognormal, Mittel 1)
+FIT_VOL = 0.03             # Normalmodell: Schritt-Volatilität
+FIT_VOL_CRASH = 2.0        # … mal Faktor bei volume_crash
+FIT_RHO = 0.8              # … Korrelation zwischen den Coins
+EXPOSURE = 0.5             # Startdepot: Anteil in den Szenario-Coins (gleichgewichtet), Rest Guthaben
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+# ---------- Renditen ----------
+def load_returns(history: Any = None) -> Optional[Dict[str, Any]]:
+    """Log-Renditen je Schritt aus history.json: {"coins": [...], "r": [T-1, C]} oder None."""
+    _, coins, prices = load_prices(history)
+    if len(prices) < BLOCK + 2:
+        return None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.log(prices[1:] / prices[:-1])
+    r[~np.isfinite(r)] = np.nan
+    return {"coins": coins, "r": r}
+
+
+def _scenario_columns(scenario: Dict[str, Any], returns: Dict[str, Any]) -> np.ndarray:
+    """Rendite-Spalten [T-1, C_szenario]: eigener Coin, sonst Markt-Median; demeaned, NaN → 0."""
+    r = returns["r"]
+    pos = {c: j for j, c in enumerate(returns["coins"])}
+    with np.errstate(all="ignore"):
+        market = np.nanmedian(np.where(np.isnan(r).all(axis=1, keepdims=True), 0.0, r), axis=1)
+    cols = np.column_stack([r[:, pos[c]] if c in pos else market for c in scenario["coins"]])
+    cols = np.nan_to_num(cols - np.nanmean(cols, axis=0))
+    return cols
+
+
+def _crash_drift(scenario: Dict[str, Any]) -> np.ndarray:
+    """
+    Log-Gesamtänderung je Coin: Leit-Coin (erster) voll, übrige mit CONTAGION der einfachen
+    Rendite (1 + CONTAGION · (after/before − 1)) – Terra: LUNA −100 %, BTC/ETH/UST −35 %.
+    """
+    before = float(scenario["price_before"])
+    after = max(float(scenario["price_after"]), before * 1e-9)
+    drift = np.full(len(scenario["coins"]), np.log1p(CONTAGION * (after / before - 1.0)))
+    drift[0] = np.log(after / before)
+    return drift
+
+
+def generate_paths(scenario: Dict[str, Any], n: int, *, steps: int = STEPS,
+                   returns: Optional[Dict[str, Any]] = None, rng: np.random.Generator) -> np.ndarray:
+    """n korrelierte Preispfade [n, steps + 1, C], Start = price_before für alle Coins."""
+    C = len(scenario["coins"])
+    severity = np.exp(rng.normal(-0.5 * SEVERITY_SIGMA ** 2, SEVERITY_SIGMA, size=n))
+    drift = (severity[:, None] * _crash_drift(scenario)[None, :]) / steps        # [n, C]
+
+    if returns is not None:
+        cols = _scenario_columns(scenario, returns)
+        n_blocks = -(-steps // BLOCK)
+        starts = rng.integers(0, len(cols) - BLOCK + 1, size=(n, n_blocks))
+        idx = (starts[:, :, None] + np.arange(BLOCK)).reshape(n, -1)[:, :steps]
+        noise = cols[idx]                                                        # [n, steps, C]
+    else:
+        vol = FIT_VOL * (FIT_VOL_CRASH if scenario.get("volume_crash") else 1.0)
+        corr = np.full((C, C), FIT_RHO)
+        np.fill_diagonal(corr, 1.0)
+        noise = rng.standard_normal((n, steps, C)) @ np.linalg.cholesky(corr).T * vol
+
+    log_paths = np.cumsum(noise + drift[:, None, :], axis=1)
+    out = np.empty((n, steps + 1, C))
+    out[:, 0] = float(scenario["price_before"])
+    out[:, 1:] = float(scenario["price_before"]) * np.exp(log_paths)
+    return out
+
+
+# ---------- Regeln + Ausführung je Pfad (vektorisiert über alle Pfade) ----------
+def _run_batch(paths: np.ndarray, sentiment: Any, thresholds: Optional[Dict[str, float]]) -> Dict[str, np.ndarray]:
+    B, S1, C = paths.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.round((paths[:, 1:] - paths[:, :-1]) / paths[:, :-1] * 100.0, 2)    # [B, S, C]
+    flat = pct.reshape(-1, C)
+    sent = market_sentiment(flat, sentiment)
+    dec = decide(flat, sent, thresholds).reshape(B, S1 - 1, C)
+
+    # Panik wie logic.should_trigger_panic: schlechtester Coin unter PANIC_DROP_PCT
+    worst = np.nanmin(pct, axis=2)                                                   # [B, S]
+    hit = worst < PANIC_DROP_PCT
+    panic = hit.any(axis=1)
+    first = np.where(panic, hit.argmax(axis=1) + 1, -1)
+
+    # Startdepot: EXPOSURE gleichgewichtet in den Coins, Rest Guthaben
+    p0 = paths[:, 0]
+    hold = np.round(START_BALANCE * EXPOSURE / C / p0, 6)
+    bal = np.full(B, round(START_BALANCE * (1.0 - EXPOSURE), 2))
+    start_equity = bal + (hold * p0).sum(axis=1)
+    passive = bal + (hold * paths[:, -1]).sum(axis=1)
+    n_buys = np.zeros(B, dtype=np.int64)
+    n_sells = np.zeros(B, dtype=np.int64)
+
+    for t in range(S1 - 1):
+        px = paths[:, t + 1]
+        for j in range(C):
+            d, p = dec[:, t, j], px[:, j]
+            buy = (d == BUY) & (bal > MIN_BALANCE) & (p > 0)
+            if buy.any():
+                qty = np.round(bal[buy] * BUY_FRACTION / p[buy], 6)
+                hold[buy, j] = np.round(hold[buy, j] + qty, 6)
+                bal[buy] = np.round(bal[buy] - qty * p[buy], 2)
+                n_buys += buy
+            sell = (d == SELL) & (hold[:, j] > 0)
+            if sell.any():
+                bal[sell] = np.round(bal[sell] + hold[sell, j] * p[sell], 2)
+                hold[sell, j] = 0.0
+                n_sells += sell
+
+    equity = bal + (hold * paths[:, -1]).sum(axis=1)
+    return {
+        "return_pct": (equity / start_equity - 1.0) * 100.0,
+        "passive_pct": (passive / start_equity - 1.0) * 100.0,
+        "lead_move_pct": (paths[:, -1, 0] / p0[:, 0] - 1.0) * 100.0,
+        "panic": panic,
+        "panic_step": first,
+        "n_buys": n_buys,
+        "n_sells": n_sells,
+        "actions": np.bincount(dec.ravel(), minlength=3),
+    }
+
+
+def _distribution(x: np.ndarray) -> Dict[str, Any]:
+    q = np.percentile(x, PERCENTILES)
+    tail = np.sort(x)[:max(1, len(x) // 20)]
+    out = {"mean": round(float(x.mean()), 2), "std": round(float(x.std()), 2)}
+    out.update({f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, q)})
+    out["es5"] = round(float(tail.mean()), 2)          # Mittel der schlechtesten 5 %
+    out["loss_prob_pct"] = round(float((x < 0).mean()) * 100.0, 2)
+    return out
+
+
+# ---------- Einstieg ----------
+def stress_scenario(scenario: Dict[str, Any], *, n_paths: int = N_PATHS, steps: int = STEPS,
+                    batch_size: Optional[int] = None, method: str = "auto",
+                    returns: Optional[Dict[str, Any]] = None, sentiment: Any = "breadth",
+                    thresholds: Optional[Dict[str, float]] = None, seed: int = 42) -> Dict[str, Any]:
+    """
+    Ein Szenario: n_paths Pfade in Blöcken von batch_size (Standard: $STRESS_BATCH_SIZE).
+    method: "bootstrap" (gespeicherte Renditen), "fit" (Normalmodell) oder "auto".
+    """
+    t0 = time.perf_counter()
+    batch_size = max(1, int(batch_size or BATCH_SIZE))
+    if method == "fit" or (method == "auto" and returns is None):
+        returns, method = None, "fit"
+    elif returns is None:
+        raise ValueError("method='bootstrap' braucht gespeicherte Renditen (history.json)")
+    else:
+        method = "bootstrap"
+    rng = np.random.default_rng(seed)
+
+    parts: Dict[str, List[np.ndarray]] = {}
+    actions = np.zeros(3, dtype=np.int64)
+    for start in range(0, n_paths, batch_size):
+        paths = generate_paths(scenario, min(batch_size, n_paths - start), steps=steps, returns=returns, rng=rng)
+        res = _run_batch(paths, sentiment, thresholds)
+        actions += res.pop("actions")
+        for k, v in res.items():
+            parts.setdefault(k, []).append(v)
+        del paths
+    r = {k: np.concatenate(v) for k, v in parts.items()}
+
+    panic_steps = r["panic_step"][r["panic"]]
+    edge = r["return_pct"] - r["passive_pct"]
+    return {
+        "name": scenario["name"],
+        "date": scenario.get("date"),
+        "coins": list(scenario["coins"]),
+        "method": method,
+        "paths": int(n_paths),
+        "steps": steps,
+        "batch_size": batch_size,
+        "batch_mb": round(batch_size * (steps + 1) * len(scenario["coins"]) * 8 * 4 / 1e6, 1),
+        "lead_move_pct": _distribution(r["lead_move_pct"]),
+        "return_pct": _distribution(r["return_pct"]),
+        "passive_pct": _distribution(r["passive_pct"]),
+        "edge_vs_passive_pct": round(float(edge.mean()), 2),
+        "beats_passive_pct": round(float((edge > 0).mean()) * 100.0, 2),
+        "panic_rate_pct": round(float(r["panic"].mean()) * 100.0, 2),
+        "panic_first_step_avg": round(float(panic_steps.mean()), 2) if len(panic_steps) else None,
+        "avg_buys": round(float(r["n_buys"].mean()), 2),
+        "avg_sells": round(float(r["n_sells"].mean()), 2),
+        "decision_mix_pct": {a: round(float(n) / max(1, actions.sum()) * 100.0, 2)
+                             for a, n in zip(("hold", "buy", "sell"), actions.tolist())},
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def run_stress_tests(scenarios: Optional[List[Dict[str, Any]]] = None, *, history: Any = None,
+                     method: str = "auto", save: bool = True, **kwargs) -> Dict[str, Any]:
+    """Alle (oder die übergebenen) Szenarien; Renditen aus history.json werden einmal geladen."""
+    returns = load_returns(history) if method in ("auto", "bootstrap") else None
+    results = [stress_scenario(s, returns=returns, method=method, **kwargs)
+               for s in (scenarios or historical_scenarios)]
+    report = {"written_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+              "panic_drop_pct": PANIC_DROP_PCT, "scenarios": results}
+    if save:
+        d = os.path.dirname(REPORT_FILE) or "."
+        with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+            json.dump(report, tf, ensure_ascii=False, indent=2)
+            tmp = tf.name
+        os.replace(tmp, REPORT_FILE)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"🧨 Stresstest ({report['scenarios'][0]['paths'] if report['scenarios'] else 0} Pfade je Szenario)"]
+    for s in report["scenarios"]:
+        r = s["return_pct"]
+        lines.append(
+            f"• {s['name']} [{s['method']}]: Median {r['p50']} % | p5 {r['p5']} % | ES5 {r['es5']} % | "
+            f"passiv {s['passive_pct']['p50']} % | besser als passiv {s['beats_passive_pct']} % | "
+            f"Panik {s['panic_rate_pct']} %"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Monte-Carlo-Stresstest der historischen Szenarien")
+    ap.add_argument("--paths", type=int, default=N_PATHS, help="Pfade je Szenario")
+    ap.add_argument("--steps", type=int, default=STEPS, help="Schritte je Pfad")
+    ap.add_argument("--batch-size", type=int, default=None, help="Pfade je Block (Standard: $STRESS_BATCH_SIZE)")
+    ap.add_argument("--method", choices=("auto", "bootstrap", "fit"), default="auto")
+    ap.add_argument("--sentiment", default="breadth", help="neutral | bullish | bearish | breadth")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    rep = run_stress_tests(method=args.method, n_paths=args.paths, steps=args.steps,
+                           batch_size=args.batch_size, sentiment=args.sentiment, seed=args.seed)
+    print(format_report(rep))
@@ -0,0 +1,245 @@
+# sweep.py — Parameter-Suche für die make_trade_decision-Schwellen
+# Bewertet ein Gitter oder eine Zufallsstichprobe von Schwellen-Kombinationen mit dem
+# Backtest (backtest.evaluate) auf einem Prozess-Pool. Preise, Prozent-Änderungen und
+# Marktstimmung werden einmal berechnet und über parallel_tools.SharedArrays per mmap
+# geteilt; Worker bekommen nur Blöcke von Kombinationen.
+# Rangfolge: score = Rendite − DD_PENALTY · Max-Drawdown, gesucht nur auf dem Trainingsteil
+# der Historie. Der jüngste Block (letzter Fold von walk_forward.make_folds) bleibt als
+# Validierung zurück: der Sieger muss die aktuellen Schwellen dort schlagen – unter der
+# gewählten Stimmung und darf unter keiner festen Stimmung (VALIDATION_SENTIMENTS)
+# schlechter sein, weil live die Stimmung aus dem Feed statt aus der Marktbreite kommt.
+# Erst dann landet er mit --apply in logic_thresholds.json (thresholds.CONFIG_FILE).
+
+from __future__ import annotations
+import itertools
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backtest import START_BALANCE, evaluate, load_prices, market_sentiment, percent_change
+from parallel_tools import SharedArrays, attach_arrays, resolve_workers, run_sharded
+from thresholds import CONFIG_FILE, DECISION_KEYS, decision_thresholds, save_config
+from walk_forward import make_folds
+
+REPORT_FILE = "sweep_report.json"
+DD_PENALTY = 0.5        # Prozentpunkte Rendite je Prozentpunkt Drawdown
+CHUNK = 64              # Kombinationen je Worker-Task
+STEP = 0.5              # Rasterweite der Zufallsstichprobe
+VALIDATION_FOLDS = 3    # make_folds-Blöcke; der letzte (1/4 der Historie) ist die Validierung
+MIN_TRAIN_STEPS = 50
+VALIDATION_SENTIMENTS = ("neutral", "bullish", "bearish")
+
+# Suchbereiche (min, max) je Schwelle
+RANGES: Dict[str, Tuple[float, float]] = {
+    "BULLISH_SELL_PCT": (5.0, 40.0),
+    "BULLISH_HOLD_FLOOR_PCT": (-30.0, -2.0),
+    "BEARISH_SELL_PCT": (3.0, 30.0),
+    "NEUTRAL_SELL_PCT": (5.0, 35.0),
+    "NEUTRAL_HOLD_FLOOR_PCT": (-25.0, -2.0),
+}
+
+
+# ---------- Kombinationen ----------
+def grid(steps: int = 4, ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> np.ndarray:
+    """Vollständiges Gitter: steps Werte je Schwelle → [steps**5, 5] (Spalten = DECISION_KEYS)."""
+    ranges = {**RANGES, **(ranges or {})}
+    axes = [np.round(np.linspace(*ranges[k], max(1, steps)), 2) for k in DECISION_KEYS]
+    return np.array(list(itertools.product(*axes)), dtype=np.float64).reshape(-1, len(DECISION_KEYS))
+
+
+def random_sample(n: int = 2000, ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                  seed: int = 42) -> np.ndarray:
+    """n zufällige Kombinationen im Raster STEP (reproduzierbar über seed, ohne Duplikate)."""
+    ranges = {**RANGES, **(ranges or {})}
+    rng = np.random.default_rng(seed)
+    cols = [np.round(rng.uniform(*ranges[k], size=n) / STEP) * STEP for k in DECISION_KEYS]
+    return np.unique(np.stack(cols, axis=1), axis=0)
+
+
+def _as_dict(row: Sequence[float]) -> Dict[str, float]:
+    return {k: float(v) for k, v in zip(DECISION_KEYS, row)}
+
+
+def score(return_pct: float, max_dd_pct: float, dd_penalty: float = DD_PENALTY) -> float:
+    return round(return_pct - dd_penalty * max_dd_pct, 4)
+
+
+def split_steps(epochs: np.ndarray, lookback: int = 1) -> Optional[Tuple[int, int]]:
+    """(train_end, val_start) als Indexgrenzen: letzter Fold von make_folds; None bei zu kurzer Historie."""
+    folds = make_folds(np.asarray(epochs), n_folds=VALIDATION_FOLDS,
+                       min_train=max(MIN_TRAIN_STEPS, lookback + 1))
+    if not folds or folds[-1][2] - folds[-1][1] <= lookback:
+        return None
+    train_end, val_start, _ = folds[-1]
+    return train_end, val_start
+
+
+def _validate(prices: np.ndarray, pct: np.ndarray, sentiment: Any, sent: np.ndarray,
+              thresholds: Dict[str, float], start_balance: float, dd_penalty: float) -> Dict[str, Any]:
+    """Kennzahlen auf dem Validierungsblock: gewählte Stimmung + je feste Stimmung (nur Scores)."""
+    m = evaluate(prices, pct, sent, thresholds, start_balance)
+    out = {**m, "score": score(m["return_pct"], m["max_drawdown_pct"], dd_penalty), "by_sentiment": {}}
+    for mode in VALIDATION_SENTIMENTS:
+        if mode == sentiment:
+            continue
+        r = evaluate(prices, pct, market_sentiment(pct, mode), thresholds, start_balance)
+        out["by_sentiment"][mode] = score(r["return_pct"], r["max_drawdown_pct"], dd_penalty)
+    return out
+
+
+# ---------- Worker ----------
+def _run_chunk(shared_path: str, task: Tuple[List[List[float]], float]) -> List[List[float]]:
+    """Ein Block Kombinationen → [[return_pct, max_dd_pct, n_trades, final_equity], ...]."""
+    combos, start_balance = task
+    arrs = attach_arrays(shared_path)
+    prices, pct, sent = arrs["prices"], arrs["pct"], arrs["sentiment"]
+    out = []
+    for row in combos:
+        m = evaluate(prices, pct, sent, _as_dict(row), start_balance)
+        out.append([m["return_pct"], m["max_drawdown_pct"], m["n_trades"], m["final_equity"]])
+    return out
+
+
+# ---------- Einstieg ----------
+def sweep(combos: Optional[np.ndarray] = None, *, mode: str = "random", n: int = 2000, steps: int = 4,
+          seed: int = 42, workers: Optional[int] = None, lookback: int = 1, sentiment: Any = "breadth",
+          start_balance: float = START_BALANCE, dd_penalty: float = DD_PENALTY, top: int = 10,
+          history: Any = None, apply: bool = False, save: bool = True) -> Dict[str, Any]:
+    """
+    Führt die Suche auf dem Trainingsteil aus und liefert einen Report (Top-Liste,
+    Baseline, bester Satz, Validierung). apply=True schreibt den besten Satz nach
+    thresholds.CONFIG_FILE, wenn er die aktuellen Schwellen im Training UND auf dem
+    Validierungsblock schlägt (und unter keiner festen Stimmung schlechter ist).
+    """
+    t0 = time.perf_counter()
+    epochs, coins, prices = load_prices(history)
+    split = split_steps(epochs, lookback) if len(coins) else None
+    if split is None:
+        return {"ok": False, "msg": "Zu wenig Historie für Training + Validierung."}
+    train_end, val_start = split
+    if combos is None:
+        combos = grid(steps) if mode == "grid" else random_sample(n, seed=seed)
+    combos = np.asarray(combos, dtype=np.float64).reshape(-1, len(DECISION_KEYS))
+
+    pct = percent_change(prices, lookback)
+    sent = market_sentiment(pct, sentiment)
+    tr_prices, tr_pct, tr_sent = np.nan_to_num(prices[:train_end]), pct[:train_end], sent[:train_end]
+    va_prices, va_pct, va_sent = np.nan_to_num(prices[val_start:]), pct[val_start:], sent[val_start:]
+    base_th = decision_thresholds()
+    base = evaluate(tr_prices, tr_pct, tr_sent, base_th, start_balance)
+    base_score = score(base["return_pct"], base["max_drawdown_pct"], dd_penalty)
+
+    workers = resolve_workers(workers)
+    tasks = [(combos[i:i + CHUNK].tolist(), float(start_balance)) for i in range(0, len(combos), CHUNK)]
+    with SharedArrays({"prices": tr_prices, "pct": tr_pct, "sentiment": tr_sent}) as path:
+        parts = run_sharded(_run_chunk, tasks, path, workers=workers)
+    res = np.array([r for part in parts for r in part], dtype=np.float64).reshape(-1, 4)
+
+    scores = np.round(res[:, 0] - dd_penalty * res[:, 1], 4)
+    order = np.lexsort((res[:, 1], -scores))   # Score absteigend, bei Gleichstand kleinerer Drawdown
+    ranked = [{
+        "rank": k + 1,
+        "thresholds": _as_dict(combos[i]),
+        "score": float(scores[i]),
+        "return_pct": float(res[i, 0]),
+        "max_drawdown_pct": float(res[i, 1]),
+        "n_trades": int(res[i, 2]),
+        "final_equity": float(res[i, 3]),
+    } for k, i in enumerate(order[:max(1, top)])]
+
+    best = ranked[0]
+    base_val = _validate(va_prices, va_pct, sentiment, va_sent, base_th, start_balance, dd_penalty)
+    best["validation"] = _validate(va_prices, va_pct, sentiment, va_sent, best["thresholds"],
+                                   start_balance, dd_penalty)
+    validated = (best["validation"]["score"] > base_val["score"]
+                 and all(v >= base_val["by_sentiment"][k] for k, v in best["validation"]["by_sentiment"].items()))
+    report: Dict[str, Any] = {
+        "ok": True,
+        "written_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "mode": "custom" if mode not in ("grid", "random") else mode,
+        "combinations": int(len(combos)),
+        "workers": workers,
+        "lookback": lookback,
+        "sentiment": sentiment if isinstance(sentiment, str) else "custom",
+        "dd_penalty": dd_penalty,
+        "steps": int(len(epochs)),
+        "train_steps": int(train_end),
+        "validation_steps": int(len(epochs) - val_start),
+        "coins": len(coins),
+        "baseline": {"thresholds": base_th, "score": base_score, **base, "validation": base_val},
+        "best": best,
+        "improves": best["score"] > base_score,
+        "validated": validated,
+        "top": ranked,
+        "applied": False,
+    }
+    if apply and report["improves"] and validated:
+        save_config(best["thresholds"], meta={
+            "source": "sweep", "score": best["score"], "baseline_score": base_score,
+            "validation_score": best["validation"]["score"], "baseline_validation_score": base_val["score"],
+            "return_pct": best["return_pct"], "max_drawdown_pct": best["max_drawdown_pct"],
+            "combinations": report["combinations"], "sentiment": report["sentiment"],
+        })
+        report["applied"] = True
+        report["config_file"] = CONFIG_FILE
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    if save:
+        _save_report(report)
+    return report
+
+
+def _save_report(report: Dict[str, Any], path: str = REPORT_FILE) -> None:
+    d = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(report, tf, ensure_ascii=False, indent=2)
+        tmp = tf.name
+    os.replace(tmp, path)
+
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """Kurztext für Telegram/Log."""
+    if not report.get("ok"):
+        return f"⚠️ Parameter-Suche: {report.get('msg', 'fehlgeschlagen')}"
+    b, base = report["best"], report["baseline"]
+    lines = [
+        f"🔎 Parameter-Suche: {report['combinations']} Kombinationen in {report.get('seconds', 0)} s "
+        f"({report['workers']} Worker)",
+        f"Training {report['train_steps']} / Validierung {report['validation_steps']} Schritte",
+        f"Aktuell: Score {base['score']} | Rendite {base['return_pct']} % | DD {base['max_drawdown_pct']} % "
+        f"| Validierung {base['validation']['score']}",
+        f"Bester:  Score {b['score']} | Rendite {b['return_pct']} % | DD {b['max_drawdown_pct']} % "
+        f"| Validierung {b['validation']['score']}",
+        "  " + ", ".join(f"{k}={v:g}" for k, v in b["thresholds"].items()),
+    ]
+    if report.get("applied"):
+        lines.append(f"✅ Übernommen nach {report['config_file']} (wirksam nach Neustart)")
+    elif not report.get("improves"):
+        lines.append("ℹ️ Keine Verbesserung gegenüber den aktuellen Schwellen.")
+    elif not report.get("validated"):
+        lines.append("ℹ️ Besser nur im Training – auf dem Validierungsblock nicht bestätigt.")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Parameter-Suche für die Entscheidungs-Schwellen")
+    ap.add_argument("--mode", choices=("random", "grid"), default="random")
+    ap.add_argument("--n", type=int, default=2000, help="Stichprobengröße (mode=random)")
+    ap.add_argument("--steps", type=int, default=4, help="Werte je Schwelle (mode=grid, steps**5 Kombinationen)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    ap.add_argument("--sentiment", default="breadth", help="neutral | bullish | bearish | breadth")
+    ap.add_argument("--lookback", type=int, default=1)
+    ap.add_argument("--dd-penalty", type=float, default=DD_PENALTY)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--apply", action="store_true", help=f"besten Satz nach {CONFIG_FILE} schreiben (nur bei bestätigter Verbesserung)")
+    args = ap.parse_args()
+    rep = sweep(mode=args.mode, n=args.n, steps=args.steps, seed=args.seed, workers=args.workers,
+                lookback=args.lookback, sentiment=args.sentiment, dd_penalty=args.dd_penalty,
+                top=args.top, apply=args.apply)
+    print(format_summary(rep))
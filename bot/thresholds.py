@@ -0,0 +1,90 @@
+# thresholds.py — zentrale Schwellenwerte der Entscheidungslogik
+# Von logic.py importiert; backtest.py nutzt dieselben Werte, ohne logic (Binance-Client)
+# laden zu müssen. Liegt eine Konfiguration (logic_thresholds.json, von sweep.py mit
+# --apply geschrieben) vor, überschreibt sie die Standardwerte beim Import – wirksam
+# also nach dem nächsten Neustart von Bot/Scheduler.
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+CONFIG_FILE = os.getenv("LOGIC_THRESHOLDS_FILE", "logic_thresholds.json")
+
+PANIC_DROP_PCT = -25.0
+
+BULLISH_SELL_PCT = 20.0
+BULLISH_HOLD_FLOOR_PCT = -15.0
+
+BEARISH_SELL_PCT = 12.0
+
+NEUTRAL_SELL_PCT = 18.0
+NEUTRAL_HOLD_FLOOR_PCT = -10.0
+
+RECOMMEND_STRONG_GAIN_BULL = 12.0
+RECOMMEND_STRONG_LOSS_BULL = -18.0
+
+RECOMMEND_STRONG_GAIN_BEAR = 8.0
+RECOMMEND_STRONG_LOSS_BEAR = -10.0
+
+RECOMMEND_STRONG_GAIN_NEUT = 15.0
+RECOMMEND_STRONG_LOSS_NEUT = -15.0
+
+# Schwellen, die make_trade_decision benutzt (Backtest / Parameter-Suche)
+DECISION_KEYS = (
+    "BULLISH_SELL_PCT", "BULLISH_HOLD_FLOOR_PCT",
+    "BEARISH_SELL_PCT",
+    "NEUTRAL_SELL_PCT", "NEUTRAL_HOLD_FLOOR_PCT",
+)
+
+
+ALL_KEYS = DECISION_KEYS + (
+    "PANIC_DROP_PCT",
+    "RECOMMEND_STRONG_GAIN_BULL", "RECOMMEND_STRONG_LOSS_BULL",
+    "RECOMMEND_STRONG_GAIN_BEAR", "RECOMMEND_STRONG_LOSS_BEAR",
+    "RECOMMEND_STRONG_GAIN_NEUT", "RECOMMEND_STRONG_LOSS_NEUT",
+)
+
+DEFAULTS = {k: globals()[k] for k in ALL_KEYS}
+
+
+def decision_thresholds() -> dict:
+    """Aktuelle Werte der Entscheidungs-Schwellen als Dict."""
+    return {k: globals()[k] for k in DECISION_KEYS}
+
+
+def load_config(path: str = CONFIG_FILE) -> dict:
+    """Überschreibungen aus der Konfigurationsdatei (nur bekannte Schlüssel, Zahlen)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except Exception:
+        return {}
+    values = obj.get("thresholds") if isinstance(obj, dict) else None
+    if not isinstance(values, dict):
+        return {}
+    out = {}
+    for k, v in values.items():
+        if k in ALL_KEYS and isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[k] = float(v)
+    return out
+
+
+def save_config(values: dict, meta: dict = None, path: str = CONFIG_FILE) -> str:
+    """Schreibt Schwellen (+ Herkunft/Kennzahlen) atomar nach path."""
+    data = {
+        "thresholds": {k: float(v) for k, v in values.items() if k in ALL_KEYS},
+        "written_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if meta:
+        data["meta"] = meta
+    d = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(data, tf, ensure_ascii=False, indent=2)
+        tmp = tf.name
+    os.replace(tmp, path)
+    return path
+
+
+OVERRIDES = load_config()
+globals().update(OVERRIDES)
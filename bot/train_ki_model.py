@@ -1,16 +1,18 @@
 # train_ki_model.py — echtes KI-Training für OmertaTradeBot
-# Nutzt learning_log.json + history.json, trainiert LogisticRegression,
-# speichert Modelle & Metriken unter models/
+# Nutzt learning_log.json + history.json, trainiert LogisticRegression (Outcome-Modell),
+# speichert das Artefakt unter models/ – Metriken & Manifest über ki_pipeline
 # — Auto-Ordner-Erstellung + robuste Window-Stats —
 
-import os, json, math, pickle
-from datetime import datetime, timedelta
+import os, json
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from window_index import WindowIndex, _key, window_stats
+
 MODELS_DIR = Path("models")
-METRICS_PATH = MODELS_DIR / "ki_metrics.json"
-MODEL_PATH   = MODELS_DIR / "ki_model.pkl"
-SCALER_PATH  = MODELS_DIR / "ki_scaler.pkl"
+LINEAR_PATH  = MODELS_DIR / "ki_model_linear.json"   # pickle-freies Artefakt für predict_ki
+
+FEATURES = ["ret_24h", "vol_24h"]
 
 HISTORY_PATH   = Path("history.json")         # Zeitreihe der Preise
 LEARN_LOG_PATH = Path("learning_log.json")    # Einträge mit success (%), coin, date
@@ -20,9 +22,18 @@ def _ensure_models_dir():
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
 def _parse_dt(s: str):
+    """Zeitstempel → naive UTC-datetime; Offsets (+02:00, Z) werden umgerechnet wie in learning_columns._epoch."""
     if not s:
         return None
-    s = str(s).split("+")[0].split("Z")[0].strip()
+    s = str(s).strip()
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
+    except Exception:
+        pass
+    s = s.split("+")[0].split("Z")[0].strip()
     for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
         try:
             return datetime.strptime(s, fmt)
@@ -79,83 +90,273 @@ def _window_stats(series_tp, t_center: datetime, hours: int = 24):
     Liefert: (ret_24h, vol_24h) im Fenster [t_center-hours, t_center]
     - ret_24h: (last/first - 1)
     - vol_24h: Std-Abw. der Log-Returns innerhalb des Fensters
+    Für viele Abfragen auf derselben Serie: WindowIndex einmal bauen (window_index.py).
     """
-    if not series_tp or not t_center:
-        return None, None
-    t_min = t_center - timedelta(hours=hours)
-    window = [(t, p) for (t, p) in series_tp if t_min <= t <= t_center]
-    if len(window) < 2:
-        return None, None
-
-    # Preise extrahieren, nach Zeit sortiert
-    window.sort(key=lambda x: x[0])
-    prices = [p for (_, p) in window if isinstance(p, (int, float))]
-    if len(prices) < 2 or prices[0] <= 0:
-        return None, None
-
-    ret_24 = (prices[-1] / prices[0]) - 1.0
-
-    # Log-Returns für Volatilität
-    logrets = []
-    for i in range(1, len(prices)):
-        prev, cur = prices[i - 1], prices[i]
-        if prev > 0 and cur > 0:
-            logrets.append(math.log(cur / prev))
-    if len(logrets) == 0:
-        vol_24 = 0.0
-    else:
-        mean_lr = sum(logrets) / len(logrets)
-        var = sum((x - mean_lr) ** 2 for x in logrets) / max(1, (len(logrets) - 1))
-        vol_24 = math.sqrt(var)
-
-    return ret_24, vol_24
+    return window_stats(series_tp, t_center, hours)
 
 # ---------- Dataset bauen ----------
-def build_dataset():
+def _learn_rows(cols, start: int = 0):
+    """
+    Liefert [(row_idx, coin, epoch, label)] für alle verwertbaren Lernlog-Zeilen ab start
+    (cols = learning_columns.LearningColumns; label = 1, wenn success > 0).
+    """
+    import numpy as np
+    r = cols.rows[start:]
+    idx = np.flatnonzero((r["coin"] >= 0) & ~np.isnan(r["epoch"]) & ~np.isnan(r["success"]))
+    return [(start + i, cols.coins[c], ep, 1 if s > 0 else 0)
+            for i, c, ep, s in zip(idx.tolist(), r["coin"][idx].tolist(),
+                                   r["epoch"][idx].tolist(), r["success"][idx].tolist())]
+
+def _coin_window_rows(shared_path, task):
+    """Worker: Window-Stats für alle Lernzeilen EINES Coins (Serie per mmap)."""
+    from parallel_tools import attach_arrays
+    start, end, rows = task
+    arrs = attach_arrays(shared_path)
+    epochs = arrs["epochs"][start:end].tolist()
+    prices = arrs["prices"][start:end].tolist()
+    index = WindowIndex(list(zip(epochs, prices)))
+    out = []
+    for row_idx, t_epoch, label in rows:
+        r24, v24 = index.stats(t_epoch, hours=24)
+        if r24 is None or v24 is None:
+            continue
+        out.append((row_idx, [r24, v24], label))
+    return out
+
+def _row_features(rows, ts, workers):
+    """
+    Window-Features für Lernzeilen [(row_idx, coin, t, label)] (t: datetime oder Epoch).
+    Rückgabe: [(row_idx, [ret_24h, vol_24h], label, coin, t_epoch)] in Lernlog-Reihenfolge.
+    workers > 1: Coins werden über einen Prozess-Pool verteilt (Serien via Shared Memory).
+    """
+    out = []
+    if workers <= 1:
+        indices = {}   # Prefix-Summen je Coin, einmal pro Lauf
+        for row_idx, coin, t, label in rows:
+            if coin not in ts:
+                continue
+            index = indices.get(coin)
+            if index is None:
+                index = indices[coin] = WindowIndex(ts[coin])
+            r24, v24 = index.stats(t, hours=24)
+
+            if r24 is None or v24 is None:
+                # Fallback: kein Sample, wenn wir keine brauchbaren Stats haben
+                continue
+            out.append((row_idx, [r24, v24], label, coin, _key(t)))
+        return out
+
+    # Parallel: Lernzeilen je Coin bündeln, Serien flach in Shared Memory legen
+    import numpy as np
+    from parallel_tools import SharedArrays, run_sharded
+    by_coin, meta = {}, {}
+    for row_idx, coin, t, label in rows:
+        if coin in ts:
+            by_coin.setdefault(coin, []).append((row_idx, _key(t), label))
+            meta[row_idx] = (coin, _key(t))
+
+    tasks, epochs, prices, pos = [], [], [], 0
+    for coin in sorted(by_coin):
+        series_tp = ts[coin]
+        epochs.extend(_key(t) for t, _ in series_tp)
+        prices.extend(p for _, p in series_tp)
+        tasks.append((pos, pos + len(series_tp), by_coin[coin]))
+        pos += len(series_tp)
+
+    arrays = {"epochs": np.asarray(epochs, dtype=np.float64),
+              "prices": np.asarray(prices, dtype=np.float64)}
+    with SharedArrays(arrays) as shm:
+        parts = run_sharded(_coin_window_rows, tasks, shm, workers=workers)
+
+    merged = sorted((r for part in parts for r in part), key=lambda r: r[0])
+    return [(row_idx, feat, label) + meta[row_idx] for row_idx, feat, label in merged]
+
+def build_dataset(*, workers=None):
     """
     Baut X, y aus learning_log.json (& history.json).
     y = 1, wenn success > 0, sonst 0
     Features:
       - ret_24h (Preisänderung bis zum Datum)
       - vol_24h (Volatilität bis zum Datum)
+    workers (None = $KI_WORKERS) > 1: Coins werden über einen Prozess-Pool verteilt (Serien via Shared Memory),
+    die Zeilen kommen in Lernlog-Reihenfolge zurück – identisch zum seriellen Lauf.
     """
-    learn = _load_json_safe(LEARN_LOG_PATH, [])
+    from learning_columns import load_columns
+    learn = load_columns(str(LEARN_LOG_PATH))
+    if not len(learn):
+        return [], [], 0
     hist  = _load_json_safe(HISTORY_PATH, [])
     ts    = _history_to_timeseries(hist)
 
-    X, y = [], []
-    samples = 0
+    from parallel_tools import resolve_workers
+    feats = _row_features(_learn_rows(learn), ts, resolve_workers(workers))
+    X = [f for _, f, _, _, _ in feats]
+    y = [label for _, _, label, _, _ in feats]
+    return X, y, len(feats)
 
-    if not isinstance(learn, list) or not learn:
-        return X, y, 0
+# ---------- Datensatz-Cache (inkrementell) ----------
+# Der Lernlog wird nur angehängt: Zeilen unterhalb der Hochwassermarke (Anzahl bereits
+# verarbeiteter Lernlog-Zeilen) werden nie neu berechnet. Schrumpft der Log oder ändert
+# sich seine erste Zeile, wird komplett neu gebaut. Zeilen ohne brauchbares 24h-Fenster
+# zählen als verarbeitet (ihr Fenster liegt in der Vergangenheit und ändert sich nicht mehr).
+DATASET_PATH = MODELS_DIR / "ki_dataset.npz"
+DATASET_SCHEMA = 3   # 2: Lernzeilen über learning_columns; 3: History-Zeitstempel mit Offset nach UTC
 
-    for row in learn:
-        coin = str(row.get("coin", "")).upper()
-        if not coin:
-            continue
-        date = row.get("date") or row.get("evaluated_at") or row.get("time")
-        success = row.get("success")
-        if success is None:
-            continue
-        t = _parse_dt(date)
-        if not t:
-            continue
+def _load_dataset_cache(path: Path = DATASET_PATH):
+    import numpy as np
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            cache = {k: z[k] for k in z.files}
+        if int(cache["schema"]) != DATASET_SCHEMA:
+            return None
+        return cache
+    except Exception:
+        return None
 
-        series_tp = ts.get(coin, [])
-        r24, v24 = _window_stats(series_tp, t, hours=24)
+def _save_dataset_cache(cache, path: Path = DATASET_PATH):
+    import tempfile
+    import numpy as np
+    _ensure_models_dir()
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=path.parent, suffix=".tmp") as tf:
+        np.savez(tf, **cache)
+        tmp = tf.name
+    os.replace(tmp, path)
 
-        if r24 is None or v24 is None:
-            # Fallback: kein Sample, wenn wir keine brauchbaren Stats haben
+ANCHOR_ROWS = 8   # so viele zuletzt verarbeitete Lernzeilen identifizieren die Position nach dem Kürzen
+
+def _fingerprint(learn, idx):
+    """(coin-Namen, [epoch, decision, success]) der Lernzeilen idx – Vergleichsschlüssel ohne Roh-JSON."""
+    import numpy as np
+    r = learn.rows[idx]
+    coins = np.asarray([learn.coins[c] if c >= 0 else "" for c in r["coin"].tolist()], dtype="U32")
+    vals = np.column_stack([r["epoch"], r["decision"].astype(np.float64), r["success"].astype(np.float64)])
+    return coins, vals
+
+def _locate_anchor(learn, cache):
+    """
+    Um wie viele Zeilen wurde der Lernlog vorne gekürzt (prune_other_logs)? Sucht die zuletzt
+    verarbeiteten ANCHOR_ROWS Zeilen des Caches im aktuellen Log; None, wenn nicht auffindbar.
+    """
+    import numpy as np
+    if "anchor_coins" not in cache or not len(cache["anchor_coins"]):
+        return None
+    a_coins, a_vals = cache["anchor_coins"], cache["anchor_vals"]
+    k, last = len(a_coins), int(cache["high_water"]) - 1
+    coins, vals = _fingerprint(learn, np.arange(len(learn)))
+    hit = (coins == a_coins[-1]) & ((vals == a_vals[-1]) | (np.isnan(vals) & np.isnan(a_vals[-1]))).all(axis=1)
+    for pos in np.flatnonzero(hit)[::-1].tolist():   # neue Position der letzten Ankerzeile
+        if pos < k - 1 or pos > last:
             continue
+        if (np.array_equal(coins[pos - k + 1:pos + 1], a_coins)
+                and np.array_equal(vals[pos - k + 1:pos + 1], a_vals, equal_nan=True)):
+            return last - pos
+    return None
+
+def _shift_cache(cache, shift: int):
+    """Cache auf einen vorne um shift Zeilen gekürzten Lernlog umrechnen."""
+    import numpy as np
+    keep = cache["row_idx"] >= shift
+    for key in ("features", "labels", "timestamps", "coin_ids"):
+        cache[key] = cache[key][keep]
+    cache["row_idx"] = cache["row_idx"][keep] - shift
+    cache["high_water"] = np.int64(int(cache["high_water"]) - shift)
 
-        X.append([r24, v24])
-        y.append(1 if float(success) > 0 else 0)
-        samples += 1
+def build_dataset_cached(*, workers=None, rebuild: bool = False, path: Path = DATASET_PATH):
+    """
+    Wie build_dataset, aber mit persistierter Matrix unter models/ki_dataset.npz
+    (features, labels, timestamps, coin_ids, row_idx, coins, high_water).
+    Nur Lernzeilen ab der Hochwassermarke werden berechnet und angehängt. Wurde der Log vorne
+    gekürzt (neue erste Zeile), wird die alte Position über die letzten verarbeiteten Zeilen
+    gesucht und der Cache verschoben; neu gebaut wird nur, wenn sie nicht mehr auffindbar sind.
+    Rückgabe: X, y, n, info {"build_seconds", "rows_reused", "rows_added", "full_rebuild", "rows_pruned"}
+    """
+    import time
+    import numpy as np
+    t0 = time.perf_counter()
+
+    from learning_columns import load_columns
+    learn = load_columns(str(LEARN_LOG_PATH))
+    head = learn.head or ""
+
+    cache = None if rebuild else _load_dataset_cache(path)
+    pruned = 0
+    if cache is not None and str(cache["head"]) != head:
+        shift = _locate_anchor(learn, cache)
+        if shift is None:
+            cache = None
+        else:
+            _shift_cache(cache, shift)
+            cache["head"] = np.str_(head)
+            pruned = shift
+    full = cache is None or int(cache["high_water"]) > len(learn)
+    if full:
+        cache = {
+            "schema": np.int64(DATASET_SCHEMA),
+            "head": np.str_(head),
+            "high_water": np.int64(0),
+            "features": np.empty((0, 2), dtype=np.float64),
+            "labels": np.empty(0, dtype=np.int8),
+            "timestamps": np.empty(0, dtype=np.float64),
+            "coin_ids": np.empty(0, dtype=np.int32),
+            "row_idx": np.empty(0, dtype=np.int64),
+            "coins": np.empty(0, dtype="U16"),
+        }
+    high_water = int(cache["high_water"])
+    reused = len(cache["labels"])
+
+    new_rows = _learn_rows(learn, high_water)
+    added = 0
+    if new_rows:
+        from parallel_tools import resolve_workers
+        hist = _load_json_safe(HISTORY_PATH, [])
+        ts = _history_to_timeseries(hist)
+        feats = _row_features(new_rows, ts, resolve_workers(workers))
+        if feats:
+            coins = [str(c) for c in cache["coins"].tolist()]
+            coin_pos = {c: k for k, c in enumerate(coins)}
+            for _, _, _, coin, _ in feats:
+                if coin not in coin_pos:
+                    coin_pos[coin] = len(coins)
+                    coins.append(coin)
+            width = max([16] + [len(c) for c in coins])
+            cache["coins"] = np.asarray(coins, dtype=f"U{width}")
+            cache["features"] = np.concatenate(
+                [cache["features"], np.asarray([f for _, f, _, _, _ in feats], dtype=np.float64)])
+            cache["labels"] = np.concatenate(
+                [cache["labels"], np.asarray([l for _, _, l, _, _ in feats], dtype=np.int8)])
+            cache["timestamps"] = np.concatenate(
+                [cache["timestamps"], np.asarray([e for _, _, _, _, e in feats], dtype=np.float64)])
+            cache["coin_ids"] = np.concatenate(
+                [cache["coin_ids"], np.asarray([coin_pos[c] for _, _, _, c, _ in feats], dtype=np.int32)])
+            cache["row_idx"] = np.concatenate(
+                [cache["row_idx"], np.asarray([r for r, _, _, _, _ in feats], dtype=np.int64)])
+            added = len(feats)
+
+    if full or pruned or len(learn) != high_water:
+        cache["high_water"] = np.int64(len(learn))
+        cache["anchor_coins"], cache["anchor_vals"] = _fingerprint(
+            learn, np.arange(max(0, len(learn) - ANCHOR_ROWS), len(learn)))
+        _save_dataset_cache(cache, path)
 
-    return X, y, samples
+    X = cache["features"].tolist()
+    y = cache["labels"].astype(int).tolist()
+    info = {
+        "build_seconds": round(time.perf_counter() - t0, 4),
+        "rows_reused": reused,
+        "rows_added": added,
+        "full_rebuild": bool(full),
+        "rows_pruned": pruned,
+    }
+    return X, y, len(y), info
 
 # ---------- Training ----------
-def train_model():
+def train_outcome_model(workers=None, consolidate_online: bool = True, rebuild: bool = False):
+    """
+    Outcome-Modell (LogisticRegression auf ret_24h/vol_24h, Label = realisierter Erfolg).
+    Schreibt nur das JSON-Artefakt (LINEAR_PATH); Metriken + Manifest schreibt ki_pipeline.
+    """
     _ensure_models_dir()
 
     # Versuche echtes Training
@@ -164,21 +365,20 @@ def train_model():
         from sklearn.linear_model import LogisticRegression
         from sklearn.metrics import accuracy_score, roc_auc_score
 
-        X, y, n = build_dataset()
+        X, y, n, ds_info = build_dataset_cached(workers=workers, rebuild=rebuild)
 
         # Falls zu wenig Daten oder nur eine Klasse -> Metriken aus Lernlog ableiten
         if n < 20 or len(set(y)) < 2:
             acc = (sum(y) / len(y)) if y else 0.0
-            metrics = {
+            return {
+                "ok": False,
                 "n_samples": n,
                 "auc": None,
                 "accuracy": round(float(acc), 4),
                 "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "note": "Zu wenige/ungleiche Klassen – Modell nicht trainiert, nur Kennzahl aus Lernlog."
+                "note": "Zu wenige/ungleiche Klassen – Modell nicht trainiert, nur Kennzahl aus Lernlog.",
+                "dataset": ds_info,
             }
-            with METRICS_PATH.open("w", encoding="utf-8") as f:
-                json.dump(metrics, f, ensure_ascii=False, indent=2)
-            return metrics
 
         scaler = StandardScaler()
         Xs = scaler.fit_transform(X)
@@ -195,39 +395,62 @@ def train_model():
         except Exception:
             auc = None
 
-        # Modelle speichern
-        with open(MODEL_PATH, "wb") as f:
-            pickle.dump(clf, f)
-        with open(SCALER_PATH, "wb") as f:
-            pickle.dump(scaler, f)
+        # Modell speichern (JSON, kein Pickle)
+        from ki_linear import from_sklearn, save_linear
+        trained_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        save_linear(from_sklearn(clf, scaler, FEATURES,
+                                 meta={"trained_at": trained_at, "n_samples": len(y)}), LINEAR_PATH)
+
+        # Online-Modell auf den Gesamtdatensatz zurücksetzen (nächtliche Konsolidierung)
+        if consolidate_online:
+            try:
+                from online_learner import get_learner
+                get_learner().consolidate(X, y)
+            except Exception as e:
+                print(f"[KI-Online] Konsolidierung fehlgeschlagen: {e}")
 
-        metrics = {
+        return {
+            "ok": True,
             "n_samples": len(y),
             "auc": round(float(auc), 4) if auc is not None else None,
             "accuracy": round(float(acc), 4),
-            "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "trained_at": trained_at,
+            "dataset": ds_info,
         }
-        with METRICS_PATH.open("w", encoding="utf-8") as f:
-            json.dump(metrics, f, ensure_ascii=False, indent=2)
-        return metrics
 
     except ModuleNotFoundError:
         # sklearn nicht installiert → Dummy-Kennzahlen aus Lernlog
-        learn = _load_json_safe(LEARN_LOG_PATH, [])
-        n = len(learn) if isinstance(learn, list) else 0
-        pos = sum(1 for r in learn if isinstance(r, dict) and float(r.get("success", 0)) > 0) if n else 0
+        from learning_columns import load_columns
+        learn = load_columns(str(LEARN_LOG_PATH))
+        n = len(learn)
+        pos = int((learn.rows["success"] > 0).sum()) if n else 0
         acc = (pos / n) if n > 0 else 0.0
-        metrics = {
+        return {
+            "ok": False,
             "n_samples": n,
             "auc": None,
             "accuracy": round(float(acc), 4),
             "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "note": "scikit-learn nicht installiert – bitte in requirements.txt aufnehmen."
         }
-        with METRICS_PATH.open("w", encoding="utf-8") as f:
-            json.dump(metrics, f, ensure_ascii=False, indent=2)
-        return metrics
+
+def train_model(workers=None, consolidate_online: bool = True, rebuild: bool = False):
+    """Kompletter Trainingslauf über die gemeinsame Pipeline (ki_pipeline.train_all)."""
+    from ki_pipeline import train_all
+    return train_all(workers=workers, rebuild=rebuild, consolidate_online=consolidate_online)
 
 if __name__ == "__main__":
-    m = train_model()
-    print("[KI] Train completed:", m)
+    import argparse
+    ap = argparse.ArgumentParser(description="KI-Training (learning_log + history)")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse für den Datensatz (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    ap.add_argument("--bench", action="store_true", help="nur build_dataset seriell vs. parallel messen")
+    ap.add_argument("--rebuild", action="store_true", help="Datensatz-Cache (models/ki_dataset.npz) verwerfen und neu bauen")
+    args = ap.parse_args()
+    if args.bench:
+        from parallel_tools import benchmark
+        n = args.workers or os.cpu_count() or 1
+        for r in benchmark(build_dataset, sorted({1, n})):
+            print("[Bench]", r)
+    else:
+        m = train_model(workers=args.workers, rebuild=args.rebuild)
+        print("[KI] Train completed:", m)
@@ -1,79 +1,91 @@
 # visualize_learning.py
 # — OmertaTradeBot: Lern-Erfolg visualisieren (Heatmap) —
-# Matplotlib-only (kein seaborn), robustes JSON-Parsing, Value-Labels, Zusammenfassungstext.
+# Matplotlib-only (kein seaborn), Lernlog spaltenweise (learning_columns), Value-Labels, Zusammenfassungstext.
 
 import os
 import json
+import hashlib
+import tempfile
+import threading
 from typing import List, Dict, Tuple, Optional
-import math
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from learning_columns import LearningColumns, load_columns
 
 
 LEARNING_LOG_FILE = os.path.join(os.path.dirname(__file__), "learning_log.json")
 HEATMAP_FILE = os.path.join(os.path.dirname(__file__), "heatmap.png")
+# Render-Cache: Signatur des Lernlogs + Hash des Aggregats (Coin x Indikator) → PNG
+HEATMAP_CACHE_FILE = os.path.join(os.path.dirname(__file__), "heatmap_cache.json")
+
+_RENDER_LOCK = threading.Lock()
 
 
-def _load_learning_log(path: str) -> List[dict]:
+def _load_columns(path: str) -> Optional[LearningColumns]:
     if not os.path.exists(path):
         print("❌ Lernlog-Datei fehlt.")
-        return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, list):
-            print("⚠️ Lernlog-Format unerwartet (kein Array).")
-            return []
-        return data
-    except json.JSONDecodeError:
-        print("⚠️ Fehler beim Lesen der JSON-Datei.")
-        return []
-    except Exception as e:
-        print(f"⚠️ Unerwarteter Fehler beim Laden: {e}")
-        return []
-
-
-def _coerce_success(x) -> Optional[float]:
-    try:
-        # Akzeptiere 0/1, 0..100, Strings mit Prozent etc.
-        if isinstance(x, str):
-            x = x.strip().replace("%", "")
-        val = float(x)
-        return val
-    except Exception:
         return None
+    cols = load_columns(path)
+    return cols if len(cols) else None
 
 
-def _prepare_dataframe(rows: List[dict]) -> Optional[pd.DataFrame]:
+def _aggregate(cols: LearningColumns) -> Dict[Tuple[str, str], Tuple[float, int]]:
     """
-    Erwartet pro Eintrag min.:
-      - coin (str)
-      - indicator (str)
-      - success (float 0..100)
+    (coin, indicator) → (Summe, Anzahl) über Zeilen mit coin, indicator und success
+    (sonst success_rate), Rohwerte wie geloggt – Grundlage für Pivot, Ranking und Cache-Schlüssel.
     """
-    if not rows:
-        return None
+    r = cols.rows
+    success = cols.success_any()
+    m = (r["coin"] >= 0) & (r["indicator"] >= 0) & ~np.isnan(success)
+    if not m.any():
+        return {}
+    n_ind = max(1, len(cols.indicators))
+    keys = r["coin"][m].astype(np.int64) * n_ind + r["indicator"][m]
+    sums = np.bincount(keys, weights=success[m].astype(np.float64))
+    counts = np.bincount(keys)
+    return {(cols.coins[k // n_ind], cols.indicators[k % n_ind]): (float(sums[k]), int(counts[k]))
+            for k in np.flatnonzero(counts)}
+
+
+def _aggregate_hash(agg: Dict[Tuple[str, str], Tuple[float, int]]) -> str:
+    payload = json.dumps([[c, i, round(s, 9), n] for (c, i), (s, n) in sorted(agg.items())])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-    cleaned = []
-    for r in rows:
-        coin = r.get("coin")
-        ind = r.get("indicator") or r.get("indicator_name") or r.get("metric")
-        suc = _coerce_success(r.get("success") or r.get("success_rate"))
-        if not coin or not ind or suc is None:
-            continue
-        cleaned.append({"coin": str(coin), "indicator": str(ind), "success": float(suc)})
 
-    if not cleaned:
+def _file_sig(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
         return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _load_cache() -> Dict:
+    try:
+        with open(HEATMAP_CACHE_FILE, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        return obj if isinstance(obj, dict) else {}
+    except Exception:
+        return {}
+
 
-    df = pd.DataFrame(cleaned)
-    return df if set(["coin", "indicator", "success"]).issubset(df.columns) else None
+def _save_cache(entry: Dict) -> None:
+    d = os.path.dirname(HEATMAP_CACHE_FILE) or "."
+    with tempfile.NamedTemporaryFile("w", delete=False, dir=d, suffix=".tmp", encoding="utf-8") as tf:
+        json.dump(entry, tf)
+        tmp = tf.name
+    os.replace(tmp, HEATMAP_CACHE_FILE)
 
 
-def _make_pivot(df: pd.DataFrame) -> pd.DataFrame:
-    # Mittelwert je Coin x Indikator
-    pivot = df.pivot_table(index="coin", columns="indicator", values="success", aggfunc="mean")
+def _make_pivot(agg: Dict[Tuple[str, str], Tuple[float, int]]) -> pd.DataFrame:
+    # Mittelwert je Coin x Indikator (Summe / Anzahl aus dem Aggregat)
+    if not agg:
+        return pd.DataFrame()
+    means = pd.Series({k: s / n for k, (s, n) in agg.items()})
+    pivot = means.unstack()
+    pivot.index.name, pivot.columns.name = "coin", "indicator"
     # Sortierung: Coins nach Gesamt-Mean, Indikatoren nach Gesamt-Mean
     pivot = pivot.reindex(pivot.mean(axis=1).sort_values(ascending=False).index)
     pivot = pivot.loc[:, pivot.mean(axis=0).sort_values(ascending=False).index]
@@ -81,41 +93,23 @@ def _make_pivot(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _annotate_cells(ax, data_2d):
-    n_rows, n_cols = data_2d.shape
-    for i in range(n_rows):
-        for j in range(n_cols):
-            val = data_2d[i, j]
-            if math.isnan(val):
-                txt = "—"
-                color = "black"
-            else:
-                txt = f"{val:.1f}"
-                # Kontrast grob wählen
-                color = "white" if val >= (data_2d[~pd.isna(data_2d)].mean() if (~pd.isna(data_2d)).any() else 50) else "black"
-            ax.text(j, i, txt, ha="center", va="center", fontsize=9, color=color)
-
-
-def generate_heatmap(save_path: str = HEATMAP_FILE) -> Optional[str]:
-    """
-    Erzeugt eine Heatmap 'Coin vs Indikator' mit durchschnittlicher Erfolgsrate (0..100 %).
-    Speichert PNG und gibt Pfad zurück, oder None bei Fehler.
-    """
-    rows = _load_learning_log(LEARNING_LOG_FILE)
-    if not rows:
-        return None
-
-    df = _prepare_dataframe(rows)
-    if df is None or df.empty:
-        print("⚠️ Keine verwertbaren Einträge im Lernlog.")
-        return None
-
-    pivot = _make_pivot(df)
-    if pivot.empty:
-        print("⚠️ Pivot leer (evtl. nur ein Coin oder ein Indikator vorhanden).")
-        return None
-
-    # Plot
-    fig, ax = plt.subplots(figsize=(max(8, 0.7 * pivot.shape[1] + 3), max(6, 0.5 * pivot.shape[0] + 2)))
+    data_2d = np.asarray(data_2d, dtype=float)
+    valid = ~np.isnan(data_2d)
+    # Kontrast grob wählen: Schwelle = Mittel aller Zellen, einmal berechnet
+    threshold = data_2d[valid].mean() if valid.any() else 50
+    white = valid & (data_2d >= threshold)
+    for (i, j), val in np.ndenumerate(data_2d):
+        txt = f"{val:.1f}" if valid[i, j] else "—"
+        ax.text(j, i, txt, ha="center", va="center", fontsize=9,
+                color="white" if white[i, j] else "black")
+
+
+def _render(pivot: pd.DataFrame, save_path: str) -> bool:
+    # Figure ohne pyplot: kein globaler Zustand, läuft auch in Hintergrund-Threads (Agg)
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(max(8, 0.7 * pivot.shape[1] + 3), max(6, 0.5 * pivot.shape[0] + 2)))
+    ax = fig.subplots()
     # Standard-Cmap von Matplotlib (keine externen Styles nötig)
     im = ax.imshow(pivot.values, aspect="auto")
 
@@ -130,22 +124,72 @@ def generate_heatmap(save_path: str = HEATMAP_FILE) -> Optional[str]:
     ax.set_title("📊 Erfolgs-Heatmap: Coin vs. Indikator (Ø Erfolgsrate)")
 
     # Farbskala
-    cbar = plt.colorbar(im, ax=ax)
+    cbar = fig.colorbar(im, ax=ax)
     cbar.ax.set_ylabel("Erfolg (%)", rotation=270, labelpad=15)
 
     # Werte in Zellen annotieren
     _annotate_cells(ax, pivot.values)
 
-    plt.tight_layout()
+    fig.tight_layout()
     try:
-        plt.savefig(save_path, dpi=150)
-        plt.close(fig)
+        fig.savefig(save_path, dpi=150)
         print(f"✅ Heatmap gespeichert unter: {save_path}")
-        return save_path
+        return True
     except Exception as e:
         print(f"❌ Fehler beim Speichern der Heatmap: {e}")
-        plt.close(fig)
-        return None
+        return False
+
+
+def generate_heatmap(save_path: str = HEATMAP_FILE) -> Optional[str]:
+    """
+    Erzeugt eine Heatmap 'Coin vs Indikator' mit durchschnittlicher Erfolgsrate (0..100 %).
+    Speichert PNG und gibt Pfad zurück, oder None bei Fehler.
+    Unverändertes Lernlog bzw. unverändertes Aggregat → gecachtes PNG ohne neues Rendern.
+    """
+    with _RENDER_LOCK:
+        cache = _load_cache()
+        cached_ok = cache.get("path") == save_path and os.path.isfile(save_path)
+        sig = _file_sig(LEARNING_LOG_FILE)
+        if cached_ok and sig is not None and cache.get("log_sig") == sig:
+            return save_path
+
+        cols = _load_columns(LEARNING_LOG_FILE)
+        if cols is None:
+            return None
+
+        agg = _aggregate(cols)
+        if not agg:
+            print("⚠️ Keine verwertbaren Einträge im Lernlog.")
+            return None
+        key = _aggregate_hash(agg)
+        if cached_ok and cache.get("agg_hash") == key:
+            _save_cache({**cache, "log_sig": sig})
+            return save_path
+
+        pivot = _make_pivot(agg)
+        if pivot.empty:
+            print("⚠️ Pivot leer (evtl. nur ein Coin oder ein Indikator vorhanden).")
+            return None
+
+        if not _render(pivot, save_path):
+            return None
+        _save_cache({"path": save_path, "log_sig": sig, "agg_hash": key})
+        return save_path
+
+
+def generate_heatmap_async(callback) -> threading.Thread:
+    """Rendert im Hintergrund-Thread und ruft callback(path | None, error | None) auf."""
+    def _job():
+        try:
+            path = generate_heatmap()
+        except Exception as e:
+            callback(None, e)
+            return
+        callback(path, None)
+
+    t = threading.Thread(target=_job, name="heatmap", daemon=True)
+    t.start()
+    return t
 
 
 def generate_heatmap_summary_text(top_n: int = 5) -> str:
@@ -154,16 +198,20 @@ def generate_heatmap_summary_text(top_n: int = 5) -> str:
       - Top-Coins nach Ø Erfolg
       - Top-Indikatoren nach Ø Erfolg
     """
-    rows = _load_learning_log(LEARNING_LOG_FILE)
-    if not rows:
+    cols = _load_columns(LEARNING_LOG_FILE)
+    if cols is None:
         return "❌ Kein Lernlog vorhanden."
 
-    df = _prepare_dataframe(rows)
-    if df is None or df.empty:
+    agg = _aggregate(cols)
+    if not agg:
         return "⚠️ Kein auswertbarer Lernlog."
 
-    coin_rank = df.groupby("coin")["success"].mean().sort_values(ascending=False).head(top_n)
-    ind_rank = df.groupby("indicator")["success"].mean().sort_values(ascending=False).head(top_n)
+    totals = pd.DataFrame([(c, i, s, n) for (c, i), (s, n) in agg.items()],
+                          columns=["coin", "indicator", "sum", "n"])
+    by_coin = totals.groupby("coin")[["sum", "n"]].sum()
+    by_ind = totals.groupby("indicator")[["sum", "n"]].sum()
+    coin_rank = (by_coin["sum"] / by_coin["n"]).sort_values(ascending=False).head(top_n)
+    ind_rank = (by_ind["sum"] / by_ind["n"]).sort_values(ascending=False).head(top_n)
 
     msg = "📘 Lern-Overview\n"
     if not coin_rank.empty:
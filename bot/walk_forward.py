@@ -0,0 +1,217 @@
+# walk_forward.py — Walk-Forward-Evaluation der KI-Modelle über den gecachten Datensatz
+# Zeitlich sortierte Blöcke: Fold k trainiert auf allen Blöcken bis k (expandierendes
+# Fenster) und testet auf Block k+1. Die Folds laufen parallel im Prozess-Pool
+# (parallel_tools, Arrays per Shared Memory), Ergebnis nach models/ki_walkforward.json.
+
+from __future__ import annotations
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+MODELS_DIR = Path("models")
+REPORT_PATH = MODELS_DIR / "ki_walkforward.json"
+
+DEFAULT_FOLDS = 5
+MODELS = ("lr", "hgb", "rf")
+
+# Label-Horizont von source="features" in Zeilen (Snapshots) von history.json. Trainiert wird
+# je Fold nur auf Zeilen, deren Label vor dem Test-Start feststand (label_ts < Test-Start);
+# bei täglichen Snapshots reicht das Label 6 Tage weit, ein Stunden-Embargo griffe zu kurz.
+FEATURES_HORIZON = 6
+
+
+# ---------- Datensätze ----------
+def load_dataset(source: str = "learn", *, workers=None
+                 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    source="learn":    train_ki_model-Matrix (models/ki_dataset.npz, inkrementell erweitert);
+                       Zeitstempel = Auswertungszeitpunkt, das Label steht dort schon fest.
+    source="features": ki_features.build_dataset (Feature-Store, 9 Features); das Label
+                       steht erst FEATURES_HORIZON Zeilen später fest.
+    Rückgabe: X, y, ts, label_ts (Epoch-Sekunden), zeitlich nach ts sortiert.
+    """
+    if source == "learn":
+        from train_ki_model import build_dataset_cached, _load_dataset_cache
+        build_dataset_cached(workers=workers)
+        cache = _load_dataset_cache()
+        if cache is None:
+            return np.empty((0, 2)), np.empty(0, dtype=int), np.empty(0), np.empty(0)
+        X, y, ts = cache["features"], cache["labels"].astype(int), cache["timestamps"]
+        label_ts = ts
+    elif source == "features":
+        from ki_features import build_dataset
+        from feature_store import _to_epoch, get_store
+        Xl, yl, meta = build_dataset(horizon_hours=FEATURES_HORIZON, workers=workers)
+        X = np.asarray(Xl, dtype=np.float64)
+        y = np.asarray(yl, dtype=int)
+        ts = np.asarray([_to_epoch(t) for _, t in meta], dtype=np.float64)
+        label_ts = np.full(len(ts), np.inf)
+        coins = np.asarray([c for c, _ in meta])
+        store = get_store()
+        for coin in np.unique(coins).tolist():
+            rows = np.flatnonzero(coins == coin)
+            series = store.load(coin)["ts"].astype(np.float64)
+            lab = np.searchsorted(series, ts[rows]) + FEATURES_HORIZON
+            label_ts[rows] = series[np.minimum(lab, len(series) - 1)]
+    else:
+        raise ValueError(f"Unbekannte Datenquelle: {source}")
+    order = np.argsort(ts, kind="stable")
+    return X[order], y[order], ts[order], label_ts[order]
+
+
+def make_folds(ts: np.ndarray, n_folds: int = DEFAULT_FOLDS, embargo_hours: float = 0.0,
+               min_train: int = 50) -> List[Tuple[int, int, int]]:
+    """
+    Zeitlich sortierte ts → [(train_end, test_start, test_end)] als Indexgrenzen.
+    Block-Grenzen liegen nie innerhalb eines Zeitstempels; Trainingszeilen, deren
+    Zeitstempel näher als embargo_hours am Test-Start liegt, fallen weg.
+    """
+    n = len(ts)
+    if n == 0 or n_folds < 1:
+        return []
+    bounds = [int(round(n * k / (n_folds + 1))) for k in range(n_folds + 2)]
+    # Grenzen auf den ersten Index eines Zeitstempels schieben
+    bounds = [int(np.searchsorted(ts, ts[b], side="left")) if 0 < b < n else b for b in bounds]
+    folds = []
+    for k in range(1, n_folds + 1):
+        test_start, test_end = bounds[k], bounds[k + 1]
+        if test_end <= test_start:
+            continue
+        train_end = int(np.searchsorted(ts, ts[test_start] - embargo_hours * 3600.0, side="left"))
+        if train_end < min_train:
+            continue
+        folds.append((train_end, test_start, test_end))
+    return folds
+
+
+# ---------- Fold-Worker ----------
+def _fit(kind: str, Xtr: np.ndarray, ytr: np.ndarray, parallel: bool):
+    if kind == "lr":
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.linear_model import LogisticRegression
+        clf = make_pipeline(StandardScaler(), LogisticRegression(max_iter=200))
+        clf.fit(Xtr, ytr)
+        return clf
+    if kind == "rf" and parallel:
+        # im Pool je Fold ein Kern, sonst Überbuchung durch n_jobs=-1
+        from sklearn.ensemble import RandomForestClassifier
+        clf = RandomForestClassifier(n_estimators=120, max_depth=8, min_samples_leaf=5,
+                                     random_state=42, n_jobs=1)
+        clf.fit(Xtr, ytr)
+        return clf
+    from ki_model import _FITTERS
+    clf, _ = _FITTERS[kind](Xtr, ytr)
+    return clf
+
+
+def _run_fold(shared_path: str, task) -> Dict[str, Any]:
+    from parallel_tools import attach_arrays
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    fold, train_end, test_start, test_end, kind, parallel = task
+    arrs = attach_arrays(shared_path)
+    X, y, ts = arrs["X"], arrs["y"], arrs["ts"]
+    known = np.flatnonzero(arrs["label_ts"][:train_end] < ts[test_start])   # Label vor Test-Start bekannt
+    Xtr, ytr = np.asarray(X[known]), np.asarray(y[known])
+    Xte, yte = np.asarray(X[test_start:test_end]), np.asarray(y[test_start:test_end])
+
+    t0 = time.perf_counter()
+    res: Dict[str, Any] = {
+        "fold": fold,
+        "n_train": int(len(ytr)),
+        "n_test": int(len(yte)),
+        "train_until": _iso(ts[known[-1]]) if len(known) else None,
+        "test_from": _iso(ts[test_start]),
+        "test_until": _iso(ts[test_end - 1]),
+        "auc": None,
+        "accuracy": None,
+    }
+    if len(set(ytr.tolist())) < 2:
+        res["note"] = "nur eine Klasse im Training"
+    else:
+        clf = _fit(kind, Xtr, ytr, parallel)
+        proba = clf.predict_proba(Xte)[:, 1]
+        res["accuracy"] = round(float(accuracy_score(yte, (proba > 0.5).astype(int))), 4)
+        if len(set(yte.tolist())) > 1:
+            res["auc"] = round(float(roc_auc_score(yte, proba)), 4)
+    res["seconds"] = round(time.perf_counter() - t0, 3)
+    return res
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ---------- Einstieg ----------
+def walk_forward(source: str = "learn", model: str = "lr", n_folds: int = DEFAULT_FOLDS, *,
+                 workers=None, embargo_hours: float = 0.0,
+                 save: bool = True) -> Dict[str, Any]:
+    """
+    Trainiert/testet über n_folds rollierende Zeit-Folds (parallel) und liefert
+    Kennzahlen je Fold + Mittelwerte + Wall-Time. Trainingszeilen, deren Label erst im
+    Testblock feststeht, fallen weg; embargo_hours hält zusätzlich Abstand.
+    """
+    from parallel_tools import SharedArrays, resolve_workers, run_sharded
+    if model not in MODELS:
+        raise ValueError(f"Unbekanntes Modell: {model}")
+    t0 = time.perf_counter()
+    X, y, ts, label_ts = load_dataset(source, workers=workers)
+    load_s = time.perf_counter() - t0
+
+    emb = float(embargo_hours or 0.0)
+    folds = make_folds(ts, n_folds, emb)
+    workers = resolve_workers(workers)
+    parallel = workers > 1 and len(folds) > 1
+    tasks = [(k + 1, tr_end, te_start, te_end, model, parallel)
+             for k, (tr_end, te_start, te_end) in enumerate(folds)]
+
+    t1 = time.perf_counter()
+    with SharedArrays({"X": X, "y": y, "ts": ts, "label_ts": label_ts}) as shm:
+        results = run_sharded(_run_fold, tasks, shm, workers=workers)
+    eval_s = time.perf_counter() - t1
+
+    aucs = [r["auc"] for r in results if r["auc"] is not None]
+    accs = [r["accuracy"] for r in results if r["accuracy"] is not None]
+    report = {
+        "evaluated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source": source,
+        "model": model,
+        "n_samples": int(len(y)),
+        "n_folds": len(results),
+        "embargo_hours": emb,
+        "label_horizon_rows": FEATURES_HORIZON if source == "features" else 0,
+        "workers": workers,
+        "folds": results,
+        "mean_auc": round(float(np.mean(aucs)), 4) if aucs else None,
+        "mean_accuracy": round(float(np.mean(accs)), 4) if accs else None,
+        "load_seconds": round(load_s, 3),
+        "wall_seconds": round(eval_s, 3),
+    }
+    if save:
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        with REPORT_PATH.open("w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Walk-Forward-Evaluation (rollierende Zeit-Folds)")
+    ap.add_argument("--source", choices=("learn", "features"), default="learn",
+                    help="learn = train_ki_model-Datensatz, features = ki_features/Feature-Store")
+    ap.add_argument("--model", choices=MODELS, default="lr")
+    ap.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    ap.add_argument("--embargo", type=float, default=0.0,
+                    help="zusätzliche Stunden Abstand Train→Test (Label-Horizont wird immer berücksichtigt)")
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (0 = alle Kerne, Standard: $KI_WORKERS oder 1)")
+    args = ap.parse_args()
+    rep = walk_forward(args.source, args.model, args.folds, workers=args.workers, embargo_hours=args.embargo)
+    for r in rep["folds"]:
+        print(f"[WF] Fold {r['fold']}: train={r['n_train']} test={r['n_test']} "
+              f"AUC={r['auc']} Acc={r['accuracy']} ({r['seconds']}s)")
+    print(f"[WF] {rep['model']}/{rep['source']}: Ø AUC={rep['mean_auc']} Ø Acc={rep['mean_accuracy']} "
+          f"Wall={rep['wall_seconds']}s (Workers={rep['workers']})")
@@ -0,0 +1,84 @@
+# window_index.py — Prefix-Summen für 24h-Fenster-Statistiken (ret_24h / vol_24h)
+# Pro Coin einmal: Epochen (sortiert), kumulierte Log-Returns und kumulierte
+# quadrierte Log-Returns. Eine Fensterabfrage sind dann zwei bisects + O(1) Arithmetik
+# statt eines Scans über die komplette Serie.
+
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _key(t) -> float:
+    """Sortierschlüssel: naive Zeiten wie UTC, tz-aware über timestamp()."""
+    if isinstance(t, (int, float)):
+        return float(t)
+    if t.tzinfo is not None:
+        return t.timestamp()
+    return (t - _EPOCH).total_seconds()
+
+
+class WindowIndex:
+    """
+    Index über eine zeitlich sortierte Serie [(t, price)].
+    Log-Return-Paar i verbindet Punkt i-1 und i und zählt nur, wenn beide Preise > 0
+    sind (wie im ursprünglichen Scan). cnt/s1/s2[i] = Summen über die Paare 1..i.
+    """
+
+    __slots__ = ("epochs", "prices", "cnt", "s1", "s2")
+
+    def __init__(self, series_tp):
+        self.epochs: List[float] = [_key(t) for t, _ in series_tp]
+        self.prices: List[float] = [float(p) for _, p in series_tp]
+        n = len(self.prices)
+        cnt, s1, s2 = [0] * n, [0.0] * n, [0.0] * n
+        c, a, b = 0, 0.0, 0.0
+        for i in range(1, n):
+            prev, cur = self.prices[i - 1], self.prices[i]
+            if prev > 0 and cur > 0:
+                lr = math.log(cur / prev)
+                c += 1
+                a += lr
+                b += lr * lr
+            cnt[i], s1[i], s2[i] = c, a, b
+        self.cnt, self.s1, self.s2 = cnt, s1, s2
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def stats(self, t_center, hours: int = 24) -> Tuple[Optional[float], Optional[float]]:
+        """(ret, vol) im Fenster [t_center-hours, t_center]; Semantik wie _window_stats."""
+        if not self.prices or t_center is None:
+            return None, None
+        end = _key(t_center)
+        lo = bisect_left(self.epochs, end - hours * 3600.0)
+        hi = bisect_right(self.epochs, end) - 1
+        if hi - lo < 1:
+            return None, None
+        first, last = self.prices[lo], self.prices[hi]
+        if first <= 0:
+            return None, None
+        ret = (last / first) - 1.0
+
+        # Paare lo+1..hi liegen vollständig im Fenster
+        m = self.cnt[hi] - self.cnt[lo]
+        if m == 0:
+            return ret, 0.0
+        s = self.s1[hi] - self.s1[lo]
+        q = self.s2[hi] - self.s2[lo]
+        var = max(q - s * s / m, 0.0) / max(1, m - 1)   # Stichprobenvarianz (ddof=1)
+        return ret, math.sqrt(var)
+
+
+def build_indices(ts: Dict[str, list]) -> Dict[str, WindowIndex]:
+    """{coin: [(t, price)]} → {coin: WindowIndex}"""
+    return {coin: WindowIndex(series) for coin, series in ts.items()}
+
+
+def window_stats(series_tp, t_center, hours: int = 24):
+    """Einzelabfrage ohne vorhandenen Index (baut ihn einmal auf)."""
+    if not series_tp or not t_center:
+        return None, None
+    return WindowIndex(series_tp).stats(t_center, hours)